@@ -1,9 +1,10 @@
 import numpy as np
 import pandas as pd
-from math import sin, cos, pi
-from datetime import timedelta
+from math import pi
 
-np.random.seed(42)
+from utils.chunked_writer import write_chunks
+
+RNG = np.random.default_rng(42)
 
 def base_flow(hour):
     if 6 <= hour <= 10:
@@ -15,70 +16,152 @@ def base_flow(hour):
     else:
         return 7
 
+# Per-hour base flow as a lookup table for the vectorized path
+BASE_FLOW = np.array([base_flow(h) for h in range(24)], dtype=float)
+
+# Events are drawn in fixed-size blocks and consumed in order, so a run is
+# the same whatever chunk_days it is streamed with
+EVENT_BLOCK = 1 << 16
+
+
+def _draw_events(rng, size):
+    # Random interval between 1 and 60 seconds, noise, rare spikes
+    return {
+        "interval_sec": rng.integers(1, 61, size=size),
+        "noise": rng.normal(0, 0.7, size=size),
+        "spike": rng.random(size) < 0.004,
+        "spike_kg": rng.uniform(4, 9, size=size),
+    }
+
+
+def refill_scan(stock, consumed, refill_threshold, refill_amount):
+    # Same recurrence as stepping stock -= consumed, then refilling once
+    # whenever it drops below the threshold. Between refills stock is
+    # start - cumsum(consumed), so each next crossing is one searchsorted
+    # on the cumulative consumption; the loop runs once per refill
+    total = np.cumsum(consumed)
+    is_refill = np.zeros(len(consumed), dtype=np.int64)
+
+    refills = 0
+    start = 0
+    while start < len(total):
+        i = start + np.searchsorted(
+            total[start:], stock - refill_threshold + refills * refill_amount, side="right"
+        )
+        if i >= len(total):
+            break
+        is_refill[i] = 1
+        refills += 1
+        start = i + 1
+
+    stock_path = stock - total + refill_amount * np.cumsum(is_refill)
+
+    return stock_path, is_refill
+
+
+def _irregular_chunk(station_id, start, t0, events, stock, refill_threshold, refill_amount):
+
+    interval_sec = events["interval_sec"]
+    seconds = t0 + np.cumsum(interval_sec)
+
+    # Calendar straight from the integer clock, no datetime accessors
+    timestamps = start.to_datetime64() + seconds.astype("timedelta64[s]")
+    clock = seconds + (start - start.normalize()).seconds
+    hour = clock % 86400 // 3600
+    minute = clock % 3600 // 60
+    dow = (start.weekday() + clock // 86400) % 7
+    weekend = (dow >= 5).astype(int)
+
+    # Weekend effect
+    base = BASE_FLOW[hour] * np.where(weekend, 0.8, 1.0)
+    noise = events["noise"] + np.where(events["spike"], events["spike_kg"], 0.0)
+
+    flow = np.maximum(0.3, base + noise)
+
+    # Adjust consumption for irregular interval
+    consumed = flow * (interval_sec / 60)
+    stock_path, is_refill = refill_scan(stock, consumed, refill_threshold, refill_amount)
+
+    chunk = pd.DataFrame({
+        "timestamp": timestamps,
+        "station_id": station_id,
+        "flow_kg_min": np.round(flow, 2),
+        "consumed_kg": np.round(consumed, 3),
+        "stock_kg": np.round(stock_path, 2),
+        "is_refill": is_refill,
+        "interval_sec": interval_sec,
+        "hour": hour,
+        "minute": minute,
+        "day_of_week": dow,
+        "is_weekend": weekend,
+        "sin_hour": np.sin(2 * pi * hour / 24),
+        "cos_hour": np.cos(2 * pi * hour / 24)
+    })
+
+    return chunk, int(seconds[-1]), float(stock_path[-1])
+
+
+def iter_irregular_station_data(
+    station_id="DBS_01",
+    start_date="2025-01-01",
+    days=365,
+    initial_stock=6000,
+    refill_threshold=800,
+    refill_amount=5000,
+    chunk_days=7,
+    rng=None
+):
+    # One chunk of rows per chunk_days; clock, stock, refill state and
+    # unused random draws carry across chunk boundaries, so the
+    # concatenated chunks are the same event stream
+    rng = rng if rng is not None else RNG
+
+    start = pd.Timestamp(start_date)
+    end = days * 86400
+    t = 0
+    stock = float(initial_stock)
+    pending = _draw_events(rng, 0)
+
+    while t < end:
+
+        chunk_end = min((t // 86400 + chunk_days) * 86400, end)
+
+        # Like the step loop, an event is emitted while the clock is still
+        # before chunk_end, so the last one may land on or after it
+        while t + pending["interval_sec"].sum() < chunk_end:
+            block = _draw_events(rng, EVENT_BLOCK)
+            pending = {k: np.concatenate([pending[k], block[k]]) for k in pending}
+
+        seconds = t + np.cumsum(pending["interval_sec"])
+        n = int(np.searchsorted(seconds, chunk_end, side="left")) + 1
+
+        events = {k: v[:n] for k, v in pending.items()}
+        pending = {k: v[n:] for k, v in pending.items()}
+
+        chunk, t, stock = _irregular_chunk(
+            station_id, start, t, events, stock, refill_threshold, refill_amount
+        )
+
+        yield chunk
+
+
 def generate_irregular_station_data(
     station_id="DBS_01",
     start_date="2025-01-01",
     days=365,
     initial_stock=6000,
     refill_threshold=800,
-    refill_amount=5000
+    refill_amount=5000,
+    chunk_days=7,
+    output_path="data/sales.csv",
+    rng=None
 ):
-    end_time = pd.Timestamp(start_date) + pd.Timedelta(days=days)
-    current_time = pd.Timestamp(start_date)
-    stock = initial_stock
-    rows = []
-
-    while current_time < end_time:
-        # Random interval between 1 and 60 seconds
-        step_seconds = np.random.randint(1, 61)
-        current_time += timedelta(seconds=step_seconds)
-
-        hour = current_time.hour
-        minute = current_time.minute
-        dow = current_time.weekday()
-        weekend = int(dow >= 5)
-
-        base = base_flow(hour)
-
-        # Weekend effect
-        if weekend:
-            base *= 0.8
-
-        # Noise
-        noise = np.random.normal(0, 0.7)
-
-        # Rare spikes
-        if np.random.rand() < 0.004:
-            noise += np.random.uniform(4, 9)
-
-        flow = max(0.3, base + noise)
-
-        # Adjust consumption for irregular interval
-        consumed = flow * (step_seconds / 60)
-        stock -= consumed
-
-        is_refill = 0
-        if stock < refill_threshold:
-            stock += refill_amount
-            is_refill = 1
-
-        rows.append({
-            "timestamp": current_time,
-            "station_id": station_id,
-            "flow_kg_min": round(flow, 2),
-            "consumed_kg": round(consumed, 3),
-            "stock_kg": round(stock, 2),
-            "is_refill": is_refill,
-            "interval_sec": step_seconds,
-            "hour": hour,
-            "minute": minute,
-            "day_of_week": dow,
-            "is_weekend": weekend,
-            "sin_hour": sin(2 * pi * hour / 24),
-            "cos_hour": cos(2 * pi * hour / 24)
-        })
-
-    df = pd.DataFrame(rows)
-    df.to_csv("data/sales.csv", header=True)
+    # Streams chunk by chunk to CSV (or Parquet for a .parquet path), so
+    # multi-year runs do not hold every row in memory
+    chunks = iter_irregular_station_data(
+        station_id, start_date, days, initial_stock,
+        refill_threshold, refill_amount, chunk_days, rng
+    )
+    write_chunks(chunks, output_path)
 
     return "DONE!!!"
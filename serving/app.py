@@ -1,9 +1,27 @@
 import os
+import threading
+from functools import lru_cache
+import mlflow
+import mlflow.xgboost
+import numpy as np
 import pandas as pd
-from typing import List
+import time
+import xgboost as xgb
+from typing import List, Optional
 from math import sin, cos, pi
 from datetime import datetime
 
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from training.baseline import BAND_RATIO, BASELINE_LAGS, DEVIATION_Z, SeasonalBaseline
+from training.explain import PRECOMPUTE_BATCH, TOP_K, ExplanationCache, Explainer
+from training.forecast_table import BUCKET_MINUTES, ForecastTable, bucket_minute
+from training.online_features import StationFeatureEngine
+from training.raw_store import RawStore
+from training.rollups import LEVELS, RollupPyramid
+from training.transit_table import TransitTable
+
 # ---------------------------------------------------
 # CONFIG
 # ---------------------------------------------------
@@ -14,10 +32,13 @@ LAGS = 120
 # FEATURE BUILDER
 # ---------------------------------------------------
 
-def build_features(timestamp: str, flow_history: List[float]):
+def build_features(timestamp: str, flow_history: List[float], lags: Optional[List[int]] = None):
 
-    if len(flow_history) != LAGS:
-        raise ValueError(f"flow_history must contain {LAGS} values.")
+    # lags: the model's lag list (from its metadata); defaults to all LAGS
+    lags = sorted(lags) if lags else list(range(1, LAGS + 1))
+
+    if len(flow_history) < lags[-1]:
+        raise ValueError(f"flow_history must contain at least {lags[-1]} values.")
 
     ts = pd.Timestamp(timestamp)
 
@@ -34,22 +55,42 @@ def build_features(timestamp: str, flow_history: List[float]):
     }
 
     # Add lag features (latest value = t-1)
-    for i in range(1, LAGS + 1):
+    for i in lags:
         feature_dict[f"flow_t-{i}"] = flow_history[-i]
 
     return pd.DataFrame([feature_dict])
 
+
+@lru_cache(maxsize=64)
+def load_model_lags(model_uri: str):
+
+    # Lag-pruned models (training/select_lags.py) carry their lag list in the
+    # MLflow model metadata; older models have none and use all LAGS.
+    # Cached per model_uri, so the registry is asked once per model
+    metadata = mlflow.models.get_model_info(model_uri).metadata or {}
+    return tuple(metadata.get("lags", range(1, LAGS + 1)))
+
 import math
 
 
 def build_scoring_payload(
-    features: list
-
-    recent_flow_history: list
+    timestamp: str,
+    recent_flow_history: list,
+    lags: Optional[List[int]] = None
 ):
 
-    if len(recent_flow_history) != 120:
-        raise ValueError("recent_flow_history must contain exactly 120 values")
+    # Only the model's own lags are built; history is newest first (t-1, t-2, ...)
+    lags = sorted(lags) if lags else list(range(1, LAGS + 1))
+
+    if len(recent_flow_history) < lags[-1]:
+        raise ValueError(f"recent_flow_history must contain at least {lags[-1]} values")
+
+    ts = pd.Timestamp(timestamp)
+
+    hour = ts.hour
+    minute = ts.minute
+    day_of_week = ts.weekday()
+    is_weekend = int(day_of_week >= 5)
 
 
     sin_hour = math.sin(2 * math.pi * hour / 24)
@@ -67,7 +108,7 @@ def build_scoring_payload(
     ]
 
     # Add lag columns
-    for i in range(1, 121):
+    for i in lags:
         columns.append(f"flow_t-{i}")
 
     # Minute at the END (as per your trained model)
@@ -84,8 +125,8 @@ def build_scoring_payload(
         round(cos_hour, 4),
     ]
 
-    # Ensure correct order flow_t-1 ... flow_t-120
-    row.extend(recent_flow_history)
+    # Same order as the lag columns: flow_t-i is recent_flow_history[i - 1]
+    row.extend(recent_flow_history[i - 1] for i in lags)
 
     # minute must be last
     row.append(minute)
@@ -98,3 +139,699 @@ def build_scoring_payload(
     }
 
     return payload
+
+
+# ---------------------------------------------------
+# 15-MIN BUCKET MODEL: ONLINE FEATURES
+# ---------------------------------------------------
+
+app = FastAPI()
+
+# One engine per station; each SCADA reading is an O(1) update. Endpoints
+# run on a threadpool and an update touches several fields, so every use of
+# a station's engine holds that station's lock
+engines = {}
+engine_locks = {}
+engine_locks_guard = threading.Lock()
+
+
+class Reading(BaseModel):
+    timestamp: datetime
+    value: float
+
+
+class StationConfig(BaseModel):
+    cap: Optional[float] = None
+
+
+class BucketHistory(BaseModel):
+    bucket_start: List[datetime]
+    sales_15min: List[float]
+
+
+def station_lock(station_id: str):
+
+    with engine_locks_guard:
+        return engine_locks.setdefault(station_id, threading.Lock())
+
+
+def get_engine(station_id: str):
+
+    # Callers hold station_lock(station_id)
+    if station_id not in engines:
+        engines[station_id] = StationFeatureEngine()
+
+    return engines[station_id]
+
+
+@app.put("/stations/{station_id}")
+def configure_station(station_id: str, config: StationConfig):
+
+    # (Re)start a station, optionally with the training-time outlier cap
+    with station_lock(station_id):
+        engines[station_id] = StationFeatureEngine(cap=config.cap)
+
+    return {"station_id": station_id, "cap": config.cap}
+
+
+@app.post("/stations/{station_id}/history")
+def load_station_history(station_id: str, history: BucketHistory):
+
+    # Warm start from completed bucket totals instead of replaying readings
+    with station_lock(station_id):
+        engine = get_engine(station_id)
+        engine.replay(history.bucket_start, history.sales_15min)
+
+        return {"station_id": station_id, "bucket_start": str(engine.bucket_start),
+                "ready": engine.ready}
+
+
+@app.post("/stations/{station_id}/readings")
+def ingest_readings(station_id: str, readings: List[Reading]):
+
+    with station_lock(station_id):
+        engine = get_engine(station_id)
+
+        try:
+            for reading in readings:
+                engine.update(reading.timestamp, reading.value)
+        except ValueError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+
+        resolve_predictions(station_id, engine)
+
+        return {"station_id": station_id, "bucket_start": str(engine.bucket_start),
+                "ready": engine.ready}
+
+
+def build_bucket_scoring_payload(engine: StationFeatureEngine):
+
+    # Same column order as training's FEATURE_COLS
+    return {
+        "dataframe_split": {
+            "columns": engine.feature_cols,
+            "data": [engine.feature_vector().tolist()]
+        }
+    }
+
+
+@app.get("/stations/{station_id}/features")
+def station_features(station_id: str):
+
+    with station_lock(station_id):
+        engine = engines.get(station_id)
+
+        if engine is None or engine.bucket is None:
+            raise HTTPException(status_code=404, detail=f"no readings for station {station_id}")
+        if not engine.ready:
+            raise HTTPException(status_code=409, detail="not enough history for all lags yet")
+
+        return {
+            "station_id": station_id,
+            "bucket_start": str(engine.bucket_start),
+            "features": engine.features(),
+            "payload": build_bucket_scoring_payload(engine),
+        }
+
+
+# ---------------------------------------------------
+# MINUTE MODEL: HISTORY FROM THE RAW MINUTE STORE
+# ---------------------------------------------------
+
+# Memory-mapped per-station minute store written by ingestion
+# (training/raw_store.py); the lag history is a slice, nothing is parsed
+RAW_STORE_DIR = os.getenv("RAW_STORE_DIR", "data/raw_store")
+
+raw_store = RawStore(RAW_STORE_DIR)
+
+
+def recent_flow_history(station_id: str, n: int = LAGS):
+
+    # Newest first (t-1, t-2, ...), as build_scoring_payload expects;
+    # minutes without a reading had no sales
+    store = raw_store.station(station_id)
+    store.refresh()
+
+    if store.length < n:
+        raise ValueError(f"store holds {store.length} minutes, {n} needed")
+
+    history = np.nan_to_num(store.tail(n, "flow")[::-1])
+
+    return pd.Timestamp(store.end, unit="m"), history.tolist()
+
+
+@app.get("/stations/{station_id}/minute_payload")
+def minute_scoring_payload(station_id: str, model_uri: Optional[str] = None):
+
+    # Payload for the minute after the last stored one
+    lags = load_model_lags(model_uri) if model_uri else None
+    n = max(lags) if lags else LAGS
+
+    try:
+        timestamp, history = recent_flow_history(station_id, n)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"no stored readings for station {station_id}")
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+
+    return {
+        "station_id": station_id,
+        "timestamp": timestamp.isoformat(),
+        "payload": build_scoring_payload(str(timestamp), history, lags),
+    }
+
+
+# Precomputed 1min / 15min / 1h / 1d aggregates kept next to the raw store
+rollups = RollupPyramid(RAW_STORE_DIR)
+
+
+@app.get("/stations/{station_id}/rollup")
+def station_rollup(station_id: str, start: datetime, end: datetime, resolution: str = "1h"):
+
+    if resolution not in LEVELS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {list(LEVELS)}")
+
+    try:
+        frame = rollups.query(station_id, resolution, start, end)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"no rollups for station {station_id}")
+    except ValueError as exc:
+        raise HTTPException(status_code=416, detail=str(exc))
+
+    # NaN (empty buckets) is not valid JSON
+    frame["bucket_start"] = frame["bucket_start"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    frame = frame.astype(object)
+
+    return {
+        "station_id": station_id,
+        "resolution": resolution,
+        "buckets": frame.where(frame.notna(), None).to_dict(orient="list"),
+    }
+
+
+# ---------------------------------------------------
+# NEXT-DAY FORECASTS (materialized table, no model call)
+# ---------------------------------------------------
+
+# Written every bucket by training/materialize_forecasts.py (.sqlite or
+# .parquet); the file is swapped atomically and reloaded here when it changes
+FORECAST_TABLE_PATH = os.getenv("FORECAST_TABLE_PATH", "data/forecast_table.sqlite")
+
+forecast_tables = {}
+
+
+def load_forecast_table():
+
+    try:
+        mtime = os.stat(FORECAST_TABLE_PATH).st_mtime
+    except OSError as exc:
+        raise HTTPException(status_code=503, detail=f"forecast table unavailable: {exc}")
+
+    if forecast_tables.get("mtime") != mtime:
+        forecast_tables["table"] = ForecastTable.load(FORECAST_TABLE_PATH)
+        forecast_tables["mtime"] = mtime
+
+        if EXPLAIN_PRECOMPUTE and forecast_tables["table"].features is not None:
+            threading.Thread(target=precompute_explanations, args=(forecast_tables["table"],),
+                             daemon=True).start()
+
+    return forecast_tables["table"]
+
+
+@app.get("/forecast")
+def forecast_freshness():
+    return load_forecast_table().freshness()
+
+
+@app.get("/forecast/{station_id}")
+def station_forecast(station_id: str, bucket_start: Optional[datetime] = None):
+
+    # The station's next 24 h, or one bucket of it
+    table = load_forecast_table()
+
+    if station_id not in table.index:
+        raise HTTPException(status_code=404, detail=f"no forecast for station {station_id}")
+
+    freshness = table.freshness()
+
+    if bucket_start is None:
+        return {"station_id": station_id, **table.station(station_id), "freshness": freshness}
+
+    forecast = table.lookup(station_id, bucket_start)
+    if forecast is None:
+        raise HTTPException(status_code=404, detail=f"{bucket_start} is outside the materialized day")
+
+    return {"station_id": station_id, "bucket_start": bucket_start.isoformat(),
+            "forecast": forecast, "freshness": freshness}
+
+
+# ---------------------------------------------------
+# FORECAST EXPLANATIONS (batched TreeSHAP on the materialized rows)
+# ---------------------------------------------------
+
+# Each new forecast table is explained in the background, so most requests
+# are cache hits; misses are batched into one pred_contribs call per model
+EXPLAIN_PRECOMPUTE = os.getenv("EXPLAIN_PRECOMPUTE", "1") == "1"
+
+explanation_cache = ExplanationCache()
+explainers = {}
+explain_status = {"precomputed": 0, "total": 0, "running": False, "error": None}
+
+
+class ExplainQuery(BaseModel):
+    station_id: str
+    bucket_start: datetime
+
+
+def get_explainer(model_version: str, table: ForecastTable):
+
+    # model_version is "<registered name>/<version>", as in the table metadata
+    if model_version not in explainers:
+        booster = mlflow.xgboost.load_model(f"models:/{model_version}")
+        explainers[model_version] = Explainer(booster, table.meta["feature_cols"],
+                                              table.meta.get("categories"))
+
+    return explainers[model_version]
+
+
+def explain_positions(table: ForecastTable, positions, k=TOP_K, interactions=False):
+
+    # positions: [(row, horizon index)]; cached entries are reused and the
+    # rest go through the booster in one batch per model version. Every
+    # rewrite of the table has new feature rows, so its generated_at is
+    # part of the key
+    models = table.meta["models"]
+    generated_at = table.meta.get("generated_at")
+    keys = [
+        (models[table.station_ids[i]], int(table.first_bucket[i]) + h * BUCKET_MINUTES,
+         table.station_ids[i], k, interactions, generated_at)
+        for i, h in positions
+    ]
+    results = [explanation_cache.get(key) for key in keys]
+
+    missing = {}
+    for n, (key, result) in enumerate(zip(keys, results)):
+        if result is None:
+            missing.setdefault(key[0], []).append(n)
+
+    for model_version, idx in missing.items():
+        rows = np.stack([table.features[positions[n]] for n in idx])
+        explained = get_explainer(model_version, table).explain(rows, k, interactions)
+
+        explanation_cache.put_many((keys[n], e) for n, e in zip(idx, explained))
+        for n, e in zip(idx, explained):
+            results[n] = e
+
+    return results
+
+
+def precompute_explanations(table: ForecastTable):
+
+    positions = [(i, h) for i in range(len(table.station_ids)) for h in range(table.values.shape[1])]
+    explain_status.update(precomputed=0, total=len(positions), running=True, error=None)
+
+    try:
+        for start in range(0, len(positions), PRECOMPUTE_BATCH):
+            batch = positions[start:start + PRECOMPUTE_BATCH]
+            explain_positions(table, batch)
+            explain_status["precomputed"] += len(batch)
+    except Exception as exc:
+        explain_status["error"] = str(exc)
+    finally:
+        explain_status["running"] = False
+
+
+def explainable_table():
+
+    table = load_forecast_table()
+    if table.features is None:
+        raise HTTPException(status_code=409, detail="forecast table has no feature rows to explain")
+
+    return table
+
+
+def forecast_position(table: ForecastTable, station_id: str, bucket_start: datetime):
+
+    if station_id not in table.index:
+        raise HTTPException(status_code=404, detail=f"no forecast for station {station_id}")
+
+    pos = table.position(station_id, bucket_start)
+    if pos is None:
+        raise HTTPException(status_code=404, detail=f"{bucket_start} is outside the materialized day")
+
+    return pos
+
+
+@app.get("/explain")
+def explain_stats():
+    return {"cache": explanation_cache.stats(), "precompute": explain_status}
+
+
+@app.get("/explain/{station_id}")
+def explain_forecast(station_id: str, bucket_start: datetime, top_k: int = TOP_K,
+                     interactions: bool = False):
+
+    table = explainable_table()
+    pos = forecast_position(table, station_id, bucket_start)
+
+    explanation = explain_positions(table, [pos], top_k, interactions)[0]
+
+    return {"station_id": station_id,
+            "bucket_start": str(pd.Timestamp(bucket_minute(bucket_start), unit="m")),
+            "forecast": float(table.values[pos]), **explanation}
+
+
+@app.post("/explain")
+def explain_forecasts(queries: List[ExplainQuery], top_k: int = TOP_K, interactions: bool = False):
+
+    table = explainable_table()
+    positions = [forecast_position(table, q.station_id, q.bucket_start) for q in queries]
+
+    explanations = explain_positions(table, positions, top_k, interactions)
+
+    return [
+        {"station_id": q.station_id,
+         "bucket_start": str(pd.Timestamp(bucket_minute(q.bucket_start), unit="m")),
+         "forecast": float(table.values[pos]), **e}
+        for q, pos, e in zip(queries, positions, explanations)
+    ]
+
+
+# ---------------------------------------------------
+# NEXT BUCKET: SEASONAL BASELINE -> GLOBAL BOOSTER CASCADE
+# ---------------------------------------------------
+
+# The baseline (training/cascade.py) answers by itself unless its band is
+# wide or the last bucket was unusual; then the global booster scores the
+# engine's feature row. A SHADOW_RATE sample of baseline-served requests is
+# also scored by the booster, so the accuracy given up stays measurable.
+BASELINE_PATH = os.getenv("BASELINE_PATH", "data/seasonal_baseline.npz")
+CASCADE_MODEL_NAME = os.getenv("CASCADE_MODEL_NAME", "xgb_station_global")
+CASCADE_MODEL_VERSION = os.getenv("CASCADE_MODEL_VERSION")
+SHADOW_RATE = float(os.getenv("CASCADE_SHADOW_RATE", "0.1"))
+
+
+class CascadeStats:
+
+    # Escalation rate, latency and, once the predicted bucket has closed,
+    # absolute errors: baseline on every request, booster whenever it ran
+    # (escalations plus a shadow sample of baseline-served requests)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.escalated = 0
+        self.shadowed = 0
+        self.baseline_s = 0.0
+        self.booster_s = 0.0
+        self.booster_calls = 0
+        self.errors = {"served": [0.0, 0], "baseline": [0.0, 0], "booster": [0.0, 0],
+                       "shadow_delta": [0.0, 0]}
+
+    def record_request(self, escalated, shadowed, baseline_s, booster_s=None):
+
+        with self._lock:
+            self.requests += 1
+            self.escalated += escalated
+            self.shadowed += shadowed
+            self.baseline_s += baseline_s
+            if booster_s is not None:
+                self.booster_s += booster_s
+                self.booster_calls += 1
+
+    def record_outcome(self, actual, served, baseline, booster=None, shadow=False):
+
+        with self._lock:
+            for name, pred in (("served", served), ("baseline", baseline), ("booster", booster)):
+                if pred is not None:
+                    self.errors[name][0] += abs(actual - pred)
+                    self.errors[name][1] += 1
+            if shadow and booster is not None:
+                self.errors["shadow_delta"][0] += abs(actual - baseline) - abs(actual - booster)
+                self.errors["shadow_delta"][1] += 1
+
+    def report(self):
+
+        with self._lock:
+            booster_ms = 1000 * self.booster_s / self.booster_calls if self.booster_calls else None
+            baseline_ms = 1000 * self.baseline_s / self.requests if self.requests else None
+            # Booster calls skipped, less the baseline time paid on every
+            # request; shadowed requests ran the booster and save nothing
+            skipped = self.requests - self.escalated - self.shadowed
+
+            return {
+                "requests": self.requests,
+                "escalation_rate": self.escalated / self.requests if self.requests else None,
+                "shadowed": self.shadowed,
+                "baseline_ms": baseline_ms,
+                "booster_ms": booster_ms,
+                "latency_saved_s": (skipped * (self.booster_s / self.booster_calls) - self.baseline_s
+                                    if self.booster_calls else None),
+                "mae": {name: total / count if count else None
+                        for name, (total, count) in self.errors.items() if name != "shadow_delta"},
+                # > 0: how much worse the baseline was where the booster was skipped
+                "shadow_mae_delta": (self.errors["shadow_delta"][0] / self.errors["shadow_delta"][1]
+                                     if self.errors["shadow_delta"][1] else None),
+            }
+
+
+cascade_models = {}
+cascade_stats = CascadeStats()
+shadow_rng = np.random.default_rng()
+
+# station -> {target bucket index: (served, baseline, booster, shadow)},
+# resolved by ingest_readings once the bucket closes. Endpoints run on a
+# threadpool, so every access holds pending_lock
+pending_predictions = {}
+pending_lock = threading.Lock()
+
+
+def load_cascade_models():
+
+    if "baseline" not in cascade_models:
+        cascade_models["baseline"] = SeasonalBaseline.load(BASELINE_PATH)
+
+    if "booster" not in cascade_models:
+        client = mlflow.tracking.MlflowClient()
+
+        if CASCADE_MODEL_VERSION:
+            version = client.get_model_version(CASCADE_MODEL_NAME, CASCADE_MODEL_VERSION)
+        else:
+            version = client.search_model_versions(
+                f"name='{CASCADE_MODEL_NAME}'",
+                order_by=["version_number DESC"],
+                max_results=1
+            )[0]
+
+        cascade_models["profiles"] = mlflow.artifacts.load_dict(
+            f"runs:/{version.run_id}/station_profiles.json"
+        )
+        cascade_models["version"] = f"{CASCADE_MODEL_NAME}/{version.version}"
+        cascade_models["booster"] = mlflow.xgboost.load_model(f"models:/{cascade_models['version']}")
+
+    return cascade_models
+
+
+def booster_predict(models, station_id: str, features: dict):
+
+    booster = models["booster"]
+    profiles = models["profiles"]
+
+    row = {**features, **profiles[station_id]}
+    frame = pd.DataFrame([row])[booster.feature_names]
+    frame["station_code"] = pd.Categorical(frame["station_code"].astype(int),
+                                           categories=list(range(len(profiles))))
+
+    return max(float(booster.predict(xgb.DMatrix(frame, enable_categorical=True))[0]), 0.0)
+
+
+def resolve_predictions(station_id: str, engine: StationFeatureEngine):
+
+    # Called by ingest_readings with the station's lock held
+    if engine.bucket is None:
+        return
+
+    with pending_lock:
+        pending = pending_predictions.get(station_id, {})
+        due = [(t, pending.pop(t)) for t in [t for t in pending if t < engine.bucket]]
+
+    for target, (served, baseline, booster, shadow) in due:
+        # Closed buckets older than the ring can no longer be scored
+        actual = engine.recent(engine.bucket - target)
+        if actual is not None:
+            cascade_stats.record_outcome(actual, served, baseline, booster, shadow)
+
+
+@app.get("/stations/{station_id}/next_bucket")
+def predict_next_bucket(station_id: str, band_ratio: float = BAND_RATIO,
+                        deviation_z: float = DEVIATION_Z):
+
+    # Snapshot the engine under its lock; scoring runs without it
+    with station_lock(station_id):
+        engine = engines.get(station_id)
+
+        if engine is None or engine.bucket is None:
+            raise HTTPException(status_code=404, detail=f"no readings for station {station_id}")
+        if not engine.ready:
+            raise HTTPException(status_code=409, detail="not enough history for all lags yet")
+
+        bucket, bucket_start = engine.bucket, engine.bucket_start
+        lags = [engine.recent(k) for k in BASELINE_LAGS]
+        features = engine.features()
+
+    try:
+        models = load_cascade_models()
+    except Exception as exc:
+        raise HTTPException(status_code=503, detail=f"cascade models unavailable: {exc}")
+
+    baseline_model = models["baseline"]
+    has_baseline = station_id in baseline_model.index
+    has_booster = station_id in models["profiles"]
+
+    if not has_baseline and not has_booster:
+        raise HTTPException(status_code=404, detail=f"no model covers station {station_id}")
+
+    start = time.perf_counter()
+    baseline, band, escalate = None, None, True
+    if has_baseline:
+        pred, band, escalate = baseline_model.predict(
+            baseline_model.index[station_id], bucket_start, [lags], band_ratio, deviation_z
+        )
+        baseline, band, escalate = float(pred[0]), float(band[0]), bool(escalate[0])
+    baseline_s = time.perf_counter() - start
+
+    # Booster-only stations always escalate; baseline-only ones never can
+    escalate = escalate and has_booster
+    shadow = not escalate and has_booster and shadow_rng.random() < SHADOW_RATE
+
+    booster, booster_s = None, None
+    if escalate or shadow:
+        start = time.perf_counter()
+        booster = booster_predict(models, station_id, features)
+        booster_s = time.perf_counter() - start
+
+    served = booster if escalate else baseline
+
+    if has_baseline:
+        cascade_stats.record_request(escalate, shadow, baseline_s, booster_s)
+        with pending_lock:
+            pending_predictions.setdefault(station_id, {})[bucket + 1] = (
+                served, baseline, booster, shadow
+            )
+
+    return {
+        "station_id": station_id,
+        "bucket_start": str(bucket_start + pd.Timedelta(minutes=BUCKET_MINUTES)),
+        "prediction": served,
+        "tier": "booster" if escalate else "baseline",
+        "band": band,
+        "model": models["version"] if escalate else "seasonal_baseline",
+    }
+
+
+@app.get("/cascade/stats")
+def cascade_report():
+
+    with pending_lock:
+        pending = sum(len(p) for p in pending_predictions.values())
+
+    return {
+        **cascade_stats.report(),
+        "pending": pending,
+        "shadow_rate": SHADOW_RATE,
+        "booster": cascade_models.get("version"),
+    }
+
+
+# ---------------------------------------------------
+# TRANSIT TIME LOOKUP (dense table, no model call)
+# ---------------------------------------------------
+
+# A local .npz, or the registered transit model whose metadata points at
+# the table artifact logged in the same run
+TRANSIT_TABLE_PATH = os.getenv("TRANSIT_TABLE_PATH")
+TRANSIT_MODEL_NAME = os.getenv("TRANSIT_MODEL_NAME", "transit_time_global")
+TRANSIT_MODEL_VERSION = os.getenv("TRANSIT_MODEL_VERSION")
+
+transit_tables = {}
+
+
+def load_transit_table():
+
+    if "table" not in transit_tables:
+        path = TRANSIT_TABLE_PATH
+
+        if path is None:
+            client = mlflow.tracking.MlflowClient()
+
+            if TRANSIT_MODEL_VERSION:
+                version = client.get_model_version(TRANSIT_MODEL_NAME, TRANSIT_MODEL_VERSION)
+            else:
+                version = client.search_model_versions(
+                    f"name='{TRANSIT_MODEL_NAME}'",
+                    order_by=["version_number DESC"],
+                    max_results=1
+                )[0]
+
+            info = mlflow.models.get_model_info(f"models:/{TRANSIT_MODEL_NAME}/{version.version}")
+            path = mlflow.artifacts.download_artifacts(
+                f"runs:/{version.run_id}/{info.metadata['transit_table']}"
+            )
+
+        transit_tables["table"] = TransitTable.load(path)
+
+    return transit_tables["table"]
+
+
+class TransitQuery(BaseModel):
+    route_id: str
+    departure: datetime
+    holiday: bool = False
+    construction: bool = False
+
+
+def get_transit_table():
+
+    try:
+        return load_transit_table()
+    except Exception as exc:
+        raise HTTPException(status_code=503, detail=f"transit table unavailable: {exc}")
+
+
+@app.get("/transit/{route_id}")
+def transit_time(route_id: str, departure: datetime, holiday: bool = False,
+                 construction: bool = False):
+
+    table = get_transit_table()
+
+    if route_id not in table.index:
+        raise HTTPException(status_code=404, detail=f"unknown route {route_id}")
+
+    return {
+        "route_id": route_id,
+        "departure": departure.isoformat(),
+        "expected_transit_min": table.lookup(route_id, departure, holiday, construction),
+    }
+
+
+@app.post("/transit/lookup")
+def transit_times(queries: List[TransitQuery]):
+
+    table = get_transit_table()
+
+    unknown = sorted({q.route_id for q in queries} - table.index.keys())
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"unknown routes: {unknown}")
+
+    minutes = table.lookup_many(
+        [q.route_id for q in queries],
+        [q.departure for q in queries],
+        [q.holiday for q in queries],
+        [q.construction for q in queries],
+    )
+
+    return [
+        {"route_id": q.route_id, "departure": q.departure.isoformat(),
+         "expected_transit_min": float(m)}
+        for q, m in zip(queries, minutes)
+    ]
@@ -0,0 +1,275 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import mlflow
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
+
+from training.fleet_bucketing import bucket_fleet
+from training.station_data import (
+    BUCKET_FREQ,
+    FEATURE_COLS,
+    STATION_FILES,
+    XGB_PARAMS,
+    add_bucket_features,
+    load_station_export,
+)
+
+# =====================================
+# ROLLING-ORIGIN BACKTEST CONFIG
+# =====================================
+
+N_FOLDS = 5
+MIN_TRAIN_FRACTION = 0.5
+EARLY_STOPPING_FRACTION = 0.1
+NUM_BOOST_ROUND = 1200
+
+METRIC_NAMES = ["rmse", "mae", "wape", "bias"]
+
+# Column layout of the shared matrix: features, then target, then target hour
+TARGET_COL = len(FEATURE_COLS)
+HOUR_COL = len(FEATURE_COLS) + 1
+
+
+# =====================================
+# FOLDS
+# =====================================
+
+def rolling_origin_folds(n_rows, n_folds=N_FOLDS, window="expanding",
+                         min_train_fraction=MIN_TRAIN_FRACTION):
+
+    # The first min_train_fraction of history is only ever trained on; the
+    # remainder is cut into n_folds consecutive test blocks, the last one
+    # running to n_rows so the newest rows are always tested
+    min_train = int(n_rows * min_train_fraction)
+    test_size = (n_rows - min_train) // n_folds
+
+    if test_size < 1:
+        raise ValueError(f"{n_rows} rows is too short for {n_folds} folds")
+
+    folds = []
+    for k in range(n_folds):
+        test_start = min_train + k * test_size
+        train_start = 0 if window == "expanding" else test_start - min_train
+        test_end = n_rows if k == n_folds - 1 else test_start + test_size
+        folds.append((train_start, test_start, test_end))
+
+    return folds
+
+
+# =====================================
+# SHARED FEATURE MATRIX
+# =====================================
+
+def build_shared_matrix(feature_frames):
+
+    # One float32 block for every station, written once into shared memory;
+    # workers map it instead of receiving pickled copies
+    offsets = {}
+    blocks = []
+    row = 0
+
+    for station, frame in feature_frames.items():
+        target_hour = (frame["bucket_start"] + pd.Timedelta(BUCKET_FREQ)).dt.hour
+        block = np.column_stack([
+            frame[FEATURE_COLS].to_numpy(dtype=np.float32),
+            frame["target"].to_numpy(dtype=np.float32),
+            target_hour.to_numpy(dtype=np.float32),
+        ])
+        offsets[station] = (row, row + len(block))
+        blocks.append(block)
+        row += len(block)
+
+    shape = (row, HOUR_COL + 1)
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 4)
+
+    matrix = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+    np.concatenate(blocks, out=matrix)
+
+    return shm, shape, offsets
+
+
+_WORKER = {}
+
+
+def _attach_shared_matrix(name, shape):
+
+    shm = shared_memory.SharedMemory(name=name)
+    _WORKER["shm"] = shm
+    _WORKER["matrix"] = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+
+
+def _run_fold(task):
+
+    station_idx, fold_idx, train_start, test_start, test_end, params = task
+    matrix = _WORKER["matrix"]
+
+    # Early stopping uses the tail of the training window, never the test block
+    stop_start = test_start - max(1, int((test_start - train_start) * EARLY_STOPPING_FRACTION))
+
+    fit = matrix[train_start:stop_start]
+    stop = matrix[stop_start:test_start]
+    test = matrix[test_start:test_end]
+
+    dfit = xgb.DMatrix(fit[:, :TARGET_COL], label=fit[:, TARGET_COL], feature_names=FEATURE_COLS)
+    dstop = xgb.DMatrix(stop[:, :TARGET_COL], label=stop[:, TARGET_COL], feature_names=FEATURE_COLS)
+    dtest = xgb.DMatrix(test[:, :TARGET_COL], feature_names=FEATURE_COLS)
+
+    model = xgb.train(
+        params,
+        dfit,
+        num_boost_round=NUM_BOOST_ROUND,
+        evals=[(dstop, "valid")],
+        early_stopping_rounds=50,
+        verbose_eval=False
+    )
+
+    y_pred = model.predict(dtest, iteration_range=(0, model.best_iteration + 1))
+
+    return station_idx, fold_idx, test[:, TARGET_COL].copy(), y_pred, test[:, HOUR_COL].astype(np.int64)
+
+
+# =====================================
+# VECTORIZED METRICS
+# =====================================
+
+def grouped_metrics(group_ids, n_groups, y_true, y_pred):
+
+    err = y_pred - y_true
+
+    count = np.bincount(group_ids, minlength=n_groups)
+    sse = np.bincount(group_ids, weights=err ** 2, minlength=n_groups)
+    sae = np.bincount(group_ids, weights=np.abs(err), minlength=n_groups)
+    se = np.bincount(group_ids, weights=err, minlength=n_groups)
+    sy = np.bincount(group_ids, weights=np.abs(y_true), minlength=n_groups)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "rmse": np.sqrt(sse / count),
+            "mae": sae / count,
+            "wape": sae / sy * 100,
+            "bias": se / count,
+        }
+
+
+def summarize_folds(results, stations, n_folds):
+
+    n_stations = len(stations)
+    fold_groups = n_stations * n_folds
+
+    station_idx = np.concatenate([np.full(len(r[2]), r[0]) for r in results])
+    fold_idx = np.concatenate([np.full(len(r[2]), r[1]) for r in results])
+    y_true = np.concatenate([r[2] for r in results]).astype(np.float64)
+    y_pred = np.concatenate([r[3] for r in results]).astype(np.float64)
+    hour = np.concatenate([r[4] for r in results])
+
+    # Fold groups and hour-of-day groups share one id space, so every metric
+    # for every group comes out of a single set of bincounts
+    group_ids = np.concatenate([
+        station_idx * n_folds + fold_idx,
+        fold_groups + station_idx * 24 + hour,
+    ])
+    metrics = grouped_metrics(group_ids, fold_groups + n_stations * 24,
+                              np.tile(y_true, 2), np.tile(y_pred, 2))
+
+    rows = []
+    for s, station in enumerate(stations):
+        for k in range(n_folds):
+            g = s * n_folds + k
+            rows.append({"station": station, "group": "fold", "step": k,
+                         **{m: metrics[m][g] for m in METRIC_NAMES}})
+        for h in range(24):
+            g = fold_groups + s * 24 + h
+            rows.append({"station": station, "group": "hour", "step": h,
+                         **{m: metrics[m][g] for m in METRIC_NAMES}})
+
+    return pd.DataFrame(rows)
+
+
+# =====================================
+# ENGINE
+# =====================================
+
+def run_backtest(feature_frames, n_folds=N_FOLDS, window="expanding",
+                 params=XGB_PARAMS, max_workers=None):
+
+    stations = list(feature_frames)
+    worker_params = {**params, "nthread": 1}
+
+    shm, shape, offsets = build_shared_matrix(feature_frames)
+
+    try:
+        tasks = []
+        for s, station in enumerate(stations):
+            start, end = offsets[station]
+            for k, (train_start, test_start, test_end) in enumerate(
+                rolling_origin_folds(end - start, n_folds, window)
+            ):
+                tasks.append((s, k, start + train_start, start + test_start,
+                              start + test_end, worker_params))
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            initializer=_attach_shared_matrix,
+            initargs=(shm.name, shape),
+        ) as pool:
+            results = list(pool.map(_run_fold, tasks))
+
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return summarize_folds(results, stations, n_folds)
+
+
+def log_backtest(summary, n_folds, window, params):
+
+    timestamp = int(time.time() * 1000)
+
+    metrics = [
+        Metric(f"{row.station}_{row.group}_{name}", float(getattr(row, name)), timestamp, int(row.step))
+        for row in summary.itertuples()
+        for name in METRIC_NAMES
+        if np.isfinite(getattr(row, name))
+    ]
+
+    run_params = [Param(k, str(v)) for k, v in params.items()]
+    run_params += [Param("folds", str(n_folds)), Param("window", window)]
+
+    MlflowClient().log_batch(mlflow.active_run().info.run_id,
+                             metrics=metrics, params=run_params)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the station models")
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--window", choices=["expanding", "sliding"], default="expanding")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    bucket_frames = bucket_fleet({
+        station: load_station_export(path)
+        for station, path in STATION_FILES.items()
+    })
+    feature_frames = {
+        station: add_bucket_features(bucket_df)
+        for station, bucket_df in bucket_frames.items()
+    }
+
+    mlflow.set_experiment("dot_prediction")
+
+    with mlflow.start_run(run_name=f"backtest_{args.window}"):
+
+        summary = run_backtest(feature_frames, args.folds, args.window,
+                               max_workers=args.workers)
+
+        print(summary[summary["group"] == "fold"].to_string(index=False))
+
+        log_backtest(summary, args.folds, args.window, XGB_PARAMS)
@@ -0,0 +1,141 @@
+import numpy as np
+
+# =====================================
+# SEASONAL BASELINE (CASCADE TIER 1)
+# =====================================
+
+# Kept free of training-only imports so serving can ship this file alone
+
+HOURS_PER_WEEK = 7 * 24
+BUCKET_MINUTES = 15
+
+# Recent bucket totals the linear term looks at (lag_k = bucket t - k)
+BASELINE_LAGS = [1, 2, 3, 4]
+RIDGE = 1.0
+
+# Escalate to the booster when the ~90% band is wider than BAND_RATIO x
+# the station's mean bucket, or when the last bucket sits DEVIATION_Z
+# sigmas away from its seasonal mean
+BAND_Z = 1.64
+BAND_RATIO = 1.0
+DEVIATION_Z = 3.0
+
+
+def to_minutes(timestamps):
+    # Minutes since 1970-01-01, without going through pandas per call
+    return np.atleast_1d(np.asarray(timestamps, dtype="datetime64[m]")).astype(np.int64)
+
+
+def hour_of_week(minutes):
+    # Monday 00:00 = 0; 1970-01-01 was a Thursday
+    hours = np.asarray(minutes, dtype=np.int64) // 60
+    return (hours // 24 + 3) % 7 * 24 + hours % 24
+
+
+def lag_deviations(means, starts, lags):
+
+    # lags[:, j] is bucket t - BASELINE_LAGS[j] of each row's open bucket t
+    # (starts: minutes); subtract that bucket's seasonal mean (means: (n, 168))
+    how = np.stack([hour_of_week(starts - BUCKET_MINUTES * k) for k in BASELINE_LAGS], axis=1)
+
+    return lags - means[np.arange(len(lags))[:, None], how]
+
+
+class SeasonalBaseline:
+
+    # Per station s: mean[s, how] and sigma[s, how] over hour-of-week, plus
+    # beta[s] on the lags' deviations from their own seasonal means:
+    #   pred = mean[s, how(t+1)] + beta[s] . (lag_k - mean[s, how(t-k)])
+    # Every array is (stations, 168) or smaller, and scoring is indexing.
+
+    def __init__(self, station_ids, mean, sigma, beta, mean_bucket):
+
+        self.station_ids = [str(s) for s in station_ids]
+        self.index = {s: i for i, s in enumerate(self.station_ids)}
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.sigma = np.asarray(sigma, dtype=np.float64)
+        self.beta = np.asarray(beta, dtype=np.float64)
+        self.mean_bucket = np.asarray(mean_bucket, dtype=np.float64)
+
+    # ---------------------------------
+    # Fit
+    # ---------------------------------
+
+    @classmethod
+    def fit(cls, frames):
+
+        # frames: {station: add_bucket_features frame} (bucket_start, lag_k,
+        # target = next bucket); fit on training rows only
+        station_ids = sorted(frames)
+        n = len(station_ids)
+
+        mean = np.zeros((n, HOURS_PER_WEEK))
+        sigma = np.zeros((n, HOURS_PER_WEEK))
+        beta = np.zeros((n, len(BASELINE_LAGS)))
+        mean_bucket = np.zeros(n)
+
+        for i, s in enumerate(station_ids):
+            df = frames[s]
+            starts = to_minutes(df["bucket_start"])
+            target_how = hour_of_week(starts + BUCKET_MINUTES)
+            y = df["target"].to_numpy(dtype=np.float64)
+
+            mean_bucket[i] = y.mean()
+            sums = np.bincount(target_how, weights=y, minlength=HOURS_PER_WEEK)
+            counts = np.bincount(target_how, minlength=HOURS_PER_WEEK)
+            mean[i] = np.where(counts > 0, sums / np.maximum(counts, 1), mean_bucket[i])
+
+            x = lag_deviations(np.broadcast_to(mean[i], (len(df), HOURS_PER_WEEK)),
+                               starts,
+                               df[[f"lag_{k}" for k in BASELINE_LAGS]].to_numpy(dtype=np.float64))
+            r = y - mean[i][target_how]
+
+            beta[i] = np.linalg.solve(x.T @ x + RIDGE * np.eye(x.shape[1]), x.T @ r)
+
+            resid = r - x @ beta[i]
+            sq = np.bincount(target_how, weights=resid ** 2, minlength=HOURS_PER_WEEK)
+            overall = np.sqrt(np.mean(resid ** 2))
+            sigma[i] = np.where(counts > 1, np.sqrt(sq / np.maximum(counts, 1)), overall)
+
+        return cls(station_ids, mean, sigma, beta, mean_bucket)
+
+    # ---------------------------------
+    # Persistence
+    # ---------------------------------
+
+    def save(self, path):
+        np.savez_compressed(path, station_ids=np.array(self.station_ids), mean=self.mean,
+                            sigma=self.sigma, beta=self.beta, mean_bucket=self.mean_bucket)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["station_ids"], data["mean"], data["sigma"], data["beta"],
+                       data["mean_bucket"])
+
+    # ---------------------------------
+    # Scoring
+    # ---------------------------------
+
+    def predict(self, station_idx, bucket_start, lags, band_ratio=BAND_RATIO,
+                deviation_z=DEVIATION_Z):
+
+        # Vectorized over rows: station_idx (n,), bucket_start (n,) open
+        # bucket starts (datetimes), lags (n, len(BASELINE_LAGS)). Returns (pred, band
+        # half-width, escalate mask)
+        station_idx = np.atleast_1d(np.asarray(station_idx, dtype=np.int64))
+        starts = to_minutes(bucket_start)
+        target_how = hour_of_week(starts + BUCKET_MINUTES)
+        lag1_how = hour_of_week(starts - BUCKET_MINUTES)
+
+        means = self.mean[station_idx]
+        x = lag_deviations(means, starts, np.atleast_2d(np.asarray(lags, dtype=np.float64)))
+
+        pred = np.maximum(means[np.arange(len(station_idx)), target_how]
+                          + np.einsum("ij,ij->i", x, self.beta[station_idx]), 0.0)
+        band = BAND_Z * self.sigma[station_idx, target_how]
+
+        deviation = np.abs(x[:, 0]) / np.maximum(self.sigma[station_idx, lag1_how], 1e-6)
+        escalate = (band > band_ratio * self.mean_bucket[station_idx]) | (deviation > deviation_z)
+
+        return pred, band, escalate
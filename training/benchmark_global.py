@@ -0,0 +1,155 @@
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import mlflow
+
+from training.fleet_bucketing import bucket_fleet
+from training.global_station import (
+    GLOBAL_FEATURE_COLS,
+    GLOBAL_PARAMS,
+    build_global_frames,
+    evaluate_by_station,
+    fit_booster,
+    train_local_models,
+)
+from training.station_data import (
+    FEATURE_COLS,
+    STATION_FILES,
+    load_station_export,
+)
+from training.tracking import RunLogger
+
+# =====================================
+# GLOBAL vs PER-STATION SCALING BENCHMARK
+# =====================================
+
+FLEET_SIZES = [3, 30, 300]
+
+
+def synthesize_fleet(bucket_frames, n_stations, seed=42):
+
+    # Real stations first, then scaled / weekday-shifted / noisy copies of them
+    rng = np.random.default_rng(seed)
+    bases = [bucket_frames[s] for s in sorted(bucket_frames)]
+
+    fleet = {}
+    for i in range(n_stations):
+        base = bases[i % len(bases)]
+        values = base["sales_15min"].to_numpy()
+
+        if i >= len(bases):
+            shift = int(rng.integers(0, 7)) * 96
+            scale = rng.lognormal(0.0, 0.35)
+            noise = rng.gamma(20.0, 1 / 20.0, size=len(values))
+            values = np.roll(values, shift) * scale * noise
+
+        fleet[f"station_{i:04d}"] = pd.DataFrame({
+            "bucket_start": base["bucket_start"],
+            "sales_15min": values,
+        })
+
+    return fleet
+
+
+def rss_mb():
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def serving_memory_mb(models, sample):
+
+    # Reload from serialized bytes, as a serving process would, and measure
+    # the resident memory it takes to hold every booster ready to predict
+    raw = [model.save_raw("ubj") for model in models]
+
+    before = rss_mb()
+    loaded = [xgb.Booster(model_file=bytearray(r)) for r in raw]
+    for booster in loaded:
+        booster.predict(sample)
+    after = rss_mb()
+
+    return after - before, sum(len(r) for r in raw) / 1e6
+
+
+def run_benchmark(fleet_sizes=FLEET_SIZES):
+
+    real = bucket_fleet({
+        station: load_station_export(path)
+        for station, path in STATION_FILES.items()
+    })
+
+    results = []
+
+    for n_stations in fleet_sizes:
+
+        fleet = synthesize_fleet(real, n_stations)
+        train_frame, test_frame, _ = build_global_frames(fleet)
+
+        start = time.perf_counter()
+        global_model, _ = fit_booster(GLOBAL_PARAMS, train_frame, test_frame,
+                                      GLOBAL_FEATURE_COLS)
+        global_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        local_models = train_local_models(train_frame, test_frame)
+        local_seconds = time.perf_counter() - start
+
+        global_metrics = evaluate_by_station(global_model, test_frame, GLOBAL_FEATURE_COLS)
+        local_metrics = {
+            station: evaluate_by_station(
+                model, test_frame[test_frame["station"] == station], FEATURE_COLS
+            )[station]
+            for station, model in local_models.items()
+        }
+
+        global_sample = xgb.DMatrix(test_frame[GLOBAL_FEATURE_COLS].head(1),
+                                    enable_categorical=True)
+        local_sample = xgb.DMatrix(test_frame[FEATURE_COLS].head(1))
+
+        global_rss, global_bytes = serving_memory_mb([global_model], global_sample)
+        local_rss, local_bytes = serving_memory_mb(list(local_models.values()), local_sample)
+
+        results.append({
+            "stations": n_stations,
+            "global_train_s": global_seconds,
+            "local_train_s": local_seconds,
+            "global_mean_wape": np.mean([m["wape"] for m in global_metrics.values()]),
+            "local_mean_wape": np.mean([m["wape"] for m in local_metrics.values()]),
+            "global_serving_mb": global_rss,
+            "local_serving_mb": local_rss,
+            "global_model_mb": global_bytes,
+            "local_model_mb": local_bytes,
+        })
+
+        print(pd.DataFrame(results).to_string(index=False))
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+
+    fleet_sizes = [int(n) for n in sys.argv[1:]] or FLEET_SIZES
+
+    mlflow.set_experiment("dot_prediction")
+
+    with mlflow.start_run(run_name="global_vs_local_benchmark"):
+        report = run_benchmark(fleet_sizes)
+
+        run_logger = RunLogger()
+
+        for row in report.to_dict("records"):
+            run_logger.log_metrics({name: value for name, value in row.items() if name != "stations"},
+                                   step=int(row["stations"]))
+
+        run_logger.log_text(report.to_csv(index=False), "global_vs_local_benchmark.csv")
+        run_logger.close()
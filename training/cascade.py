@@ -0,0 +1,215 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import mlflow
+
+from training.baseline import BASELINE_LAGS, BAND_RATIO, DEVIATION_Z, SeasonalBaseline
+from training.global_station import GLOBAL_FEATURE_COLS, MODEL_NAME as GLOBAL_MODEL_NAME
+from training.materialize_forecasts import load_registered, station_histories
+from training.station_data import add_bucket_features, regression_metrics, split_train_test
+from training.tracking import RunLogger
+
+# =====================================
+# TIERED INFERENCE CASCADE: OFFLINE EVALUATION
+# =====================================
+
+# Seasonal baseline first, the global booster only for escalated rows.
+# Reports escalation rate, per-row latency of each tier and accuracy of
+# baseline-only, booster-only and cascade on each station's test split.
+
+BASELINE_ARTIFACT = "baseline/seasonal_baseline.npz"
+
+BAND_RATIO_SWEEP = [0.5, 0.75, 1.0, 1.5, 2.0, 3.0]
+OVERNIGHT_HOURS = range(0, 6)
+
+LATENCY_SAMPLES = 200
+
+
+# =====================================
+# 1. FRAMES
+# =====================================
+
+def station_splits(histories):
+
+    # {station: (train, test)} of add_bucket_features frames
+    return {s: split_train_test(add_bucket_features(df)) for s, df in histories.items()}
+
+
+def test_matrix(splits, profiles, baseline):
+
+    # Stacked test rows of the stations both tiers know
+    parts = []
+    for s in sorted(splits):
+        if s not in profiles or s not in baseline.index:
+            continue
+        part = splits[s][1].copy()
+        part["station"] = s
+        part["station_idx"] = baseline.index[s]
+        for col, value in profiles[s].items():
+            part[col] = value
+        parts.append(part)
+
+    frame = pd.concat(parts, ignore_index=True)
+    frame["station_code"] = pd.Categorical(frame["station_code"].astype(int),
+                                           categories=list(range(len(profiles))))
+
+    return frame
+
+
+# =====================================
+# 2. SCORE BOTH TIERS
+# =====================================
+
+def score_tiers(model, baseline, frame, band_ratio=BAND_RATIO, deviation_z=DEVIATION_Z):
+
+    lags = frame[[f"lag_{k}" for k in BASELINE_LAGS]].to_numpy(dtype=np.float64)
+    base_pred, band, escalate = baseline.predict(frame["station_idx"], frame["bucket_start"], lags,
+                                                 band_ratio, deviation_z)
+
+    booster_pred = model.predict(xgb.DMatrix(frame[GLOBAL_FEATURE_COLS], enable_categorical=True))
+
+    return base_pred, booster_pred, escalate
+
+
+def row_latency_ms(model, baseline, frame, n=LATENCY_SAMPLES, seed=42):
+
+    # One request at a time, as serving scores them
+    rows = np.random.default_rng(seed).choice(len(frame), size=min(n, len(frame)), replace=False)
+    lag_cols = [f"lag_{k}" for k in BASELINE_LAGS]
+
+    start = time.perf_counter()
+    for r in rows:
+        row = frame.iloc[[r]]
+        baseline.predict(row["station_idx"], row["bucket_start"], row[lag_cols].to_numpy())
+    baseline_ms = 1000 * (time.perf_counter() - start) / len(rows)
+
+    start = time.perf_counter()
+    for r in rows:
+        row = frame.iloc[[r]]
+        model.predict(xgb.DMatrix(row[GLOBAL_FEATURE_COLS], enable_categorical=True))
+    booster_ms = 1000 * (time.perf_counter() - start) / len(rows)
+
+    return baseline_ms, booster_ms
+
+
+def cascade_report(frame, base_pred, booster_pred, escalate, baseline_ms, booster_ms):
+
+    y = frame["target"].to_numpy()
+    cascade_pred = np.where(escalate, booster_pred, base_pred)
+    overnight = frame["bucket_start"].dt.hour.isin(OVERNIGHT_HOURS).to_numpy()
+
+    escalation_rate = float(escalate.mean())
+    cascade_ms = baseline_ms + escalation_rate * booster_ms
+
+    report = {
+        "rows": len(frame),
+        "escalation_rate": escalation_rate,
+        "overnight_escalation_rate": float(escalate[overnight].mean()) if overnight.any() else None,
+        "zero_target_pct": float((y == 0).mean() * 100),
+        "baseline_ms": baseline_ms,
+        "booster_ms": booster_ms,
+        "cascade_ms": cascade_ms,
+        "latency_saved_pct": 100 * (1 - cascade_ms / booster_ms),
+    }
+
+    tiers = {"baseline": base_pred, "booster": booster_pred, "cascade": cascade_pred}
+    for name, pred in tiers.items():
+        for metric, value in regression_metrics(y, pred).items():
+            report[f"{name}_{metric}"] = value
+
+    report["cascade_mae_delta"] = report["cascade_mae"] - report["booster_mae"]
+
+    return report
+
+
+def band_ratio_sweep(model, baseline, frame, booster_pred, ratios=BAND_RATIO_SWEEP):
+
+    # Escalation rate vs accuracy trade-off; the booster scores are reused
+    y = frame["target"].to_numpy()
+    lags = frame[[f"lag_{k}" for k in BASELINE_LAGS]].to_numpy(dtype=np.float64)
+
+    rows = []
+    for ratio in ratios:
+        base_pred, _, escalate = baseline.predict(frame["station_idx"], frame["bucket_start"],
+                                                  lags, band_ratio=ratio)
+        cascade = np.where(escalate, booster_pred, base_pred)
+        rows.append({"band_ratio": ratio, "escalation_rate": float(escalate.mean()),
+                     "mae": float(np.mean(np.abs(y - cascade)))})
+
+    return pd.DataFrame(rows)
+
+
+# =====================================
+# RUN
+# =====================================
+
+def evaluate_cascade(store_root=None, model_name=GLOBAL_MODEL_NAME, band_ratio=BAND_RATIO):
+
+    histories = station_histories(store_root)
+    splits = station_splits(histories)
+
+    baseline = SeasonalBaseline.fit({s: train for s, (train, _) in splits.items()})
+
+    model, model_version = load_registered(model_name)
+    profiles = mlflow.artifacts.load_dict(f"runs:/{model_version.run_id}/station_profiles.json")
+
+    frame = test_matrix(splits, profiles, baseline)
+
+    base_pred, booster_pred, escalate = score_tiers(model, baseline, frame, band_ratio)
+    baseline_ms, booster_ms = row_latency_ms(model, baseline, frame)
+
+    report = cascade_report(frame, base_pred, booster_pred, escalate, baseline_ms, booster_ms)
+    sweep = band_ratio_sweep(model, baseline, frame, booster_pred)
+
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    print(sweep.to_string(index=False))
+
+    with mlflow.start_run(run_name="cascade_baseline"):
+
+        run_logger = RunLogger()
+
+        run_logger.log_params({"booster": f"{model_name}/{model_version.version}",
+                               "band_ratio": band_ratio, "deviation_z": DEVIATION_Z,
+                               "baseline_lags": BASELINE_LAGS})
+        run_logger.log_metrics({k: v for k, v in report.items() if v is not None})
+
+        for step, row in sweep.iterrows():
+            run_logger.log_metric("sweep_escalation_rate", row["escalation_rate"], step=step)
+            run_logger.log_metric("sweep_mae", row["mae"], step=step)
+
+        # Serving loads this file (BASELINE_PATH). close() waits for the
+        # upload, so the directory outlives it
+        with tempfile.TemporaryDirectory(prefix="baseline_") as baseline_dir:
+            baseline_path = os.path.join(baseline_dir, os.path.basename(BASELINE_ARTIFACT))
+            baseline.save(baseline_path)
+            run_logger.log_artifact(baseline_path, os.path.dirname(BASELINE_ARTIFACT))
+
+            run_logger.close()
+
+    return baseline, report, sweep
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Fit the seasonal baseline and evaluate the cascade")
+    parser.add_argument("--store", default=None, help="raw/rollup store root (default: exports)")
+    parser.add_argument("--model", default=GLOBAL_MODEL_NAME)
+    parser.add_argument("--band-ratio", type=float, default=BAND_RATIO)
+    parser.add_argument("--save", default=None, help="also write the baseline .npz here")
+    args = parser.parse_args()
+
+    mlflow.set_tracking_uri(
+        os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
+    )
+    mlflow.set_experiment("dot_prediction")
+
+    baseline, _, _ = evaluate_cascade(args.store, args.model, args.band_ratio)
+
+    if args.save:
+        baseline.save(args.save)
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+
+import numpy as np
+import xgboost as xgb
+
+from training.station_data import (
+    BUCKET_FREQ,
+    FEATURE_COLS,
+    LAG_LIST,
+    OUTLIER_QUANTILE,
+    ROLLING_WINDOWS,
+    TRAIN_FRACTION,
+    add_bucket_features,
+    bucket_station_sales,
+    load_station_export,
+    split_train_test,
+)
+
+# =====================================
+# CONTENT-HASH CACHE OF PREPARED SPLITS
+# =====================================
+
+CACHE_DIR = os.getenv("DMATRIX_CACHE_DIR", ".dmatrix_cache")
+
+ARRAY_NAMES = ("X_train", "y_train", "X_valid", "y_valid")
+
+# Bump when the bucketing / feature code changes in a way the spec below
+# does not capture
+CACHE_VERSION = 1
+
+
+def file_digest(path, chunk_size=1 << 20):
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def split_cache_key(data_path, train_fraction=TRAIN_FRACTION):
+
+    spec = {
+        "version": CACHE_VERSION,
+        "source": file_digest(data_path),
+        "feature_cols": FEATURE_COLS,
+        "lags": LAG_LIST,
+        "rolling_windows": ROLLING_WINDOWS,
+        "bucket_freq": BUCKET_FREQ,
+        "outlier_quantile": OUTLIER_QUANTILE,
+        "train_fraction": train_fraction,
+    }
+
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def load_split(key, cache_dir=CACHE_DIR):
+
+    path = os.path.join(cache_dir, key)
+    if not os.path.isdir(path):
+        return None
+
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+
+    # Memory-mapped: nothing is read until XGBoost touches the pages
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        for name in ARRAY_NAMES
+    }
+
+    return arrays, meta
+
+
+def save_split(key, arrays, meta, cache_dir=CACHE_DIR):
+
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Write into a sibling temp dir and rename, so concurrent runs never see
+    # a half-written entry
+    staging = tempfile.mkdtemp(dir=cache_dir, prefix=f".{key[:12]}_")
+    for name in ARRAY_NAMES:
+        np.save(os.path.join(staging, f"{name}.npy"),
+                np.ascontiguousarray(arrays[name], dtype=np.float32))
+
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    try:
+        os.rename(staging, os.path.join(cache_dir, key))
+    except OSError:
+        # Another process stored the same key first
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def split_arrays(train_data, test_data, feature_cols=FEATURE_COLS):
+
+    return {
+        "X_train": train_data[feature_cols].to_numpy(dtype=np.float32),
+        "y_train": train_data["target"].to_numpy(dtype=np.float32),
+        "X_valid": test_data[feature_cols].to_numpy(dtype=np.float32),
+        "y_valid": test_data["target"].to_numpy(dtype=np.float32),
+    }
+
+
+def to_dmatrices(arrays, feature_names=FEATURE_COLS, quantile=False):
+
+    if quantile:
+        dtrain = xgb.QuantileDMatrix(arrays["X_train"], label=arrays["y_train"],
+                                     feature_names=feature_names)
+        dvalid = xgb.QuantileDMatrix(arrays["X_valid"], label=arrays["y_valid"],
+                                     feature_names=feature_names, ref=dtrain)
+    else:
+        dtrain = xgb.DMatrix(arrays["X_train"], label=arrays["y_train"],
+                             feature_names=feature_names)
+        dvalid = xgb.DMatrix(arrays["X_valid"], label=arrays["y_valid"],
+                             feature_names=feature_names)
+
+    return dtrain, dvalid
+
+
+def cached_station_split(data_path, train_fraction=TRAIN_FRACTION, stage=None):
+
+    # stage: optional name -> context manager wrapped around each step
+    # (e.g. StageProfiler.stage)
+    stage = stage or (lambda name: nullcontext())
+
+    with stage("cache_lookup"):
+        key = split_cache_key(data_path, train_fraction)
+        cached = load_split(key)
+    if cached is not None:
+        return cached[0], cached[1], True
+
+    with stage("load_csv"):
+        df = load_station_export(data_path)
+
+    with stage("bucketing"):
+        bucket_df = bucket_station_sales(df)
+
+    with stage("lag_features"):
+        train_df = add_bucket_features(bucket_df)
+
+    with stage("split"):
+        train_data, test_data = split_train_test(train_df, train_fraction)
+        arrays = split_arrays(train_data, test_data)
+
+    meta = {
+        "raw_rows": len(df),
+        "total_buckets": len(bucket_df),
+        "zero_bucket_pct": float((bucket_df["sales_15min"] == 0).mean() * 100),
+        "usable_rows": len(train_df),
+    }
+
+    with stage("cache_store"):
+        save_split(key, arrays, meta)
+
+    return arrays, meta, False
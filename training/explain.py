@@ -0,0 +1,135 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+# =====================================
+# BATCHED TREESHAP EXPLANATIONS
+# =====================================
+
+# Kept free of training-only imports so serving can ship this file alone
+
+TOP_K = 5
+CACHE_SIZE = 200_000
+
+# Rows per pred_contribs call when precomputing a whole forecast table
+PRECOMPUTE_BATCH = 4096
+
+
+def top_k_contributions(contribs, values, feature_cols, k=TOP_K):
+
+    # contribs: (n, F + 1) from pred_contribs, last column the bias.
+    # Compact form per row: bias, margin, [[feature, value, contribution], ...]
+    n_features = len(feature_cols)
+    k = min(k, n_features)
+
+    order = np.argsort(-np.abs(contribs[:, :n_features]), axis=1, kind="stable")[:, :k]
+    margins = contribs.sum(axis=1)
+
+    return [
+        {
+            "bias": float(contribs[r, -1]),
+            "margin": float(margins[r]),
+            "top": [[feature_cols[j], float(values[r, j]), float(contribs[r, j])] for j in order[r]],
+        }
+        for r in range(len(contribs))
+    ]
+
+
+def top_k_interactions(interactions, feature_cols, k=TOP_K):
+
+    # interactions: (n, F + 1, F + 1) from pred_interactions; the strongest
+    # off-diagonal pairs (each pair once, value doubled as it is split in two)
+    n_features = len(feature_cols)
+    upper_i, upper_j = np.triu_indices(n_features, k=1)
+    pairs = 2 * interactions[:, upper_i, upper_j]
+
+    k = min(k, len(upper_i))
+    order = np.argsort(-np.abs(pairs), axis=1, kind="stable")[:, :k]
+
+    return [
+        [[feature_cols[upper_i[p]], feature_cols[upper_j[p]], float(pairs[r, p])] for p in order[r]]
+        for r in range(len(pairs))
+    ]
+
+
+class ExplanationCache:
+
+    # LRU keyed on (model version, bucket, station, kind, table); shared by the
+    # request path and the background precompute thread
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put_many(self, items):
+
+        with self._lock:
+            for key, value in items:
+                self._items[key] = value
+                self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+class Explainer:
+
+    # One booster; rows come as a float matrix in `columns` order (e.g. the
+    # forecast table's feature rows) and are narrowed to the model's own
+    # features. Contributions are on the margin scale (log for tweedie).
+
+    def __init__(self, booster, columns, categories=None):
+
+        self.booster = booster
+        self.feature_cols = list(booster.feature_names or columns)
+        self.positions = [list(columns).index(c) for c in self.feature_cols]
+        self.categories = {c: n for c, n in (categories or {}).items() if c in self.feature_cols}
+
+    def matrix(self, rows):
+
+        values = np.asarray(rows, dtype=np.float32)[:, self.positions]
+        frame = pd.DataFrame(values, columns=self.feature_cols)
+
+        for col, n in self.categories.items():
+            frame[col] = pd.Categorical(frame[col].astype(int), categories=list(range(n)))
+
+        return values, xgb.DMatrix(frame, enable_categorical=True)
+
+    def explain(self, rows, k=TOP_K, interactions=False):
+
+        # One booster call for the whole batch
+        values, dmatrix = self.matrix(rows)
+
+        contribs = self.booster.predict(dmatrix, pred_contribs=True)
+        out = top_k_contributions(contribs, values, self.feature_cols, k)
+
+        if interactions:
+            pairs = top_k_interactions(self.booster.predict(dmatrix, pred_interactions=True),
+                                       self.feature_cols, k)
+            for row, row_pairs in zip(out, pairs):
+                row["interactions"] = row_pairs
+
+        return out
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+from training.station_data import BUCKET_FREQ, OUTLIER_QUANTILE
+
+# =====================================
+# MULTI-STATION CUMULATIVE → 15-MIN BUCKETS
+# =====================================
+
+# Same steps as station_data.bucket_station_sales (diff, clamp refill resets,
+# floor, sum, cap at the 0.995 quantile, fill gaps), but for every station in
+# one pass over a single station-keyed array instead of one groupby each.
+
+
+def _group_starts(keys):
+
+    # Index of the first element of every run of equal keys in a sorted array
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def _grouped_quantile(values, groups, n_groups, q):
+
+    # Linear-interpolated quantile per group (pandas' default), vectorized by
+    # sorting values within groups and indexing into each group's slice
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+
+    counts = np.bincount(groups, minlength=n_groups)
+    offsets = np.r_[0, np.cumsum(counts)[:-1]]
+
+    # Groups without any values get NaN
+    quantiles = np.full(n_groups, np.nan)
+    present = counts > 0
+    counts, offsets = counts[present], offsets[present]
+
+    pos = q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, counts - 1)
+    frac = pos - lo
+
+    lower = sorted_values[offsets + lo]
+    upper = sorted_values[offsets + hi]
+    quantiles[present] = lower + frac * (upper - lower)
+
+    return quantiles
+
+
+def bucket_fleet_arrays(station_codes, timestamps_ns, values, n_stations,
+                        freq=BUCKET_FREQ, quantile=OUTLIER_QUANTILE):
+
+    # Inputs are flat arrays over all stations' readings; the (station, time)
+    # sort is skipped when they already arrive in that order
+    same_station = station_codes[1:] == station_codes[:-1]
+    in_order = np.all(
+        (station_codes[1:] > station_codes[:-1])
+        | (same_station & (timestamps_ns[1:] >= timestamps_ns[:-1]))
+    )
+    if not in_order:
+        order = np.lexsort((timestamps_ns, station_codes))
+        station_codes = station_codes[order]
+        timestamps_ns = timestamps_ns[order]
+        values = values[order]
+
+    # 1. Cumulative totalizer → event sales, first reading of a station = 0
+    event_sale = np.empty(len(values))
+    event_sale[0] = 0.0
+    np.subtract(values[1:], values[:-1], out=event_sale[1:])
+    event_sale[_group_starts(station_codes)] = 0.0
+
+    # Refill resets (negative) and unreadable values (NaN) contribute nothing
+    event_sale[~(event_sale > 0)] = 0.0
+
+    # 2. Floor to buckets and sum each (station, bucket) run
+    bucket_ns = pd.Timedelta(freq).value
+    buckets = timestamps_ns // bucket_ns
+
+    run_starts = np.flatnonzero(np.r_[
+        True,
+        (buckets[1:] != buckets[:-1]) | (station_codes[1:] != station_codes[:-1])
+    ])
+    sums = np.add.reduceat(event_sale, run_starts)
+    sum_station = station_codes[run_starts]
+    sum_bucket = buckets[run_starts]
+
+    # 3. Cap outliers per station
+    caps = _grouped_quantile(sums, sum_station, n_stations, quantile)
+    sums = np.minimum(sums, caps[sum_station])
+
+    # 4. Fill missing buckets: each station spans [first, last] bucket
+    station_starts = _group_starts(sum_station)
+    first_bucket = sum_bucket[station_starts]
+    last_bucket = np.r_[sum_bucket[station_starts[1:] - 1], sum_bucket[-1]]
+    lengths = last_bucket - first_bucket + 1
+
+    out_offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    present = sum_station[station_starts]
+
+    offset_by_code = np.zeros(n_stations, dtype=np.int64)
+    first_by_code = np.zeros(n_stations, dtype=np.int64)
+    offset_by_code[present] = out_offsets
+    first_by_code[present] = first_bucket
+
+    sales = np.zeros(lengths.sum())
+    sales[offset_by_code[sum_station] + sum_bucket - first_by_code[sum_station]] = sums
+
+    out_station = np.repeat(present, lengths)
+    out_bucket = (
+        np.arange(len(sales)) - np.repeat(out_offsets, lengths) + np.repeat(first_bucket, lengths)
+    )
+
+    return out_station, out_bucket * bucket_ns, sales
+
+
+def bucket_fleet(exports, freq=BUCKET_FREQ, quantile=OUTLIER_QUANTILE):
+
+    # exports: {station: frame with timestamp / Value} as from
+    # station_data.load_station_export; returns {station: bucket_df}
+    stations = list(exports)
+    frames = [exports[s] for s in stations]
+
+    station_codes = np.repeat(np.arange(len(stations)), [len(f) for f in frames])
+    timestamps_ns = np.concatenate([
+        f["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64) for f in frames
+    ])
+    values = np.concatenate([f["Value"].to_numpy(dtype=np.float64) for f in frames])
+
+    out_station, out_ns, sales = bucket_fleet_arrays(
+        station_codes, timestamps_ns, values, len(stations), freq, quantile
+    )
+
+    # Hand back bucket_start in the resolution the exports were parsed at
+    unit = np.datetime_data(frames[0]["timestamp"].to_numpy().dtype)[0]
+    bucket_start = out_ns.view("datetime64[ns]").astype(f"datetime64[{unit}]")
+
+    bounds = np.searchsorted(out_station, np.arange(len(stations) + 1))
+
+    return {
+        station: pd.DataFrame({
+            "bucket_start": bucket_start[bounds[i]:bounds[i + 1]],
+            "sales_15min": sales[bounds[i]:bounds[i + 1]],
+        })
+        for i, station in enumerate(stations)
+        if bounds[i + 1] > bounds[i]
+    }
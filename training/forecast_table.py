@@ -0,0 +1,178 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# =====================================
+# MATERIALIZED NEXT-DAY FORECAST TABLE
+# =====================================
+
+# Kept free of training-only imports so serving can ship this file alone
+
+BUCKET_MINUTES = 15
+HORIZON_BUCKETS = 24 * 60 // BUCKET_MINUTES
+
+# A table older than this many buckets is reported as stale
+STALE_AFTER_BUCKETS = 2
+
+
+def bucket_minute(timestamp):
+    # Minutes since 1970-01-01 of the 15-min bucket holding timestamp
+    minute = int(np.datetime64(pd.Timestamp(timestamp).to_datetime64(), "m").astype(np.int64))
+    return minute // BUCKET_MINUTES * BUCKET_MINUTES
+
+
+class ForecastTable:
+
+    # values[i, h] is the forecast for station_ids[i], bucket
+    # first_bucket[i] + h * 15 min. A lookup is a dict hit plus an index.
+    # features[i, h] (optional) is the model input row behind values[i, h],
+    # in meta["feature_cols"] order, kept so forecasts can be explained.
+
+    def __init__(self, station_ids, first_bucket, values, meta=None, features=None):
+
+        self.station_ids = [str(s) for s in station_ids]
+        self.index = {s: i for i, s in enumerate(self.station_ids)}
+        self.first_bucket = np.asarray(first_bucket, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.meta = dict(meta or {})
+        self.features = None if features is None else np.asarray(features, dtype=np.float32)
+
+        if self.values.shape != (len(self.station_ids), HORIZON_BUCKETS):
+            raise ValueError(f"values shape {self.values.shape} != "
+                             f"{(len(self.station_ids), HORIZON_BUCKETS)}")
+
+    # ---------------------------------
+    # Persistence
+    # ---------------------------------
+
+    def to_frame(self):
+
+        n = len(self.station_ids)
+        minutes = self.first_bucket[:, None] + np.arange(HORIZON_BUCKETS) * BUCKET_MINUTES
+
+        frame = pd.DataFrame({
+            "station_id": np.repeat(np.asarray(self.station_ids, dtype=object), HORIZON_BUCKETS),
+            "bucket_start": pd.to_datetime(minutes.ravel(), unit="m"),
+            "horizon": np.tile(np.arange(1, HORIZON_BUCKETS + 1), n),
+            "forecast": self.values.ravel(),
+        })
+
+        if self.features is not None:
+            flat = self.features.reshape(n * HORIZON_BUCKETS, -1)
+            for j, col in enumerate(self.meta["feature_cols"]):
+                frame[f"x_{col}"] = flat[:, j]
+
+        return frame
+
+    def save(self, path):
+
+        # Written beside the target and swapped in, so readers never see a
+        # half-written table
+        tmp = path + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+        frame = self.to_frame()
+
+        if path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            table = table.replace_schema_metadata(
+                {**(table.schema.metadata or {}), b"forecast_meta": json.dumps(self.meta).encode()}
+            )
+            pq.write_table(table, tmp)
+        else:
+            frame["bucket_start"] = frame["bucket_start"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+
+            with sqlite3.connect(tmp) as conn:
+                feature_cols = "".join(f", {c} REAL" for c in frame.columns[4:])
+                conn.execute("CREATE TABLE forecasts (station_id TEXT, bucket_start TEXT, "
+                             f"horizon INTEGER, forecast REAL{feature_cols}, "
+                             "PRIMARY KEY (station_id, bucket_start))")
+                conn.executemany(f"INSERT INTO forecasts VALUES ({', '.join('?' * frame.shape[1])})",
+                                 frame.itertuples(index=False, name=None))
+                conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+                conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                                 [(k, json.dumps(v)) for k, v in self.meta.items()])
+            conn.close()
+
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path)
+            meta = json.loads(table.schema.metadata.get(b"forecast_meta", b"{}"))
+            frame = table.to_pandas()
+        else:
+            with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+                frame = pd.read_sql("SELECT * FROM forecasts ORDER BY station_id, horizon", conn)
+                meta = {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+            conn.close()
+            frame["bucket_start"] = pd.to_datetime(frame["bucket_start"])
+
+        return cls.from_frame(frame, meta)
+
+    @classmethod
+    def from_frame(cls, frame, meta=None):
+
+        frame = frame.sort_values(["station_id", "horizon"])
+        station_ids = frame["station_id"].to_numpy()[::HORIZON_BUCKETS]
+        minutes = frame["bucket_start"].to_numpy().astype("datetime64[m]").astype(np.int64)
+
+        features = None
+        feature_cols = (meta or {}).get("feature_cols")
+        if feature_cols and all(f"x_{c}" in frame for c in feature_cols):
+            features = frame[[f"x_{c}" for c in feature_cols]].to_numpy() \
+                .reshape(len(station_ids), HORIZON_BUCKETS, len(feature_cols))
+
+        return cls(station_ids, minutes[::HORIZON_BUCKETS],
+                   frame["forecast"].to_numpy().reshape(-1, HORIZON_BUCKETS), meta, features)
+
+    # ---------------------------------
+    # Lookups
+    # ---------------------------------
+
+    def position(self, station_id, bucket_start):
+
+        # (row, horizon index), or None outside the station's materialized day
+        i = self.index[station_id]
+        h = (bucket_minute(bucket_start) - self.first_bucket[i]) // BUCKET_MINUTES
+
+        return (i, h) if 0 <= h < HORIZON_BUCKETS else None
+
+    def lookup(self, station_id, bucket_start):
+
+        pos = self.position(station_id, bucket_start)
+        return None if pos is None else float(self.values[pos])
+
+    def station(self, station_id):
+
+        i = self.index[station_id]
+        minutes = self.first_bucket[i] + np.arange(HORIZON_BUCKETS) * BUCKET_MINUTES
+
+        return {
+            "bucket_start": [str(t) for t in pd.to_datetime(minutes, unit="m")],
+            "forecast": self.values[i].tolist(),
+        }
+
+    def freshness(self, now=None):
+
+        now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+        generated_at = pd.Timestamp(self.meta["generated_at"]) if "generated_at" in self.meta else None
+        age_s = None if generated_at is None else (now - generated_at).total_seconds()
+
+        return {
+            **{k: v for k, v in self.meta.items() if k not in ("feature_cols", "categories")},
+            "stations": len(self.station_ids),
+            "age_s": age_s,
+            "stale": age_s is None or age_s > STALE_AFTER_BUCKETS * BUCKET_MINUTES * 60,
+        }
@@ -0,0 +1,259 @@
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import mlflow
+
+from training.fleet_bucketing import bucket_fleet
+from training.station_data import (
+    FEATURE_COLS,
+    STATION_FILES,
+    XGB_PARAMS,
+    add_bucket_features,
+    load_station_export,
+    regression_metrics,
+    split_train_test,
+)
+from training.tracking import RunLogger
+
+# =====================================
+# GLOBAL (CROSS-STATION) MODEL CONFIG
+# =====================================
+
+MODEL_NAME = "xgb_station_global"
+
+STATION_FEATURE_COLS = [
+    "station_code",
+    "station_mean_daily",
+    "station_weekend_multiplier",
+    "station_mean_bucket",
+    "station_zero_bucket_pct",
+]
+
+GLOBAL_FEATURE_COLS = FEATURE_COLS + STATION_FEATURE_COLS
+
+# station_code is a categorical split feature, which needs the hist tree method
+GLOBAL_PARAMS = {**XGB_PARAMS, "tree_method": "hist"}
+
+
+# =====================================
+# STATION PROFILE (STATIC FEATURES)
+# =====================================
+
+def station_profile(bucket_df, until):
+
+    # Only history before the test boundary, so the profile never sees the
+    # period it is evaluated on
+    history = bucket_df[bucket_df["bucket_start"] < until]
+
+    daily = history.groupby(history["bucket_start"].dt.normalize())["sales_15min"].sum()
+    weekend = daily.index.dayofweek >= 5
+
+    weekday_mean = daily[~weekend].mean()
+    weekend_mean = daily[weekend].mean()
+
+    if weekday_mean > 0 and not np.isnan(weekend_mean):
+        weekend_multiplier = weekend_mean / weekday_mean
+    else:
+        weekend_multiplier = 1.0
+
+    return {
+        "station_mean_daily": float(daily.mean()),
+        "station_weekend_multiplier": float(weekend_multiplier),
+        "station_mean_bucket": float(history["sales_15min"].mean()),
+        "station_zero_bucket_pct": float((history["sales_15min"] == 0).mean() * 100),
+    }
+
+
+# =====================================
+# STACK ALL STATIONS INTO ONE MATRIX
+# =====================================
+
+def build_global_frames(bucket_frames):
+
+    train_parts = []
+    test_parts = []
+    profiles = {}
+
+    for code, station in enumerate(sorted(bucket_frames)):
+
+        bucket_df = bucket_frames[station]
+
+        train_data, test_data = split_train_test(add_bucket_features(bucket_df))
+
+        profile = station_profile(bucket_df, test_data["bucket_start"].min())
+        profile["station_code"] = code
+        profiles[station] = profile
+
+        for part, parts in ((train_data, train_parts), (test_data, test_parts)):
+            part = part.copy()
+            part["station"] = station
+            for col, value in profile.items():
+                part[col] = value
+            parts.append(part)
+
+    train_frame = pd.concat(train_parts, ignore_index=True)
+    test_frame = pd.concat(test_parts, ignore_index=True)
+
+    categories = list(range(len(profiles)))
+    for frame in (train_frame, test_frame):
+        frame["station_code"] = pd.Categorical(frame["station_code"], categories=categories)
+
+    return train_frame, test_frame, profiles
+
+
+# =====================================
+# TRAIN / EVALUATE
+# =====================================
+
+def fit_booster(params, train_data, test_data, feature_cols, verbose_eval=False):
+
+    dtrain = xgb.DMatrix(train_data[feature_cols], label=train_data["target"],
+                         enable_categorical=True)
+    dtest = xgb.DMatrix(test_data[feature_cols], label=test_data["target"],
+                        enable_categorical=True)
+
+    model = xgb.train(
+        params,
+        dtrain,
+        num_boost_round=1200,
+        evals=[(dtrain, "train"), (dtest, "valid")],
+        early_stopping_rounds=50,
+        verbose_eval=verbose_eval
+    )
+
+    return model, dtest
+
+
+def evaluate_by_station(model, test_frame, feature_cols):
+
+    dtest = xgb.DMatrix(test_frame[feature_cols], enable_categorical=True)
+    preds = model.predict(dtest)
+
+    return {
+        station: regression_metrics(test_frame["target"].values[idx], preds[idx])
+        for station, idx in test_frame.groupby("station").indices.items()
+    }
+
+
+def train_local_models(train_frame, test_frame):
+
+    # Per-station boosters on exactly the same split, for side-by-side accuracy
+    models = {}
+    for station, test_data in test_frame.groupby("station"):
+        train_data = train_frame[train_frame["station"] == station]
+        models[station], _ = fit_booster(XGB_PARAMS, train_data, test_data, FEATURE_COLS)
+
+    return models
+
+
+def print_station_report(global_metrics, local_metrics=None):
+
+    print("\n==== PER-STATION METRICS ====")
+    header = f"{'station':<20}{'global_rmse':>12}{'global_wape':>12}"
+    if local_metrics:
+        header += f"{'local_rmse':>12}{'local_wape':>12}"
+    print(header)
+
+    for station, metrics in global_metrics.items():
+        line = f"{station:<20}{metrics['rmse']:>12.3f}{metrics['wape']:>12.2f}"
+        if local_metrics:
+            local = local_metrics[station]
+            line += f"{local['rmse']:>12.3f}{local['wape']:>12.2f}"
+        print(line)
+
+
+def train_global(station_files=STATION_FILES, compare=True):
+
+    with mlflow.start_run(run_name=MODEL_NAME):
+
+        # Metrics go out in log_batch calls and uploads in the background,
+        # so per-station metrics cost nothing on the training path
+        run_logger = RunLogger()
+
+        # =====================================
+        # 1-3. LOAD + BUCKET EVERY STATION
+        # =====================================
+
+        bucket_frames = bucket_fleet({
+            station: load_station_export(path)
+            for station, path in station_files.items()
+        })
+
+        train_frame, test_frame, profiles = build_global_frames(bucket_frames)
+
+        print("Stations:", len(profiles))
+        print("Global train rows:", len(train_frame))
+
+        run_logger.log_metrics({"stations": len(profiles),
+                                "usable_rows": len(train_frame) + len(test_frame)})
+
+
+        # =====================================
+        # 6. TRAIN ONE BOOSTER FOR THE FLEET
+        # =====================================
+
+        start = time.perf_counter()
+        model, dtest = fit_booster(GLOBAL_PARAMS, train_frame, test_frame,
+                                   GLOBAL_FEATURE_COLS, verbose_eval=100)
+        train_seconds = time.perf_counter() - start
+
+        run_logger.log_metric("train_seconds", train_seconds)
+
+
+        # =====================================
+        # 7. EVALUATION (OVERALL + PER STATION)
+        # =====================================
+
+        metrics = regression_metrics(test_frame["target"], model.predict(dtest))
+        run_logger.log_metrics(metrics)
+
+        global_metrics = evaluate_by_station(model, test_frame, GLOBAL_FEATURE_COLS)
+        for station, station_metrics in global_metrics.items():
+            run_logger.log_metrics({f"{station}_{name}": v for name, v in station_metrics.items()})
+
+        local_metrics = None
+        if compare:
+            start = time.perf_counter()
+            local_models = train_local_models(train_frame, test_frame)
+            run_logger.log_metric("local_train_seconds", time.perf_counter() - start)
+
+            local_metrics = {
+                station: evaluate_by_station(
+                    local_models[station],
+                    test_frame[test_frame["station"] == station],
+                    FEATURE_COLS
+                )[station]
+                for station in local_models
+            }
+            for station, station_metrics in local_metrics.items():
+                run_logger.log_metrics({f"{station}_local_{name}": v
+                                        for name, v in station_metrics.items()})
+
+        print_station_report(global_metrics, local_metrics)
+
+        run_logger.log_params(GLOBAL_PARAMS)
+
+        # Serving needs the station → code/profile mapping to build requests
+        run_logger.log_dict(profiles, "station_profiles.json")
+        run_logger.log_dict({"feature_cols": GLOBAL_FEATURE_COLS}, "feature_cols.json")
+
+        run_logger.log_model(
+            model,
+            artifact_path="model",
+            registered_model_name=MODEL_NAME
+        )
+
+        run_logger.close()
+
+        print("Global model saved and logged to MLflow.")
+
+    return model, profiles
+
+
+if __name__ == "__main__":
+
+    mlflow.set_experiment("dot_prediction")
+
+    train_global()
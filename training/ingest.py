@@ -0,0 +1,214 @@
+import argparse
+import csv
+import json
+import os
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from training.rollups import RollupPyramid
+from training.station_data import EXPORT_TIME_FORMAT
+
+# =====================================
+# INCREMENTAL EXPORT INGESTION
+# =====================================
+
+# Exports are newest first and overlap the previous day's. Each station
+# keeps a high-water mark (newest reading timestamp ingested); a file is
+# read from the top only until the first reading at or below the mark, so
+# a daily run parses the new rows and nothing else.
+
+STATE_FILE = "ingest_state.json"
+
+# Readings per POST to the serving feature engines
+POST_BATCH = 5000
+
+
+def station_id_from_path(path):
+    # data/GMPatel_40_sales.csv -> GMPatel_40
+    return os.path.splitext(os.path.basename(path))[0].removesuffix("_sales")
+
+
+def load_state(root):
+
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(root, state):
+
+    path = os.path.join(root, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def parse_value(text):
+    # "666.25" (csv) or "666.25 Kg." (txt export)
+    return float(text.split()[0])
+
+
+def read_new_readings(path, watermark=None):
+
+    # Newest-first rows above the watermark, returned oldest first.
+    # Returns (timestamps, values, rows_read, rows_skipped); the rows at or
+    # below the watermark are only counted, never parsed
+    with open(path, newline="", encoding="utf-8-sig") as f:
+
+        header = f.readline()
+        delimiter = "\t" if "\t" in header else ","
+        columns = next(csv.reader([header], delimiter=delimiter))
+        time_col, value_col = columns.index("Time"), columns.index("Value")
+
+        times, values = [], []
+        rows_skipped = 0
+
+        for row in csv.reader(f, delimiter=delimiter):
+            if not row:
+                continue
+
+            ts = datetime.strptime(row[time_col], EXPORT_TIME_FORMAT)
+            if watermark is not None and ts <= watermark:
+                # Everything below is older still: count the lines, no
+                # CSV or datetime parsing
+                rows_skipped = 1 + sum(1 for line in f if line.strip())
+                break
+
+            times.append(ts)
+            values.append(parse_value(row[value_col]))
+
+    # Reverse instead of sort; only a block that is not newest-first
+    # (hand-edited export) pays for a stable sort
+    timestamps = pd.DatetimeIndex(times[::-1])
+    values = np.asarray(values[::-1], dtype=np.float64)
+
+    if not timestamps.is_monotonic_increasing:
+        order = np.argsort(timestamps.asi8, kind="stable")
+        timestamps, values = timestamps[order], values[order]
+
+    return timestamps, values, len(times) + rows_skipped, rows_skipped
+
+
+def dedupe_sorted(timestamps, values):
+
+    # Sorted-merge dedup: of equal adjacent timestamps keep the last, which
+    # is the one listed first in the newest-first export
+    keep = np.r_[timestamps[1:] != timestamps[:-1], True] if len(timestamps) else np.zeros(0, bool)
+    return timestamps[keep], values[keep], int((~keep).sum())
+
+
+def store_watermark(raw, station_id):
+
+    # Start of the store's last minute, or None for a new station. Readings
+    # up to it are already stored even when the state file lags behind
+    # (store seeded elsewhere, or a crash before save_state)
+    if station_id not in raw.station_ids():
+        return None
+
+    store = raw.station(station_id)
+    return pd.Timestamp(store.end - 1, unit="m").to_pydatetime() if store.length else None
+
+
+def post_readings(serving_url, station_id, timestamps, values):
+
+    # Same payload as the SCADA streamer's HTTPSink
+    for i in range(0, len(values), POST_BATCH):
+        readings = [
+            {"timestamp": ts.isoformat(), "value": float(v)}
+            for ts, v in zip(timestamps[i:i + POST_BATCH], values[i:i + POST_BATCH])
+        ]
+        request = urllib.request.Request(
+            f"{serving_url.rstrip('/')}/stations/{station_id}/readings",
+            data=json.dumps(readings).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=30):
+            pass
+
+
+# =====================================
+# RUN
+# =====================================
+
+def ingest_file(pyramid, state, path, station_id=None, serving_url=None):
+
+    start = time.perf_counter()
+    station_id = station_id or station_id_from_path(path)
+
+    mark = state.get(station_id, {}).get("watermark")
+    stored = store_watermark(pyramid.raw, station_id)
+    marks = [m for m in (datetime.fromisoformat(mark) if mark else None, stored) if m is not None]
+    watermark = max(marks) if marks else None
+
+    timestamps, values, rows_read, rows_skipped = read_new_readings(path, watermark)
+    timestamps, values, deduplicated = dedupe_sorted(timestamps, values)
+
+    # Readings inside the stored last minute were ingested with it
+    already_stored = 0
+    if stored is not None:
+        keep = timestamps >= pd.Timestamp(stored) + pd.Timedelta(minutes=1)
+        timestamps, values = timestamps[keep], values[keep]
+        already_stored = int((~keep).sum())
+
+    minutes = 0
+    if len(values):
+        minutes = pyramid.raw.append_readings(station_id, timestamps, values)
+        pyramid.update(station_id)
+
+        if serving_url:
+            post_readings(serving_url, station_id, timestamps, values)
+
+        state[station_id] = {"watermark": timestamps[-1].isoformat(), "last_file": path}
+
+    # rows_read == ingested + skipped + deduplicated + already_stored
+    return {
+        "file": path,
+        "station_id": station_id,
+        "rows_read": rows_read,
+        "ingested": len(values),
+        "skipped": rows_skipped,
+        "deduplicated": deduplicated,
+        "already_stored": already_stored,
+        "minutes_appended": minutes,
+        "watermark_before": watermark.isoformat() if watermark else None,
+        "watermark_after": state.get(station_id, {}).get("watermark"),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def ingest(paths, root, serving_url=None):
+
+    # Files are applied in order; the state is saved after each file, once
+    # its readings are in the stores
+    os.makedirs(root, exist_ok=True)
+    pyramid = RollupPyramid(root, mode="r+")
+    state = load_state(root)
+
+    summaries = []
+    for path in paths:
+        summary = ingest_file(pyramid, state, path, serving_url=serving_url)
+        save_state(root, state)
+        summaries.append(summary)
+        print(json.dumps(summary))
+
+    return summaries
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Ingest new readings from overlapping SCADA exports")
+    parser.add_argument("paths", nargs="+", help="export files (newest-first CSV or TXT)")
+    parser.add_argument("--root", default="data/raw_store")
+    parser.add_argument("--serving-url", default=None,
+                        help="also stream new readings to the serving feature engines")
+    args = parser.parse_args()
+
+    ingest(args.paths, args.root, args.serving_url)
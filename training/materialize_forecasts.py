@@ -0,0 +1,240 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import mlflow
+import mlflow.xgboost
+
+from training.fleet_bucketing import bucket_fleet
+from training.forecast_table import BUCKET_MINUTES, HORIZON_BUCKETS, ForecastTable
+from training.global_station import GLOBAL_FEATURE_COLS, MODEL_NAME as GLOBAL_MODEL_NAME
+from training.online_features import LAG_LIST, ROLLING_WINDOWS
+from training.station_data import (
+    FEATURE_COLS,
+    STATION_FILES,
+    load_station_buckets,
+    load_station_export,
+)
+
+# =====================================
+# NEXT-DAY FORECAST JOB
+# =====================================
+
+# Every station's next 24 h of 15-min buckets, rolled forward recursively:
+# each step predicts one bucket for all of a model's stations in a single
+# batch, and the prediction feeds the next step's lags.
+
+DEPTH = max(LAG_LIST + ROLLING_WINDOWS)
+
+# Per-station models (training/xgb_station.py) and the station each serves;
+# the global model covers every station in its profiles artifact
+LOCAL_MODEL_STATIONS = {
+    "xgb_station_471": "GMPatel_40",
+    "xgb_station_523": "swaminarayan_65",
+}
+
+DEFAULT_OUTPUT = "data/forecast_table.sqlite"
+
+
+# =====================================
+# 1. HISTORY + MODELS
+# =====================================
+
+def station_histories(store_root=None, station_files=STATION_FILES):
+
+    # {station: bucket_df}, from the rollup store when there is one
+    if store_root and os.path.isdir(store_root):
+        from training.raw_store import RawStore
+
+        raw = RawStore(store_root)
+        histories = {}
+
+        for s in raw.station_ids():
+            # The bucket still being filled (the store ends inside it) is
+            # not a complete total and must not seed the lags
+            df = load_station_buckets(store_root, s)
+            end = pd.Timestamp(raw.station(s).end, unit="m")
+            histories[s] = df[df["bucket_start"] + pd.Timedelta(minutes=BUCKET_MINUTES) <= end] \
+                .reset_index(drop=True)
+
+        return histories
+
+    return bucket_fleet({s: load_station_export(p) for s, p in station_files.items()})
+
+
+def load_registered(model_name, version=None):
+
+    client = mlflow.tracking.MlflowClient()
+
+    if version:
+        model_version = client.get_model_version(model_name, version)
+    else:
+        model_version = client.search_model_versions(
+            f"name='{model_name}'", order_by=["version_number DESC"], max_results=1
+        )[0]
+
+    model = mlflow.xgboost.load_model(f"models:/{model_name}/{model_version.version}")
+
+    return model, model_version
+
+
+# =====================================
+# 2. RECURSIVE BATCH FORECAST
+# =====================================
+
+def recursive_forecast(model, histories, feature_cols, profiles=None, horizon=HORIZON_BUCKETS):
+
+    # histories: {station: bucket_df}; returns (stations, first_bucket
+    # minutes, (S, horizon) forecasts, (S, horizon, F) feature rows).
+    # Stations with less than DEPTH + 1 buckets cannot fill every lag and
+    # are left out.
+    stations = [s for s in sorted(histories)
+                if len(histories[s]) > DEPTH and (profiles is None or s in profiles)]
+    n = len(stations)
+
+    # buf[:, DEPTH] is each station's last bucket L; step j writes L + j
+    buf = np.zeros((n, DEPTH + 1 + horizon))
+    last_bucket = np.zeros(n, dtype=np.int64)
+    rows = np.zeros((n, horizon, len(feature_cols)), dtype=np.float32)
+
+    for i, s in enumerate(stations):
+        df = histories[s]
+        buf[i, :DEPTH + 1] = df["sales_15min"].to_numpy()[-(DEPTH + 1):]
+        last_bucket[i] = df["bucket_start"].to_numpy()[-1].astype("datetime64[m]").astype(np.int64)
+
+    static = {}
+    if profiles is not None:
+        static = {col: np.array([profiles[s][col] for s in stations])
+                  for col in feature_cols if col.startswith("station_")}
+        static["station_code"] = pd.Categorical(
+            static["station_code"].astype(int), categories=list(range(len(profiles)))
+        )
+
+    for j in range(1, horizon + 1):
+        t = DEPTH + j - 1
+
+        # Row for bucket L + j - 1, whose target is bucket L + j
+        bucket = pd.to_datetime(last_bucket + (j - 1) * BUCKET_MINUTES, unit="m")
+        features = {f"lag_{k}": buf[:, t - k] for k in LAG_LIST}
+        features.update({f"rolling_mean_{w}": buf[:, t - w:t].mean(axis=1) for w in ROLLING_WINDOWS})
+        features["hour"] = bucket.hour
+        features["day_of_week"] = bucket.dayofweek
+        features.update(static)
+
+        frame = pd.DataFrame(features)[feature_cols]
+        buf[:, t + 1] = np.maximum(model.predict(xgb.DMatrix(frame, enable_categorical=True)), 0.0)
+
+        # Categorical codes are stored as numbers
+        rows[:, j - 1] = frame.apply(
+            lambda col: col.cat.codes if col.dtype == "category" else col
+        ).to_numpy(dtype=np.float32)
+
+    return stations, last_bucket + BUCKET_MINUTES, buf[:, DEPTH + 1:], rows
+
+
+# =====================================
+# 3. MATERIALIZE
+# =====================================
+
+def materialize(output=DEFAULT_OUTPUT, models=(GLOBAL_MODEL_NAME,), store_root=None):
+
+    # Earlier models in the list win when several cover a station
+    start = time.perf_counter()
+    histories = station_histories(store_root)
+
+    station_ids, first_bucket, values, model_versions = [], [], [], {}
+
+    # Feature rows of every model side by side; a local model leaves the
+    # station columns NaN
+    feature_rows = []
+    categories = {}
+
+    for model_name in models:
+        model, model_version = load_registered(model_name)
+
+        if model_name in LOCAL_MODEL_STATIONS:
+            profiles = None
+            feature_cols = FEATURE_COLS
+            covered = {LOCAL_MODEL_STATIONS[model_name]} & histories.keys()
+        else:
+            profiles = mlflow.artifacts.load_dict(f"runs:/{model_version.run_id}/station_profiles.json")
+            feature_cols = GLOBAL_FEATURE_COLS
+            covered = profiles.keys() & histories.keys()
+
+        pending = {s: histories[s] for s in covered if s not in station_ids}
+        if not pending:
+            continue
+
+        stations, first, forecast, rows = recursive_forecast(model, pending, feature_cols, profiles)
+
+        wide = np.full(rows.shape[:2] + (len(GLOBAL_FEATURE_COLS),), np.nan, dtype=np.float32)
+        wide[..., [GLOBAL_FEATURE_COLS.index(c) for c in feature_cols]] = rows
+        if profiles is not None:
+            categories["station_code"] = len(profiles)
+
+        station_ids.extend(stations)
+        first_bucket.append(first)
+        values.append(forecast)
+        feature_rows.append(wide)
+        model_versions.update({s: f"{model_name}/{model_version.version}" for s in stations})
+
+    if not station_ids:
+        raise ValueError(f"no station has enough history for models {list(models)}")
+
+    # The oldest last-observed bucket across stations
+    as_of = pd.to_datetime(np.concatenate(first_bucket).min() - BUCKET_MINUTES, unit="m")
+
+    table = ForecastTable(
+        station_ids,
+        np.concatenate(first_bucket),
+        np.vstack(values),
+        meta={
+            "generated_at": pd.Timestamp.now().isoformat(),
+            "as_of": as_of.isoformat(),
+            "models": model_versions,
+            "horizon_buckets": HORIZON_BUCKETS,
+            "feature_cols": GLOBAL_FEATURE_COLS,
+            "categories": categories,
+        },
+        features=np.concatenate(feature_rows),
+    )
+    table.save(output)
+
+    print(f"Materialized {len(station_ids)} stations x {HORIZON_BUCKETS} buckets "
+          f"to {output} in {time.perf_counter() - start:.2f}s")
+
+    return table
+
+
+def run_every_bucket(output, models, store_root, offset_s=60):
+
+    # Refresh shortly after every 15-min boundary, once the bucket has closed
+    bucket_s = BUCKET_MINUTES * 60
+
+    while True:
+        materialize(output, models, store_root)
+
+        now = time.time()
+        time.sleep(bucket_s - now % bucket_s + offset_s)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Materialize next-day forecasts for every station")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=".sqlite or .parquet")
+    parser.add_argument("--models", nargs="+", default=[GLOBAL_MODEL_NAME])
+    parser.add_argument("--store", default=None, help="raw/rollup store root (default: exports)")
+    parser.add_argument("--schedule", action="store_true", help="refresh every bucket")
+    args = parser.parse_args()
+
+    mlflow.set_tracking_uri(
+        os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
+    )
+
+    if args.schedule:
+        run_every_bucket(args.output, args.models, args.store)
+    else:
+        materialize(args.output, args.models, args.store)
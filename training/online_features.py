@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+# =====================================
+# 15-MIN MODEL FEATURE SPEC
+# =====================================
+
+# Kept free of training-only imports so serving can ship this file alone
+
+BUCKET_FREQ = "15min"
+
+LAG_LIST = [1, 2, 3, 4, 8, 12, 24, 96]
+ROLLING_WINDOWS = [4, 8, 96]
+
+# Running window sums are recomputed from the ring this often, so float
+# drift from add/subtract never accumulates over long streams
+RESYNC_EVERY = 4096
+
+
+def feature_cols(lags=LAG_LIST, windows=ROLLING_WINDOWS):
+
+    return (
+        [f"lag_{lag}" for lag in lags]
+        + [f"rolling_mean_{w}" for w in windows]
+        + ["hour", "day_of_week"]
+    )
+
+
+FEATURE_COLS = feature_cols()
+
+
+# =====================================
+# ONLINE (PER-STATION) FEATURE ENGINE
+# =====================================
+
+class StationFeatureEngine:
+
+    # Features for the open bucket t are the same as a training row at t:
+    # lag_k = total of bucket t-k, rolling_mean_w = mean of buckets t-w..t-1,
+    # hour / day_of_week of bucket t. The model's target is bucket t+1.
+
+    def __init__(self, lags=LAG_LIST, windows=ROLLING_WINDOWS, freq=BUCKET_FREQ, cap=None):
+
+        self.lags = list(lags)
+        self.windows = list(windows)
+        self.feature_cols = feature_cols(self.lags, self.windows)
+        self.bucket_ns = pd.Timedelta(freq).value
+        self.cap = cap
+
+        # Ring of the most recent closed bucket totals
+        self.depth = max(self.lags + self.windows)
+        self.ring = np.zeros(self.depth)
+        self.pos = 0
+        self.filled = 0
+        self.closed = 0
+
+        self.window_sums = np.zeros(len(self.windows))
+
+        # Open bucket (index = floor(ns / bucket_ns)) and totalizer state
+        self.bucket = None
+        self.bucket_total = 0.0
+        self.last_value = None
+
+    # ---------------------------------
+    # Streaming updates
+    # ---------------------------------
+
+    def _close_bucket(self, total):
+
+        if self.cap is not None:
+            total = min(total, self.cap)
+
+        for i, w in enumerate(self.windows):
+            if self.filled >= w:
+                self.window_sums[i] -= self.ring[(self.pos - w) % self.depth]
+            self.window_sums[i] += total
+
+        self.ring[self.pos] = total
+        self.pos = (self.pos + 1) % self.depth
+        self.filled = min(self.filled + 1, self.depth)
+        self.closed += 1
+
+        if self.closed % RESYNC_EVERY == 0:
+            self._resync()
+
+    def _resync(self):
+
+        for i, w in enumerate(self.windows):
+            idx = (self.pos - 1 - np.arange(min(w, self.filled))) % self.depth
+            self.window_sums[i] = self.ring[idx].sum()
+
+    def update(self, timestamp, value):
+
+        # One cumulative totalizer reading: diff against the previous reading,
+        # clamp refill resets to zero, add to the reading's bucket
+        bucket = pd.Timestamp(timestamp).value // self.bucket_ns
+
+        if self.bucket is not None and bucket < self.bucket:
+            raise ValueError("reading is older than the open bucket")
+
+        sale = 0.0 if self.last_value is None else value - self.last_value
+        if not sale > 0:
+            sale = 0.0
+        self.last_value = value
+
+        if self.bucket is None:
+            self.bucket = bucket
+        elif bucket > self.bucket:
+            self._close_bucket(self.bucket_total)
+
+            # Missing buckets are zero sales; beyond the ring depth they no
+            # longer affect any feature, so the work stays bounded
+            for _ in range(min(bucket - self.bucket - 1, self.depth)):
+                self._close_bucket(0.0)
+
+            self.bucket = bucket
+            self.bucket_total = 0.0
+
+        self.bucket_total += sale
+
+    # ---------------------------------
+    # Current features
+    # ---------------------------------
+
+    @property
+    def ready(self):
+        return self.bucket is not None and self.filled >= self.depth
+
+    @property
+    def bucket_start(self):
+        return None if self.bucket is None else pd.Timestamp(self.bucket * self.bucket_ns)
+
+    def recent(self, k):
+
+        # Total of the closed bucket k buckets before the open one (k = 1 is
+        # the last closed bucket); None once it has left the ring
+        if not 1 <= k <= self.filled:
+            return None
+        return float(self.ring[(self.pos - k) % self.depth])
+
+    def feature_vector(self):
+
+        out = np.full(len(self.feature_cols), np.nan)
+
+        for j, k in enumerate(self.lags):
+            if self.filled >= k:
+                out[j] = self.recent(k)
+
+        offset = len(self.lags)
+        for i, w in enumerate(self.windows):
+            if self.filled >= w:
+                out[offset + i] = self.window_sums[i] / w
+
+        start = self.bucket_start
+        out[-2] = start.hour
+        out[-1] = start.dayofweek
+
+        return out
+
+    def features(self):
+        return dict(zip(self.feature_cols, self.feature_vector().tolist()))
+
+    # ---------------------------------
+    # Batch replay (training / warm start)
+    # ---------------------------------
+
+    def replay(self, bucket_starts, totals):
+
+        # Features for every bucket of a gap-free history, identical to
+        # streaming it through update(); afterwards the engine is positioned
+        # on the bucket after the last one, ready to stream live readings
+        bucket_starts = pd.DatetimeIndex(bucket_starts)
+        totals = np.asarray(totals, dtype=float)
+        if self.cap is not None:
+            totals = np.minimum(totals, self.cap)
+
+        n = len(totals)
+        out = np.full((n, len(self.feature_cols)), np.nan)
+
+        for j, k in enumerate(self.lags):
+            if k < n:
+                out[k:, j] = totals[:n - k]
+
+        csum = np.r_[0.0, np.cumsum(totals)]
+        offset = len(self.lags)
+        for i, w in enumerate(self.windows):
+            if w < n:
+                out[w:, offset + i] = (csum[w:n] - csum[:n - w]) / w
+
+        out[:, -2] = bucket_starts.hour
+        out[:, -1] = bucket_starts.dayofweek
+
+        if n:
+            self._load_history(bucket_starts[-1], totals)
+
+        return pd.DataFrame(out, columns=self.feature_cols)
+
+    def _load_history(self, last_bucket_start, totals):
+
+        tail = totals[-self.depth:]
+        self.ring[:] = 0.0
+        self.ring[:len(tail)] = tail
+        self.pos = len(tail) % self.depth
+        self.filled = len(tail)
+        self.closed = len(totals)
+        self.window_sums[:] = 0.0
+        self._resync()
+
+        self.bucket = pd.Timestamp(last_bucket_start).value // self.bucket_ns + 1
+        self.bucket_total = 0.0
+        self.last_value = None
@@ -0,0 +1,116 @@
+import cProfile
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import mlflow
+
+# =====================================
+# STAGE PROFILER
+# =====================================
+
+# Stages slower than this (seconds) also get a cProfile dump; unset = no cProfile
+PROFILE_THRESHOLD_ENV = "PROFILE_STAGE_THRESHOLD_S"
+
+
+def _reset_peak_rss():
+
+    # Linux lets a process reset its own high-water mark (VmHWM), which gives
+    # a true per-stage peak; elsewhere the lifetime peak is the best we get
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+
+    def __init__(self, profile_threshold_s=None):
+
+        if profile_threshold_s is None and os.getenv(PROFILE_THRESHOLD_ENV):
+            profile_threshold_s = float(os.getenv(PROFILE_THRESHOLD_ENV))
+
+        self.profile_threshold_s = profile_threshold_s
+        self.stages = []
+        self._dump_dir = None
+
+    @contextmanager
+    def stage(self, name):
+
+        profiler = cProfile.Profile() if self.profile_threshold_s is not None else None
+
+        _reset_peak_rss()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+
+            record = {
+                "stage": name,
+                "wall_s": time.perf_counter() - wall_start,
+                "cpu_s": time.process_time() - cpu_start,
+                "peak_rss_mb": _peak_rss_mb(),
+            }
+
+            if profiler and record["wall_s"] >= self.profile_threshold_s:
+                if self._dump_dir is None:
+                    self._dump_dir = tempfile.mkdtemp(prefix="stage_profiles_")
+                record["cprofile"] = os.path.join(self._dump_dir, f"{name}.prof")
+                profiler.dump_stats(record["cprofile"])
+
+            self.stages.append(record)
+
+    def log_to_mlflow(self, logger=mlflow):
+
+        # logger is the mlflow module or anything with the same log_* calls,
+        # e.g. training.tracking.RunLogger
+        metrics = {}
+        for record in self.stages:
+            metrics[f"stage_{record['stage']}_wall_s"] = record["wall_s"]
+            metrics[f"stage_{record['stage']}_cpu_s"] = record["cpu_s"]
+            metrics[f"stage_{record['stage']}_peak_rss_mb"] = record["peak_rss_mb"]
+
+        logger.log_metrics(metrics)
+        logger.log_dict({"stages": self.stages}, "stage_profile.json")
+
+        if self._dump_dir is not None:
+            logger.log_artifacts(self._dump_dir, artifact_path="stage_profiles")
+
+    def cleanup(self):
+
+        # Only once the log_artifacts upload above has completed
+        if self._dump_dir is not None:
+            shutil.rmtree(self._dump_dir, ignore_errors=True)
+            self._dump_dir = None
+
+    def print_summary(self):
+
+        print("\n==== STAGE PROFILE ====")
+        for record in self.stages:
+            print(f"{record['stage']:<20}{record['wall_s']:>10.3f}s wall"
+                  f"{record['cpu_s']:>10.3f}s cpu{record['peak_rss_mb']:>10.1f} MB peak")
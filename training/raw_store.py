@@ -0,0 +1,319 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# =====================================
+# APPEND-ONLY MINUTE STORE
+# =====================================
+
+# Kept free of training-only imports so serving can ship this file alone
+
+# value: last totalizer reading in the minute
+# flow:  sales in the minute (totalizer diff, refill resets clamped to 0)
+CHANNELS = ("value", "flow")
+
+DTYPE = np.float32
+
+# Files grow in whole chunks (and at least double), so appends are O(1)
+# amortized and remaps are rare
+GROW_MINUTES = 7 * 24 * 60
+
+META_FILE = "meta.json"
+VALID_FILE = "valid.bits"
+
+
+def to_minute(timestamp):
+
+    # Minutes since 1970-01-01, the store's clock
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    return int(np.datetime64(pd.Timestamp(timestamp).to_datetime64(), "m").astype(np.int64))
+
+
+def readings_to_minutes(timestamps, values, prev_value=None):
+
+    # Chronological totalizer readings -> one row per minute (last reading
+    # wins) with per-minute sales, matching bucket_station_sales.
+    # prev_value: the reading before these, so the first diff is not lost
+    minutes = pd.DatetimeIndex(timestamps).values.astype("datetime64[m]").astype(np.int64)
+    values = np.asarray(values, dtype=np.float64)
+
+    if not len(values):
+        return minutes, values, values
+
+    first = values[0] if prev_value is None or np.isnan(prev_value) else prev_value
+    flow = np.diff(values, prepend=first)
+    flow[~(flow > 0)] = 0.0
+
+    # Sales of readings collapsed into one minute are summed
+    starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+    last = np.r_[starts[1:] - 1, len(minutes) - 1]
+
+    return minutes[last], values[last], np.add.reduceat(flow, starts)
+
+
+class StationStore:
+
+    # One directory per station: a float32 file per channel and a validity
+    # bitmap, all memory-mapped and indexed by (minute - start) // step.
+    # Slots with no data are NaN with their valid bit clear. Appends must
+    # move forward in time; windows are views on the maps (no copy, no
+    # parsing). step is 1 for raw readings, larger for rollup levels.
+
+    def __init__(self, path, mode="r"):
+
+        self.path = path
+        self.mode = mode
+        self.refresh()
+
+    def refresh(self):
+
+        # Readers pick up the writer's latest flushed length
+        with open(os.path.join(self.path, META_FILE)) as f:
+            meta = json.load(f)
+
+        self.start = meta["start"]
+        self.length = meta["length"]
+        self.channels = tuple(meta["channels"])
+        self.step = meta.get("step", 1)
+
+        self._map()
+
+    @classmethod
+    def create(cls, path, start, channels=CHANNELS, step=1):
+
+        os.makedirs(path, exist_ok=True)
+
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump({"start": to_minute(start) // step * step, "length": 0,
+                       "channels": list(channels), "step": step,
+                       "dtype": np.dtype(DTYPE).name}, f)
+
+        return cls(path, mode="r+")
+
+    # ---------------------------------
+    # Memory maps
+    # ---------------------------------
+
+    def _channel_file(self, channel):
+        return os.path.join(self.path, f"{channel}.f32")
+
+    def _map(self):
+
+        # Writers map the whole preallocated file, readers only the
+        # flushed length
+        size = os.path.getsize(self._channel_file(self.channels[0])) // DTYPE().itemsize \
+            if os.path.exists(self._channel_file(self.channels[0])) else 0
+        self.capacity = size if self.mode == "r+" else self.length
+
+        self._values = {
+            c: np.memmap(self._channel_file(c), dtype=DTYPE, mode=self.mode, shape=(self.capacity,))
+            if self.capacity else np.empty(0, dtype=DTYPE)
+            for c in self.channels
+        }
+        self._valid = np.memmap(os.path.join(self.path, VALID_FILE), dtype=np.uint8,
+                                mode=self.mode, shape=((self.capacity + 7) // 8,)) \
+            if self.capacity else np.zeros(0, dtype=np.uint8)
+
+    def _grow(self, needed):
+
+        capacity = max(needed, 2 * self.capacity, self.capacity + GROW_MINUTES)
+        capacity = -(-capacity // 8) * 8
+
+        self.flush()
+        for c in self.channels:
+            with open(self._channel_file(c), "ab") as f:
+                f.write(np.full(capacity - self.capacity, np.nan, dtype=DTYPE).tobytes())
+        with open(os.path.join(self.path, VALID_FILE), "ab") as f:
+            f.truncate(capacity // 8)
+
+        self._map()
+
+    # ---------------------------------
+    # Appends
+    # ---------------------------------
+
+    @property
+    def end(self):
+        return self.start + self.length * self.step
+
+    def _index(self, minute):
+        return (to_minute(minute) - self.start) // self.step
+
+    def append(self, minute, **values):
+
+        # One slot's row; re-appending the last slot overwrites it
+        i = self._index(minute)
+        if i < self.length - 1 or i < 0:
+            raise ValueError(f"minute {minute} is older than the store end")
+
+        if i >= self.capacity:
+            self._grow(i + 1)
+
+        for c, v in values.items():
+            self._values[c][i] = v
+        self._valid[i >> 3] |= np.uint8(1 << (i & 7))
+
+        self.length = max(self.length, i + 1)
+
+    def append_block(self, minutes, **values):
+
+        # Sorted, unique slots from the store's last slot on, written in
+        # one vectorized pass; gaps stay NaN / invalid
+        idx = (np.asarray(minutes, dtype=np.int64) - self.start) // self.step
+        if not len(idx):
+            return 0
+        if idx[0] < max(self.length - 1, 0) or np.any(np.diff(idx) <= 0):
+            raise ValueError("block must be increasing and start at or after the store end")
+
+        if idx[-1] >= self.capacity:
+            self._grow(int(idx[-1]) + 1)
+
+        for c, v in values.items():
+            self._values[c][idx] = v
+
+        np.bitwise_or.at(self._valid, idx >> 3, (1 << (idx & 7)).astype(np.uint8))
+
+        self.length = max(self.length, int(idx[-1]) + 1)
+        self.flush()
+
+        return len(idx)
+
+    def flush(self):
+
+        # Readers see appends once the length is published here
+        for m in self._values.values():
+            if isinstance(m, np.memmap):
+                m.flush()
+        if isinstance(self._valid, np.memmap):
+            self._valid.flush()
+
+        meta_path = os.path.join(self.path, META_FILE)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"start": self.start, "length": self.length,
+                       "channels": list(self.channels), "step": self.step,
+                       "dtype": np.dtype(DTYPE).name}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    # ---------------------------------
+    # Windows
+    # ---------------------------------
+
+    def _bounds(self, t0, t1):
+
+        i0 = self._index(t0)
+        i1 = self._index(t1)
+
+        if not 0 <= i0 <= i1 <= self.length:
+            raise ValueError(f"window [{t0}, {t1}) outside the stored range")
+
+        return i0, i1
+
+    def window(self, t0, t1, channel="flow"):
+
+        # [t0, t1) as a view on the memory map
+        i0, i1 = self._bounds(t0, t1)
+        return self._values[channel][i0:i1]
+
+    def valid(self, t0, t1):
+
+        i0, i1 = self._bounds(t0, t1)
+        bits = np.unpackbits(self._valid[i0 >> 3:(i1 + 7) >> 3], bitorder="little")
+        offset = i0 & 7
+
+        return bits[offset:offset + i1 - i0].astype(bool)
+
+    def tail(self, n, channel="flow"):
+
+        # Last n slots (oldest first), e.g. serving's lag history
+        n = min(n, self.length)
+        return self.window(self.end - n * self.step, self.end, channel)
+
+    def frame(self, channels=None, valid_only=True):
+
+        # Whole range as a DataFrame (timestamp + channels); copies
+        channels = list(channels or self.channels)
+        valid = self.valid(self.start, self.end)
+
+        df = pd.DataFrame({c: np.asarray(self.window(self.start, self.end, c)) for c in channels})
+        df.insert(0, "timestamp", pd.to_datetime(
+            np.arange(self.start, self.end, self.step, dtype=np.int64), unit="m"))
+
+        return df[valid].reset_index(drop=True) if valid_only else df
+
+
+class RawStore:
+
+    # root/<station_id>/..., one StationStore per station
+
+    def __init__(self, root, mode="r"):
+        self.root = root
+        self.mode = mode
+        self._stations = {}
+
+    def station_ids(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, d, META_FILE)))
+
+    def station(self, station_id, start=None):
+
+        # start: creates the station (writers only) when it does not exist
+        if station_id not in self._stations:
+            path = os.path.join(self.root, station_id)
+
+            if os.path.exists(os.path.join(path, META_FILE)):
+                self._stations[station_id] = StationStore(path, self.mode)
+            elif start is not None and self.mode == "r+":
+                self._stations[station_id] = StationStore.create(path, start)
+            else:
+                raise KeyError(f"no store for station {station_id}")
+
+        return self._stations[station_id]
+
+    def append_readings(self, station_id, timestamps, values):
+
+        # Chronological totalizer readings, none older than the store's
+        # last minute; the first diff continues from the stored value
+        timestamps = pd.DatetimeIndex(timestamps)
+        if not len(timestamps):
+            return 0
+
+        store = self.station(station_id, start=timestamps[0])
+        last = store.end - 1
+        prev_value = store.window(last, store.end, "value")[0] if store.length else None
+
+        minutes, last_values, flow = readings_to_minutes(timestamps, values, prev_value)
+
+        # Readings in the already-stored last minute add to its sales
+        if store.length and minutes[0] == last:
+            flow[0] += np.nan_to_num(store.window(last, store.end, "flow")[0])
+
+        return store.append_block(minutes, value=last_values, flow=flow)
+
+    def flush(self):
+        for store in self._stations.values():
+            store.flush()
+
+
+if __name__ == "__main__":
+
+    import argparse
+
+    from training.station_data import STATION_FILES, load_station_export
+
+    parser = argparse.ArgumentParser(description="Load station exports into the minute store")
+    parser.add_argument("--root", default="data/raw_store")
+    args = parser.parse_args()
+
+    raw_store = RawStore(args.root, mode="r+")
+
+    for station_id, path in STATION_FILES.items():
+        df = load_station_export(path)
+        minutes = raw_store.append_readings(station_id, df["timestamp"], df["Value"])
+        store = raw_store.station(station_id)
+        print(f"{station_id}: {len(df)} readings -> {minutes} minutes "
+              f"({store.length} minute slots, {store.length - minutes} gaps)")
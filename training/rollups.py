@@ -0,0 +1,221 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from training.raw_store import RawStore, StationStore
+
+# =====================================
+# MULTI-RESOLUTION ROLLUP PYRAMID
+# =====================================
+
+# Kept free of training-only imports so serving can ship this file alone
+
+# Resolution -> minutes per bucket. "1min" is the raw store itself; each
+# coarser level is rolled up from the level below it.
+LEVELS = {"1min": 1, "15min": 15, "1h": 60, "1d": 1440}
+
+TOP_STEP = max(LEVELS.values())
+
+ROLLUP_CHANNELS = ("sum", "count", "min", "max", "last")
+
+
+def _level_dir(station_path, resolution):
+    return os.path.join(station_path, f"rollup_{resolution}")
+
+
+def raw_aggregates(store, t0, t1):
+
+    # The raw minutes as 1-minute aggregates, so every level rolls up the same way
+    flow = np.asarray(store.window(t0, t1, "flow"), dtype=np.float64)
+    valid = store.valid(t0, t1)
+
+    return {
+        "sum": np.where(valid, flow, 0.0),
+        "count": valid.astype(np.float64),
+        "min": np.where(valid, flow, np.nan),
+        "max": np.where(valid, flow, np.nan),
+        "last": np.where(valid, np.asarray(store.window(t0, t1, "value")), np.nan),
+    }
+
+
+def roll_up(child, ratio):
+
+    # Combine every `ratio` consecutive child buckets (length is a multiple
+    # of ratio); empty buckets keep sum / count 0 and NaN min / max / last
+    n = len(child["sum"]) // ratio
+    shaped = {c: np.asarray(v, dtype=np.float64).reshape(n, ratio) for c, v in child.items()}
+
+    has = ~np.isnan(shaped["last"])
+    last_idx = ratio - 1 - np.argmax(has[:, ::-1], axis=1)
+    any_data = shaped["count"].sum(axis=1) > 0
+
+    with np.errstate(invalid="ignore"):
+        mins = np.where(any_data, np.fmin.reduce(shaped["min"], axis=1), np.nan)
+        maxs = np.where(any_data, np.fmax.reduce(shaped["max"], axis=1), np.nan)
+
+    return {
+        "sum": shaped["sum"].sum(axis=1),
+        "count": shaped["count"].sum(axis=1),
+        "min": mins,
+        "max": maxs,
+        "last": np.where(has.any(axis=1), shaped["last"][np.arange(n), last_idx], np.nan),
+    }
+
+
+class RollupPyramid:
+
+    # Rollup levels live next to the raw store (root/<station>/rollup_<res>/)
+    # as StationStores whose slots are buckets. Raw appends only move
+    # forward, so update() recomputes each level from its open (last)
+    # bucket to the raw end: raw minutes roll into 15-min buckets, those
+    # into hours, those into days. Cost follows the new data, not history.
+
+    def __init__(self, root, mode="r"):
+        self.raw = RawStore(root, mode)
+        self.mode = mode
+        self._levels = {}
+
+    def level(self, station_id, resolution):
+
+        if resolution == "1min":
+            return self.raw.station(station_id)
+
+        key = (station_id, resolution)
+        if key not in self._levels:
+            raw = self.raw.station(station_id)
+            path = _level_dir(raw.path, resolution)
+
+            if os.path.exists(os.path.join(path, "meta.json")):
+                self._levels[key] = StationStore(path, self.mode)
+            elif self.mode == "r+":
+                # Every level starts on the same day boundary, so a coarse
+                # bucket never begins before the level below it
+                start = raw.start // TOP_STEP * TOP_STEP
+                self._levels[key] = StationStore.create(path, start, ROLLUP_CHANNELS,
+                                                        step=LEVELS[resolution])
+            else:
+                raise KeyError(f"no {resolution} rollup for station {station_id}")
+
+        return self._levels[key]
+
+    # ---------------------------------
+    # Incremental maintenance
+    # ---------------------------------
+
+    def update(self, station_id):
+
+        raw = self.raw.station(station_id)
+        child = raw
+        child_aggs = None
+        child_t0 = None
+        written = {}
+
+        for resolution, step in list(LEVELS.items())[1:]:
+            store = self.level(station_id, resolution)
+
+            # From the open bucket on (it may have gained minutes)
+            t0 = store.start + max(store.length - 1, 0) * step
+            t1 = -(-raw.end // step) * step
+
+            if t1 <= t0:
+                written[resolution] = 0
+                continue
+
+            if child is raw:
+                aggs = self._child_range(raw, t0, t1, raw_aggregates)
+            else:
+                aggs = self._from_previous(child, child_aggs, child_t0, t0, t1)
+
+            ratio = step // child.step
+            buckets = roll_up(aggs, ratio)
+
+            written[resolution] = store.append_block(np.arange(t0, t1, step), **buckets)
+
+            child, child_aggs, child_t0 = store, buckets, t0
+
+        return written
+
+    def _child_range(self, raw, t0, t1, aggregate):
+
+        # Raw window padded with empty minutes outside the stored range
+        lo, hi = max(t0, raw.start), min(t1, raw.end)
+        inner = aggregate(raw, lo, hi)
+
+        pad_before, pad_after = lo - t0, t1 - hi
+        fills = {"sum": 0.0, "count": 0.0, "min": np.nan, "max": np.nan, "last": np.nan}
+
+        return {c: np.r_[np.full(pad_before, fills[c]), v, np.full(pad_after, fills[c])]
+                for c, v in inner.items()}
+
+    def _from_previous(self, child, child_aggs, child_t0, t0, t1):
+
+        # The level below was just rewritten from child_t0; older buckets
+        # it did not touch are read back from its store
+        step = child.step
+        parts = {c: [] for c in ROLLUP_CHANNELS}
+
+        if t0 < child_t0:
+            for c in ROLLUP_CHANNELS:
+                parts[c].append(np.asarray(child.window(t0, child_t0, c), dtype=np.float64))
+
+        offset = (max(t0, child_t0) - child_t0) // step
+        n_needed = (t1 - max(t0, child_t0)) // step
+        for c in ROLLUP_CHANNELS:
+            v = child_aggs[c][offset:offset + n_needed]
+            fill = 0.0 if c in ("sum", "count") else np.nan
+            parts[c].append(np.r_[v, np.full(n_needed - len(v), fill)])
+
+        return {c: np.concatenate(p) for c, p in parts.items()}
+
+    def rebuild(self, station_id):
+
+        # Drop every level and roll the whole raw history up again
+        raw = self.raw.station(station_id)
+        for resolution in list(LEVELS)[1:]:
+            self._levels.pop((station_id, resolution), None)
+            shutil.rmtree(_level_dir(raw.path, resolution), ignore_errors=True)
+
+        return self.update(station_id)
+
+    # ---------------------------------
+    # Queries
+    # ---------------------------------
+
+    def query(self, station_id, resolution, t0, t1):
+
+        # [t0, t1) at one resolution, read straight from the precomputed level
+        store = self.level(station_id, resolution)
+        if self.mode == "r":
+            store.refresh()
+
+        if resolution == "1min":
+            aggs = raw_aggregates(store, t0, t1)
+        else:
+            aggs = {c: np.asarray(store.window(t0, t1, c)) for c in ROLLUP_CHANNELS}
+
+        t0 = store._index(t0) * store.step + store.start
+        frame = pd.DataFrame(aggs)
+        frame.insert(0, "bucket_start", pd.to_datetime(
+            np.arange(len(frame), dtype=np.int64) * store.step + t0, unit="m"))
+
+        return frame
+
+
+if __name__ == "__main__":
+
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or refresh the rollup pyramid")
+    parser.add_argument("--root", default="data/raw_store")
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    pyramid = RollupPyramid(args.root, mode="r+")
+
+    for station_id in pyramid.raw.station_ids():
+        start = time.perf_counter()
+        written = pyramid.rebuild(station_id) if args.rebuild else pyramid.update(station_id)
+        print(station_id, written, f"{time.perf_counter() - start:.3f}s")
@@ -0,0 +1,200 @@
+import argparse
+import os
+import time
+
+import mlflow
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+from training.tracking import RunLogger
+
+# ---------------------------------------------------
+# CONFIG
+# ---------------------------------------------------
+
+TARGET = "flow_kg"
+MAX_LAGS = 120
+
+# Column order the minute model is trained / scored with (see serving/app.py)
+CALENDAR_COLS = ["hour", "day_of_week", "is_weekend", "sin_hour", "cos_hour"]
+TRAILING_COLS = ["minute"]
+
+CANDIDATE_K = [4, 8, 12, 16, 24, 32, 48, 64, 96, 120]
+
+# Accept the smallest lag set whose RMSE is within this fraction of the full model
+TOLERANCE = 0.01
+
+# Tail of the training block that ranks lags and picks K; the test block
+# only scores the final model
+VALIDATION_FRACTION = 0.2
+
+SHAP_SAMPLE_ROWS = 5000
+
+
+def lag_col(lag):
+    return f"flow_t-{lag}"
+
+
+def model_columns(lags):
+    return CALENDAR_COLS + [lag_col(lag) for lag in sorted(lags)] + TRAILING_COLS
+
+
+def make_model():
+
+    # Same estimator as train.py, so the comparison is only about the lags
+    return xgb.XGBRegressor(
+        n_estimators=300,
+        max_depth=6,
+        learning_rate=0.05,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        objective="reg:squarederror",
+        random_state=42
+    )
+
+
+def fit_and_score(lags, X_train, y_train, X_test, y_test):
+
+    columns = model_columns(lags)
+
+    start = time.perf_counter()
+    model = make_model()
+    model.fit(X_train[columns], y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    preds = model.predict(X_test[columns])
+    predict_seconds = time.perf_counter() - start
+
+    return model, {
+        "mae": mean_absolute_error(y_test, preds),
+        "rmse": float(np.sqrt(mean_squared_error(y_test, preds))),
+        "fit_seconds": fit_seconds,
+        "predict_us_per_row": predict_seconds / len(X_test) * 1e6,
+    }
+
+
+# ---------------------------------------------------
+# LAG RANKING
+# ---------------------------------------------------
+
+def rank_lags(model, X_val, method="gain"):
+
+    columns = model_columns(range(1, MAX_LAGS + 1))
+    booster = model.get_booster()
+
+    if method == "shap":
+        sample = X_val[columns].tail(SHAP_SAMPLE_ROWS)
+        contribs = booster.predict(xgb.DMatrix(sample), pred_contribs=True)
+        # last column is the bias term
+        importance = dict(zip(columns, np.abs(contribs[:, :-1]).mean(axis=0)))
+    else:
+        importance = booster.get_score(importance_type="total_gain")
+
+    # Lags the trees never split on score zero and rank last
+    scores = {lag: importance.get(lag_col(lag), 0.0) for lag in range(1, MAX_LAGS + 1)}
+
+    return sorted(scores, key=lambda lag: (-scores[lag], lag))
+
+
+# ---------------------------------------------------
+# SELECTION
+# ---------------------------------------------------
+
+def select_lags(station_id, method="gain", tolerance=TOLERANCE, candidates=CANDIDATE_K):
+
+    data_path = f"data/training_data_{station_id}.csv"
+    model_name = f"station_{station_id}"
+
+    df = pd.read_csv(data_path, parse_dates=["timestamp"])
+    df = df.sort_values("timestamp")
+
+    # Same time-based split as train.py
+    split_time = df["timestamp"].quantile(0.8)
+
+    train_df = df[df["timestamp"] <= split_time]
+    test_df  = df[df["timestamp"] > split_time]
+
+    # Validation block off the end of the training block
+    val_time = train_df["timestamp"].quantile(1 - VALIDATION_FRACTION)
+
+    fit_df = train_df[train_df["timestamp"] <= val_time]
+    val_df = train_df[train_df["timestamp"] > val_time]
+
+    X_fit, y_fit = fit_df, fit_df[TARGET]
+    X_val, y_val = val_df, val_df[TARGET]
+
+    with mlflow.start_run(run_name=f"select_lags_{station_id}"):
+
+        run_logger = RunLogger()
+
+        full_lags = list(range(1, MAX_LAGS + 1))
+        full_model, full_metrics = fit_and_score(full_lags, X_fit, y_fit, X_val, y_val)
+        ranking = rank_lags(full_model, X_val, method)
+
+        print(f"Full model ({MAX_LAGS} lags) validation RMSE:", full_metrics["rmse"])
+        run_logger.log_metrics({f"full_val_{k}": v for k, v in full_metrics.items()})
+
+        # Smallest top-K within tolerance on validation; candidates are tried
+        # in ascending order so the search stops at the first one that qualifies
+        chosen = full_lags
+
+        for k in sorted(candidates):
+            if k >= MAX_LAGS:
+                break
+
+            lags = sorted(ranking[:k])
+            _, metrics = fit_and_score(lags, X_fit, y_fit, X_val, y_val)
+
+            print(f"top-{k} lags validation RMSE:", metrics["rmse"])
+            run_logger.log_metrics({f"topk_val_{name}": v for name, v in metrics.items()}, step=k)
+
+            if metrics["rmse"] <= full_metrics["rmse"] * (1 + tolerance):
+                chosen = lags
+                break
+
+        # Final model on the whole training block, scored once on test
+        chosen_model, chosen_metrics = fit_and_score(
+            chosen, train_df, train_df[TARGET], test_df, test_df[TARGET]
+        )
+        print("Selected lags:", len(chosen), chosen)
+        print("Selected lags test RMSE:", chosen_metrics["rmse"])
+
+        run_logger.log_params({
+            "lags": len(chosen),
+            "lag_ranking": method,
+            "lag_tolerance": tolerance,
+        })
+        run_logger.log_metrics(chosen_metrics)
+        run_logger.log_dict({"lags": chosen, "ranking": ranking}, "lags.json")
+
+        # Serving reads the lag list and column order back from the model metadata
+        run_logger.log_model(
+            chosen_model,
+            artifact_path="model",
+            registered_model_name=model_name,
+            metadata={"lags": chosen, "feature_cols": model_columns(chosen)}
+        )
+
+        run_logger.close()
+
+    return chosen
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Importance-driven lag pruning for the minute model")
+    parser.add_argument("stations", nargs="*", default=["1000000518", "1000000471", "1000000523"])
+    parser.add_argument("--method", choices=["gain", "shap"], default="gain")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    mlflow.set_tracking_uri(
+        os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
+    )
+    mlflow.set_experiment("dot_prediction")
+
+    for station_id in args.stations:
+        select_lags(station_id, args.method, args.tolerance)
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+from training.online_features import (
+    BUCKET_FREQ,
+    FEATURE_COLS,
+    LAG_LIST,
+    ROLLING_WINDOWS,
+    StationFeatureEngine,
+)
+from training.raw_store import RawStore
+from training.rollups import RollupPyramid
+
+# =====================================
+# STATION EXPORTS
+# =====================================
+
+STATION_FILES = {
+    "GMPatel_40": "data/GMPatel_40_sales.csv",
+    "Nagraj_67": "data/Nagraj_67_sales.csv",
+    "swaminarayan_65": "data/swaminarayan_65_sales.csv",
+}
+
+# SCADA export timestamps, e.g. "2/16/2026 11:53:00.000 PM"
+EXPORT_TIME_FORMAT = "%m/%d/%Y %I:%M:%S.%f %p"
+
+OUTLIER_QUANTILE = 0.995
+TRAIN_FRACTION = 0.8
+
+XGB_PARAMS = {
+    "objective": "reg:tweedie",
+    "tweedie_variance_power": 1.2,
+    "eval_metric": "rmse",
+    "max_depth": 4,
+    "learning_rate": 0.03,
+    "subsample": 0.9,
+    "colsample_bytree": 0.7,
+    "min_child_weight": 3,
+    "gamma": 0.1,
+    "seed": 42
+}
+
+
+# =====================================
+# 1. LOAD RAW EVENT DATA
+# =====================================
+
+def load_station_export(path):
+
+    df = pd.read_csv(path)
+
+    df["timestamp"] = pd.to_datetime(df["Time"], format=EXPORT_TIME_FORMAT)
+    df = df.sort_values("timestamp").reset_index(drop=True)
+
+    return df
+
+
+def load_station_store(root, station_id):
+
+    # Same columns bucket_station_sales needs, read from the memory-mapped
+    # minute store (training/raw_store.py) instead of re-parsing the export
+    store = RawStore(root).station(station_id)
+    df = store.frame(["value"]).rename(columns={"value": "Value"})
+    df["Value"] = df["Value"].astype(float)
+
+    return df
+
+
+# =====================================
+# 2-3. CUMULATIVE → EVENT SALES → 15-MIN BUCKETS
+# =====================================
+
+def bucket_station_sales(df):
+
+    df = df.copy()
+
+    df["event_sale"] = df["Value"].diff()
+    df["event_sale"] = df["event_sale"].fillna(0)
+
+    # Handle refill reset
+    df.loc[df["event_sale"] < 0, "event_sale"] = 0
+
+    df["bucket_start"] = df["timestamp"].dt.floor(BUCKET_FREQ)
+
+    bucket_df = (
+        df.groupby("bucket_start")["event_sale"]
+        .sum()
+        .reset_index()
+        .rename(columns={"event_sale": "sales_15min"})
+    )
+
+    # Cap extreme outliers
+    upper_cap = bucket_df["sales_15min"].quantile(OUTLIER_QUANTILE)
+    bucket_df["sales_15min"] = np.minimum(bucket_df["sales_15min"], upper_cap)
+
+    # Fill missing buckets
+    full_range = pd.date_range(
+        start=bucket_df["bucket_start"].min(),
+        end=bucket_df["bucket_start"].max(),
+        freq=BUCKET_FREQ
+    )
+
+    bucket_df = bucket_df.set_index("bucket_start").reindex(full_range).fillna(0)
+    bucket_df.index.name = "bucket_start"
+    bucket_df = bucket_df.reset_index()
+
+    return bucket_df
+
+
+def load_station_buckets(root, station_id):
+
+    # bucket_station_sales from the precomputed 15-min rollup level
+    # (training/rollups.py): same outlier cap, gaps are zero-sale buckets
+    store = RollupPyramid(root).level(station_id, BUCKET_FREQ)
+    bucket_df = store.frame(["sum", "count"], valid_only=False)
+
+    # Trim to the first and last bucket holding readings, like the range
+    # bucket_station_sales reindexes over
+    has_data = np.flatnonzero(bucket_df["count"].to_numpy() > 0)
+    bucket_df = bucket_df.iloc[has_data[0]:has_data[-1] + 1]
+
+    sales = bucket_df["sum"].astype(float).to_numpy()
+
+    # Cap from buckets with readings only, as before the gap fill
+    upper_cap = np.quantile(sales[bucket_df["count"].to_numpy() > 0], OUTLIER_QUANTILE)
+
+    bucket_df = pd.DataFrame({
+        "bucket_start": bucket_df["timestamp"].to_numpy(),
+        "sales_15min": np.minimum(sales, upper_cap),
+    })
+
+    return bucket_df
+
+
+# =====================================
+# 4. FEATURE ENGINEERING
+# =====================================
+
+def add_bucket_features(bucket_df):
+
+    bucket_df = bucket_df.sort_values("bucket_start").reset_index(drop=True)
+
+    bucket_df["hour"] = bucket_df["bucket_start"].dt.hour
+    bucket_df["day_of_week"] = bucket_df["bucket_start"].dt.dayofweek
+
+    # Lags / rolling means come from the same engine serving streams through,
+    # replayed over the whole history in one vectorized pass
+    history = StationFeatureEngine().replay(bucket_df["bucket_start"], bucket_df["sales_15min"])
+
+    for lag in LAG_LIST:
+        bucket_df[f"lag_{lag}"] = history[f"lag_{lag}"]
+
+    for window in ROLLING_WINDOWS:
+        bucket_df[f"rolling_mean_{window}"] = history[f"rolling_mean_{window}"]
+
+    bucket_df["target"] = bucket_df["sales_15min"].shift(-1)
+
+    return bucket_df.dropna().reset_index(drop=True)
+
+
+# =====================================
+# 5. TRAIN / TEST SPLIT
+# =====================================
+
+def split_train_test(train_df, train_fraction=TRAIN_FRACTION):
+
+    split_index = int(len(train_df) * train_fraction)
+
+    return train_df.iloc[:split_index], train_df.iloc[split_index:]
+
+
+# =====================================
+# 7. EVALUATION
+# =====================================
+
+def regression_metrics(y_true, y_pred):
+
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+
+    err = y_true - y_pred
+
+    return {
+        "rmse": float(np.sqrt(np.mean(err ** 2))),
+        "mae": float(np.mean(np.abs(err))),
+        "wape": float(np.sum(np.abs(err)) / np.sum(np.abs(y_true)) * 100),
+    }
@@ -0,0 +1,185 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mlflow
+import mlflow.xgboost
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+# =====================================
+# BATCHED / BACKGROUND RUN LOGGER
+# =====================================
+
+# log_batch accepts at most 1000 metrics per request
+MAX_BUFFERED_METRICS = 1000
+UPLOAD_WORKERS = 4
+
+
+class RunLogger:
+
+    # Drop-in for the mlflow.log_* calls the training scripts use: metrics,
+    # params and tags are buffered and sent with log_batch, while artifacts
+    # and models upload on a thread pool. Nothing blocks until close().
+    # With a StageProfiler, close() times the wait and logs the profile.
+
+    def __init__(self, run_id=None, max_workers=UPLOAD_WORKERS, profiler=None):
+
+        self.client = MlflowClient()
+        self.run_id = run_id or mlflow.active_run().info.run_id
+
+        self._metrics = []
+        self._params = []
+        self._tags = []
+        self._lock = threading.Lock()
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix=f"mlflow-{self.run_id[:8]}")
+        self._futures = []
+        self._upload_s = 0.0
+        self.profiler = profiler
+
+        # Artifacts are staged here instead of the working directory
+        self._staging_dir = tempfile.mkdtemp(prefix="mlflow_staging_")
+
+    # ---------------------------------
+    # Metrics / params / tags
+    # ---------------------------------
+
+    def log_metric(self, key, value, step=0):
+
+        metric = Metric(key, float(value), int(time.time() * 1000), step)
+        with self._lock:
+            self._metrics.append(metric)
+            full = len(self._metrics) >= MAX_BUFFERED_METRICS
+
+        if full:
+            self.flush()
+
+    def log_metrics(self, metrics, step=0):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step)
+
+    def log_param(self, key, value):
+        with self._lock:
+            self._params.append(Param(key, str(value)))
+
+    def log_params(self, params):
+        for key, value in params.items():
+            self.log_param(key, value)
+
+    def set_tag(self, key, value):
+        with self._lock:
+            self._tags.append(RunTag(key, str(value)))
+
+    def flush(self):
+
+        with self._lock:
+            metrics, self._metrics = self._metrics, []
+            params, self._params = self._params, []
+            tags, self._tags = self._tags, []
+
+        if metrics or params or tags:
+            self._submit(self.client.log_batch, self.run_id,
+                         metrics=metrics, params=params, tags=tags)
+
+    # ---------------------------------
+    # Artifacts / models
+    # ---------------------------------
+
+    def log_artifact(self, local_path, artifact_path=None):
+        self._submit(self.client.log_artifact, self.run_id, local_path, artifact_path)
+
+    def log_artifacts(self, local_dir, artifact_path=None):
+        self._submit(self.client.log_artifacts, self.run_id, local_dir, artifact_path)
+
+    def log_text(self, text, artifact_file):
+
+        local_path = os.path.join(self._staging_dir, artifact_file)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+        with open(local_path, "w") as f:
+            f.write(text)
+
+        self.log_artifact(local_path, os.path.dirname(artifact_file) or None)
+
+    def log_dict(self, dictionary, artifact_file):
+        self.log_text(json.dumps(dictionary, indent=2), artifact_file)
+
+    def log_model(self, model, artifact_path="model", registered_model_name=None, metadata=None):
+        self._submit(self._upload_model, model, artifact_path, registered_model_name, metadata)
+
+    def _upload_model(self, model, artifact_path, registered_model_name, metadata):
+
+        local_path = os.path.join(self._staging_dir, artifact_path)
+        mlflow.xgboost.save_model(model, local_path, metadata=metadata)
+
+        self.client.log_artifacts(self.run_id, local_path, artifact_path)
+
+        if registered_model_name:
+            mlflow.register_model(f"runs:/{self.run_id}/{artifact_path}", registered_model_name)
+
+    # ---------------------------------
+    # Completion
+    # ---------------------------------
+
+    def _submit(self, fn, *args, **kwargs):
+        self._futures.append(self._pool.submit(self._timed, fn, *args, **kwargs))
+
+    def _timed(self, fn, *args, **kwargs):
+
+        # Worker-thread time of every batch and upload, i.e. the real cost
+        # the callers no longer see
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._upload_s += time.perf_counter() - start
+
+    def _wait(self):
+
+        self.flush()
+        futures, self._futures = self._futures, []
+
+        errors = []
+        for future in futures:
+            try:
+                future.result()
+            except Exception as exc:
+                errors.append(exc)
+
+        return errors
+
+    def close(self):
+
+        # Wait for every pending batch and upload; a failed upload marks the
+        # run FAILED rather than leaving a FINISHED run without its model
+        if self.profiler is not None:
+            with self.profiler.stage("artifact_upload_wait"):
+                errors = self._wait()
+            self.profiler.stages[-1]["upload_s"] = self._upload_s
+
+            # The profile goes up last so it includes the wait
+            self.profiler.log_to_mlflow(self)
+            errors += self._wait()
+            self.profiler.cleanup()
+        else:
+            errors = self._wait()
+
+        self._pool.shutdown()
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+
+        if errors:
+            self.client.set_terminated(self.run_id, status="FAILED")
+            raise errors[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,10 +1,12 @@
 import mlflow
-import mlflow.xgboost
 import pandas as pd
 import numpy as np
 import xgboost as xgb
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 
+from training.profiling import StageProfiler
+from training.tracking import RunLogger
+
 # ---------------------------------------------------
 # CONFIG
 # ---------------------------------------------------
@@ -26,10 +28,13 @@ def train_model(STATION_ID):
     # LOAD DATA
     # ---------------------------------------------------
 
+    profiler = StageProfiler()
+
     print("Load Data")
 
-    df = pd.read_csv(DATA_PATH, parse_dates=["timestamp"])
-    df = df.sort_values("timestamp")
+    with profiler.stage("load_csv"):
+        df = pd.read_csv(DATA_PATH, parse_dates=["timestamp"])
+        df = df.sort_values("timestamp")
 
 
     # --------------------------------------------------
@@ -45,16 +50,17 @@ def train_model(STATION_ID):
 
     print("SPlit data")
 
-    split_time = df["timestamp"].quantile(0.8)
+    with profiler.stage("split"):
+        split_time = df["timestamp"].quantile(0.8)
 
-    train_df = df[df["timestamp"] <= split_time]
-    test_df  = df[df["timestamp"] > split_time]
+        train_df = df[df["timestamp"] <= split_time]
+        test_df  = df[df["timestamp"] > split_time]
 
-    X_train = train_df[FEATURES]
-    y_train = train_df[TARGET]
+        X_train = train_df[FEATURES]
+        y_train = train_df[TARGET]
 
-    X_test = test_df[FEATURES]
-    y_test = test_df[TARGET]
+        X_test = test_df[FEATURES]
+        y_test = test_df[TARGET]
 
     # ---------------------------------------------------
     # TRAIN
@@ -64,6 +70,8 @@ def train_model(STATION_ID):
 
     with mlflow.start_run():
 
+        run_logger = RunLogger(profiler=profiler)
+
         model = xgb.XGBRegressor(
             n_estimators=300,
             max_depth=6,
@@ -76,30 +84,48 @@ def train_model(STATION_ID):
 
         print("Model fitting")
 
-        model.fit(X_train, y_train)
-        preds = model.predict(X_test)
+        # XGBRegressor builds its DMatrix inside fit, so this covers both
+        with profiler.stage("boosting"):
+            model.fit(X_train, y_train)
+
+        with profiler.stage("evaluation"):
+            preds = model.predict(X_test)
+
+            mae = mean_absolute_error(y_test, preds)
+            rmse = np.sqrt(mean_squared_error(y_test, preds))
 
-        mae = mean_absolute_error(y_test, preds)
-        rmse = np.sqrt(mean_squared_error(y_test, preds))
+        run_logger.log_metric("mae", mae)
+        run_logger.log_metric("rmse", rmse)
 
-        mlflow.log_metric("mae", mae)
-        mlflow.log_metric("rmse", rmse)
+        LAGS = [int(c.split("-")[1]) for c in FEATURES if c.startswith("flow_t-")]
 
-        mlflow.log_param("lags", 120)
+        run_logger.log_param("lags", len(LAGS))
 
         print("Logging model")
 
-        mlflow.xgboost.log_model(
-            model,
-            artifact_path="model",
-            registered_model_name=MODEL_NAME
-        )
+        with profiler.stage("artifact_upload"):
+            run_logger.log_model(
+                model,
+                artifact_path="model",
+                registered_model_name=MODEL_NAME,
+                metadata={"lags": LAGS, "feature_cols": FEATURES}
+            )
 
         print("Training complete.")
         print("MAE:", mae)
         print("RMSE:", rmse)
 
+        # close() adds the artifact_upload_wait stage and logs the profile
+        profiler.print_summary()
+
+        run_logger.flush()
+
+    return run_logger
+
 stations = ["1000000518", "1000000471", "1000000523"]
 
-for i in stations:
-    train_model(i)
\ No newline at end of file
+run_loggers = [train_model(i) for i in stations]
+
+# Model uploads overlap with the next station's training; only wait at exit
+for run_logger in run_loggers:
+    run_logger.close()
\ No newline at end of file
@@ -0,0 +1,216 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import mlflow
+
+from training.station_data import regression_metrics
+from training.tracking import RunLogger
+from training.transit_table import TransitTable, table_grid
+from transit_times_data_generator import (
+    generate_route_transit_data,
+    holidays as HOLIDAYS,
+    route_matrix,
+)
+
+# =====================================
+# TRANSIT TIME MODEL CONFIG
+# =====================================
+
+MODEL_NAME = "transit_time_global"
+
+TARGET = "transit_time_min"
+
+# One model for every route; route_code is a categorical split feature
+TRANSIT_FEATURE_COLS = [
+    "route_code",
+    "base_time_min",
+    "day_of_week",
+    "hour_of_day",
+    "is_weekend",
+    "is_peak_hour",
+    "is_holiday",
+    "construction_active",
+]
+
+TRANSIT_PARAMS = {
+    "objective": "reg:squarederror",
+    "eval_metric": "rmse",
+    "tree_method": "hist",
+    "max_depth": 6,
+    "learning_rate": 0.05,
+    "subsample": 0.9,
+    "colsample_bytree": 0.9,
+    "min_child_weight": 3,
+    "seed": 42
+}
+
+TRAIN_FRACTION = 0.8
+TABLE_ARTIFACT = "transit_table/transit_table.npz"
+
+
+# =====================================
+# 1. TRIPS
+# =====================================
+
+def synthetic_trips(n_mother=3, n_dbs=20, days=365, seed=42):
+
+    # Route matrix with base times between 25 and 90 minutes
+    rng = np.random.default_rng(seed)
+
+    routes = route_matrix(
+        [f"MS{i:02d}" for i in range(1, n_mother + 1)],
+        [f"DBS{j:02d}" for j in range(1, n_dbs + 1)],
+        rng.uniform(25, 90, size=(n_mother, n_dbs)).round(),
+    )
+
+    return generate_route_transit_data(routes, days=days, holidays=HOLIDAYS, rng=rng)
+
+
+def route_base_times(trips):
+    return trips.groupby("route_id")["base_time_min"].first()
+
+
+def with_route_codes(frame, route_ids):
+
+    # Fixed category list, so training, the table grid and serving agree
+    frame = frame.copy()
+    frame["route_code"] = pd.Categorical(frame["route_id"], categories=list(route_ids))
+    return frame
+
+
+def split_by_time(trips, train_fraction=TRAIN_FRACTION):
+
+    split_time = trips["start_time"].quantile(train_fraction)
+
+    return trips[trips["start_time"] <= split_time], trips[trips["start_time"] > split_time]
+
+
+# =====================================
+# 2. TRAIN
+# =====================================
+
+def fit_transit_model(train_df, test_df):
+
+    dtrain = xgb.DMatrix(train_df[TRANSIT_FEATURE_COLS], label=train_df[TARGET],
+                         enable_categorical=True)
+    dtest = xgb.DMatrix(test_df[TRANSIT_FEATURE_COLS], label=test_df[TARGET],
+                        enable_categorical=True)
+
+    model = xgb.train(
+        TRANSIT_PARAMS,
+        dtrain,
+        num_boost_round=1000,
+        evals=[(dtest, "valid")],
+        early_stopping_rounds=50,
+        verbose_eval=100
+    )
+
+    return model, dtest
+
+
+# =====================================
+# 3. DENSE LOOKUP TABLE
+# =====================================
+
+def build_transit_table(model, base_times):
+
+    # Every (route, hour-of-week, holiday, construction) cell in one
+    # predict call; serving then only indexes the array
+    route_ids = list(base_times.index)
+    grid = with_route_codes(table_grid(route_ids, base_times.to_numpy()), route_ids)
+
+    dgrid = xgb.DMatrix(grid[TRANSIT_FEATURE_COLS], enable_categorical=True)
+    predictions = model.predict(dgrid, iteration_range=(0, model.best_iteration + 1))
+
+    return TransitTable.from_predictions(route_ids, predictions)
+
+
+# =====================================
+# RUN
+# =====================================
+
+def train_transit(trips):
+
+    base_times = route_base_times(trips)
+    route_ids = list(base_times.index)
+
+    trips = with_route_codes(trips.sort_values("start_time"), route_ids)
+    train_df, test_df = split_by_time(trips)
+
+    print("Routes:", len(route_ids))
+    print("Train trips:", len(train_df), "Test trips:", len(test_df))
+
+    with mlflow.start_run(run_name=MODEL_NAME):
+
+        run_logger = RunLogger()
+
+        start = time.perf_counter()
+        model, dtest = fit_transit_model(train_df, test_df)
+        run_logger.log_metric("train_seconds", time.perf_counter() - start)
+
+        y_pred = model.predict(dtest, iteration_range=(0, model.best_iteration + 1))
+        metrics = regression_metrics(test_df[TARGET], y_pred)
+
+        # Reference: per-route historical mean
+        route_mean = train_df.groupby("route_id", observed=True)[TARGET].mean()
+        baseline = regression_metrics(test_df[TARGET], test_df["route_id"].map(route_mean))
+
+        print("Model:", metrics)
+        print("Route-mean baseline:", baseline)
+
+        run_logger.log_metrics(metrics)
+        run_logger.log_metrics({f"route_mean_{k}": v for k, v in baseline.items()})
+
+        start = time.perf_counter()
+        table = build_transit_table(model, base_times)
+        run_logger.log_metric("table_build_seconds", time.perf_counter() - start)
+
+        run_logger.log_params(TRANSIT_PARAMS)
+        run_logger.log_params({"routes": len(route_ids), "best_iteration": model.best_iteration})
+
+        # Serving finds the table through the registered model's metadata
+        run_logger.log_model(
+            model,
+            artifact_path="model",
+            registered_model_name=MODEL_NAME,
+            metadata={"transit_table": TABLE_ARTIFACT, "feature_cols": TRANSIT_FEATURE_COLS}
+        )
+
+        # close() waits for the upload, so the directory outlives it
+        with tempfile.TemporaryDirectory(prefix="transit_table_") as table_dir:
+            table_path = os.path.join(table_dir, os.path.basename(TABLE_ARTIFACT))
+            table.save(table_path)
+            run_logger.log_artifact(table_path, os.path.dirname(TABLE_ARTIFACT))
+
+            run_logger.close()
+
+    return model, table
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Train the transit time model and its lookup table")
+    parser.add_argument("--trips", default=None, help="trip CSV (default: synthetic route matrix)")
+    parser.add_argument("--mother", type=int, default=3)
+    parser.add_argument("--dbs", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    mlflow.set_tracking_uri(
+        os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
+    )
+    mlflow.set_experiment("dot_prediction")
+
+    if args.trips:
+        trips = pd.read_csv(args.trips, parse_dates=["start_time"])
+    else:
+        trips = synthetic_trips(args.mother, args.dbs, args.days)
+
+    train_transit(trips)
+
+    print("Transit model and lookup table logged to MLflow.")
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# =====================================
+# DENSE EXPECTED-TRANSIT TABLE
+# =====================================
+
+# Kept free of training-only imports so serving can ship this file alone
+
+HOURS_PER_WEEK = 7 * 24
+
+# Flags the table is indexed by besides route and hour-of-week; weekend and
+# peak hour follow from the hour-of-week
+FLAG_COLS = ["is_holiday", "construction_active"]
+
+
+def is_peak_hour(hour):
+    hour = np.asarray(hour)
+    return ((7 <= hour) & (hour <= 10)) | ((17 <= hour) & (hour <= 21))
+
+
+def table_grid(route_ids, base_time_min):
+
+    # One row per (route, hour-of-week, holiday, construction), in the
+    # table's C order, so predictions reshape straight into it
+    route_idx, how, holiday, construction = np.meshgrid(
+        np.arange(len(route_ids)), np.arange(HOURS_PER_WEEK), [0, 1], [0, 1],
+        indexing="ij"
+    )
+    route_idx = route_idx.ravel()
+    how = how.ravel()
+
+    day_of_week = how // 24
+    hour = how % 24
+
+    return pd.DataFrame({
+        "route_id": np.asarray(route_ids, dtype=object)[route_idx],
+        "base_time_min": np.asarray(base_time_min, dtype=float)[route_idx],
+        "day_of_week": day_of_week,
+        "hour_of_day": hour,
+        "is_weekend": (day_of_week >= 5).astype(int),
+        "is_peak_hour": is_peak_hour(hour).astype(int),
+        "is_holiday": holiday.ravel(),
+        "construction_active": construction.ravel(),
+    })
+
+
+class TransitTable:
+
+    # table[route, hour_of_week, is_holiday, construction_active] holds the
+    # model's expected transit minutes; a lookup is pure array indexing
+
+    def __init__(self, route_ids, table):
+
+        self.route_ids = [str(r) for r in route_ids]
+        self.index = {r: i for i, r in enumerate(self.route_ids)}
+        self.table = np.asarray(table, dtype=np.float32)
+
+        expected = (len(self.route_ids), HOURS_PER_WEEK, 2, 2)
+        if self.table.shape != expected:
+            raise ValueError(f"table shape {self.table.shape} != {expected}")
+
+    @classmethod
+    def from_predictions(cls, route_ids, predictions):
+        return cls(route_ids, np.asarray(predictions).reshape(len(route_ids), HOURS_PER_WEEK, 2, 2))
+
+    # ---------------------------------
+    # Persistence
+    # ---------------------------------
+
+    def save(self, path):
+        np.savez_compressed(path, route_ids=np.array(self.route_ids), table=self.table)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["route_ids"], data["table"])
+
+    # ---------------------------------
+    # Lookups
+    # ---------------------------------
+
+    def lookup(self, route_id, departure, holiday=False, construction=False):
+
+        ts = pd.Timestamp(departure)
+        how = ts.weekday() * 24 + ts.hour
+
+        return float(self.table[self.index[route_id], how, int(holiday), int(construction)])
+
+    def lookup_many(self, route_ids, departures, holiday=False, construction=False):
+
+        # Vectorized over queries; unknown routes raise KeyError
+        idx = np.fromiter((self.index[r] for r in route_ids), dtype=np.int64, count=len(route_ids))
+        ts = pd.DatetimeIndex(departures)
+        how = np.asarray(ts.weekday) * 24 + np.asarray(ts.hour)
+
+        holiday = np.broadcast_to(np.asarray(holiday, dtype=np.int64), idx.shape)
+        construction = np.broadcast_to(np.asarray(construction, dtype=np.int64), idx.shape)
+
+        return self.table[idx, how, holiday, construction]
@@ -0,0 +1,277 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import xgboost as xgb
+import mlflow
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+from training.dmatrix_cache import cached_station_split, to_dmatrices
+from training.station_data import STATION_FILES, XGB_PARAMS
+from training.tracking import RunLogger
+
+# =====================================
+# SEARCH CONFIG
+# =====================================
+
+N_TRIALS = 27
+MIN_ROUNDS = 50
+MAX_ROUNDS = 1200
+ETA = 3
+EARLY_STOPPING_ROUNDS = 50
+
+# Tail of the training block that the trials are raced on; the test block
+# only scores each station's winner
+VALIDATION_FRACTION = 0.2
+
+# (low, high, scale) — "int" params are drawn uniformly from [low, high]
+SEARCH_SPACE = {
+    "tweedie_variance_power": (1.05, 1.8, "linear"),
+    "max_depth": (3, 8, "int"),
+    "learning_rate": (0.01, 0.2, "log"),
+    "subsample": (0.6, 1.0, "linear"),
+    "colsample_bytree": (0.5, 1.0, "linear"),
+    "min_child_weight": (1, 20, "log"),
+    "gamma": (0.0, 1.0, "linear"),
+}
+
+
+def sample_configs(rng, n_trials):
+
+    configs = []
+    for _ in range(n_trials):
+        config = {}
+        for name, (low, high, scale) in SEARCH_SPACE.items():
+            if scale == "log":
+                config[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            elif scale == "int":
+                config[name] = int(rng.integers(low, high + 1))
+            else:
+                config[name] = float(rng.uniform(low, high))
+        configs.append(config)
+
+    # Always race the current hand-picked parameters too
+    configs[0] = {name: XGB_PARAMS[name] for name in SEARCH_SPACE}
+
+    return configs
+
+
+def search_budget(n_trials=N_TRIALS, min_rounds=MIN_ROUNDS, max_rounds=MAX_ROUNDS, eta=ETA):
+
+    # Upper bound on boosting rounds per station: each rung trains n survivors
+    # up to the rung budget, and survivors only ever add the missing rounds
+    total, n, budget, trained = 0, n_trials, min_rounds, 0
+    while True:
+        total += n * (budget - trained)
+        if n <= 1 or budget >= max_rounds:
+            return total
+        n, trained, budget = max(1, n // eta), budget, min(budget * eta, max_rounds)
+
+
+# =====================================
+# SUCCESSIVE HALVING (ONE STATION)
+# =====================================
+
+_DMATRIX_CACHE = {}
+
+
+def station_matrices(station, data_path):
+
+    # Built once per worker process and reused by every trial and rung; the
+    # prepared split itself comes from the on-disk content-hash cache.
+    # Returns (fit, valid) for the search and (train, test) for the winner
+    if station not in _DMATRIX_CACHE:
+        arrays, _, _ = cached_station_split(data_path)
+
+        # Rows are in time order, so the validation block is the tail
+        cut = int(len(arrays["y_train"]) * (1 - VALIDATION_FRACTION))
+        search_arrays = {
+            "X_train": arrays["X_train"][:cut],
+            "y_train": arrays["y_train"][:cut],
+            "X_valid": arrays["X_train"][cut:],
+            "y_valid": arrays["y_train"][cut:],
+        }
+
+        _DMATRIX_CACHE[station] = (to_dmatrices(search_arrays, quantile=True),
+                                   to_dmatrices(arrays, quantile=True))
+
+    return _DMATRIX_CACHE[station]
+
+
+def log_trial(client, experiment_id, parent_run_id, station, trial):
+
+    run = client.create_run(
+        experiment_id,
+        run_name=f"{station}_trial_{trial['trial']:02d}",
+        tags={"mlflow.parentRunId": parent_run_id, "station": station},
+    )
+
+    timestamp = int(time.time() * 1000)
+    metrics = [Metric("valid_rmse_curve", v, timestamp, step) for step, v in enumerate(trial["curve"])]
+    metrics += [
+        Metric("valid_rmse", trial["score"], timestamp, 0),
+        Metric("best_round", trial["best_round"], timestamp, 0),
+        Metric("rounds_trained", trial["rounds"], timestamp, 0),
+        Metric("rung", trial["rung"], timestamp, 0),
+    ]
+
+    client.log_batch(
+        run.info.run_id,
+        metrics=metrics,
+        params=[Param(k, str(v)) for k, v in trial["params"].items()],
+        tags=[RunTag("pruned", str(trial["pruned"]))],
+    )
+    client.set_terminated(run.info.run_id)
+
+
+def tune_station(station, data_path, experiment_id, parent_run_id, n_trials=N_TRIALS,
+                 min_rounds=MIN_ROUNDS, max_rounds=MAX_ROUNDS, eta=ETA, seed=42, nthread=1):
+
+    client = MlflowClient()
+    station_run = client.create_run(
+        experiment_id,
+        run_name=f"tune_{station}",
+        tags={"mlflow.parentRunId": parent_run_id, "station": station},
+    )
+    station_run_id = station_run.info.run_id
+
+    (dfit, dvalid), (dtrain, dtest) = station_matrices(station, data_path)
+
+    rng = np.random.default_rng(seed)
+    survivors = [
+        {"trial": i, "params": {**XGB_PARAMS, **config, "nthread": nthread},
+         "booster": None, "rounds": 0, "curve": [], "converged": False}
+        for i, config in enumerate(sample_configs(rng, n_trials))
+    ]
+
+    budget, rung = min_rounds, 0
+
+    while True:
+
+        for trial in survivors:
+            if trial["converged"]:
+                continue
+
+            # Resume from the previous rung's booster; only the new rounds are trained
+            extra = budget - trial["rounds"]
+            evals_result = {}
+            trial["booster"] = xgb.train(
+                trial["params"],
+                dfit,
+                num_boost_round=extra,
+                evals=[(dvalid, "valid")],
+                evals_result=evals_result,
+                early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                xgb_model=trial["booster"],
+                verbose_eval=False
+            )
+
+            curve = evals_result["valid"]["rmse"]
+            trial["curve"].extend(curve)
+            trial["rounds"] += len(curve)
+            trial["converged"] = len(curve) < extra
+            trial["score"] = float(np.min(trial["curve"]))
+            trial["best_round"] = int(np.argmin(trial["curve"])) + 1
+            trial["rung"] = rung
+
+        survivors.sort(key=lambda t: t["score"])
+
+        if len(survivors) <= 1 or budget >= max_rounds:
+            break
+
+        keep = max(1, len(survivors) // eta)
+        for trial in survivors[keep:]:
+            trial["pruned"] = True
+            log_trial(client, experiment_id, station_run_id, station, trial)
+
+        survivors = survivors[:keep]
+        budget, rung = min(budget * eta, max_rounds), rung + 1
+
+    for trial in survivors:
+        trial["pruned"] = False
+        log_trial(client, experiment_id, station_run_id, station, trial)
+
+    best = survivors[0]
+    best_params = {k: v for k, v in best["params"].items() if k != "nthread"}
+
+    # Only the winner sees the test block: refit on the whole training block
+    # for its best round count and score once
+    model = xgb.train(best["params"], dtrain, num_boost_round=best["best_round"])
+    test_rmse = float(np.sqrt(np.mean((dtest.get_label() - model.predict(dtest)) ** 2)))
+
+    timestamp = int(time.time() * 1000)
+    client.log_batch(
+        station_run_id,
+        metrics=[Metric("best_valid_rmse", best["score"], timestamp, 0),
+                 Metric("best_round", best["best_round"], timestamp, 0),
+                 Metric("test_rmse", test_rmse, timestamp, 0)],
+        params=[Param(k, str(v)) for k, v in best_params.items()],
+    )
+    client.set_terminated(station_run_id)
+
+    return station, {"params": best_params, "valid_rmse": best["score"],
+                     "test_rmse": test_rmse, "num_boost_round": best["best_round"]}
+
+
+def _tune_station_task(args):
+    return tune_station(*args)
+
+
+# =====================================
+# FLEET SEARCH
+# =====================================
+
+def tune_fleet(station_files=STATION_FILES, n_trials=N_TRIALS, max_workers=None, seed=42):
+
+    # One process per station at most; the cores left over go to xgboost
+    # threads inside each process
+    cpu_count = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cpu_count, len(station_files)))
+    nthread = max(1, cpu_count // max_workers)
+
+    run = mlflow.active_run()
+    tasks = [
+        (station, path, run.info.experiment_id, run.info.run_id, n_trials,
+         MIN_ROUNDS, MAX_ROUNDS, ETA, seed + i, nthread)
+        for i, (station, path) in enumerate(station_files.items())
+    ]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return dict(pool.map(_tune_station_task, tasks))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Successive-halving search over the Tweedie station params")
+    parser.add_argument("--trials", type=int, default=N_TRIALS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    mlflow.set_experiment("dot_prediction")
+
+    with mlflow.start_run(run_name="tune_station_params"):
+
+        run_logger = RunLogger()
+
+        run_logger.log_params({
+            "trials": args.trials,
+            "min_rounds": MIN_ROUNDS,
+            "max_rounds": MAX_ROUNDS,
+            "eta": ETA,
+            "round_budget_per_station": search_budget(args.trials),
+        })
+
+        best = tune_fleet(n_trials=args.trials, max_workers=args.workers, seed=args.seed)
+
+        for station, result in best.items():
+            print(station, "valid RMSE:", round(result["valid_rmse"], 3),
+                  "test RMSE:", round(result["test_rmse"], 3), result["params"])
+            run_logger.log_metrics({f"{station}_best_valid_rmse": result["valid_rmse"],
+                                    f"{station}_test_rmse": result["test_rmse"]})
+
+        run_logger.log_dict(best, "best_params.json")
+        run_logger.close()
@@ -1,374 +1,129 @@
-import pandas as pd
-import numpy as np
 import xgboost as xgb
 import mlflow
-import mlflow.xgboost
-from sklearn.metrics import mean_absolute_error
+
+from training.dmatrix_cache import cached_station_split, to_dmatrices
+from training.profiling import StageProfiler
+from training.station_data import (
+    FEATURE_COLS,
+    XGB_PARAMS,
+    regression_metrics,
+)
+from training.tracking import RunLogger
 
 # =====================================
-# SET MLFLOW EXPERIMENT
+# PER-STATION MODELS
 # =====================================
 
-mlflow.set_experiment("dot_prediction")
-
-with mlflow.start_run():
-
-    # =====================================
-    # 1. LOAD RAW EVENT DATA
-    # =====================================
-
-    df = pd.read_csv("data/GMPatel_40_sales.csv")
-
-    df["timestamp"] = pd.to_datetime(df["Time"])
-    df = df.sort_values("timestamp").reset_index(drop=True)
-
-    print("Raw rows:", len(df))
-    mlflow.log_metric("raw_rows", len(df))
-
-
-    # =====================================
-    # 2. CONVERT CUMULATIVE → EVENT SALES
-    # =====================================
-
-    df["event_sale"] = df["Value"].diff()
-    df["event_sale"] = df["event_sale"].fillna(0)
-
-    # Handle refill reset
-    df.loc[df["event_sale"] < 0, "event_sale"] = 0
-
-
-    # =====================================
-    # 3. CREATE 15-MIN BUCKETS
-    # =====================================
-
-    df["bucket_start"] = df["timestamp"].dt.floor("15min")
-
-    bucket_df = (
-        df.groupby("bucket_start")["event_sale"]
-        .sum()
-        .reset_index()
-        .rename(columns={"event_sale": "sales_15min"})
-    )
-
-    # Cap extreme outliers
-    upper_cap = bucket_df["sales_15min"].quantile(0.995)
-    bucket_df["sales_15min"] = np.minimum(bucket_df["sales_15min"], upper_cap)
-
-    # Fill missing buckets
-    full_range = pd.date_range(
-        start=bucket_df["bucket_start"].min(),
-        end=bucket_df["bucket_start"].max(),
-        freq="15min"
-    )
-
-    bucket_df = bucket_df.set_index("bucket_start").reindex(full_range).fillna(0)
-    bucket_df.index.name = "bucket_start"
-    bucket_df = bucket_df.reset_index()
-
-    print("15-min buckets:", len(bucket_df))
-    print("Zero buckets:", (bucket_df["sales_15min"] == 0).sum())
-
-    mlflow.log_metric("total_buckets", len(bucket_df))
-    mlflow.log_metric("zero_bucket_pct",
-                      (bucket_df["sales_15min"] == 0).mean() * 100)
-
-
-    # =====================================
-    # 4. FEATURE ENGINEERING
-    # =====================================
-
-    bucket_df = bucket_df.sort_values("bucket_start").reset_index(drop=True)
-
-    bucket_df["hour"] = bucket_df["bucket_start"].dt.hour
-    bucket_df["day_of_week"] = bucket_df["bucket_start"].dt.dayofweek
-
-    lag_list = [1,2,3,4,8,12,24,96]
-
-    for lag in lag_list:
-        bucket_df[f"lag_{lag}"] = bucket_df["sales_15min"].shift(lag)
-
-    bucket_df["rolling_mean_4"] = bucket_df["sales_15min"].shift(1).rolling(4).mean()
-    bucket_df["rolling_mean_8"] = bucket_df["sales_15min"].shift(1).rolling(8).mean()
-    bucket_df["rolling_mean_96"] = bucket_df["sales_15min"].shift(1).rolling(96).mean()
-
-    bucket_df["target"] = bucket_df["sales_15min"].shift(-1)
-
-    train_df = bucket_df.dropna().reset_index(drop=True)
-
-    print("Final usable rows:", len(train_df))
-    mlflow.log_metric("usable_rows", len(train_df))
-
-
-    # =====================================
-    # 5. TRAIN / TEST SPLIT
-    # =====================================
-
-    split_index = int(len(train_df) * 0.8)
-
-    train_data = train_df.iloc[:split_index]
-    test_data  = train_df.iloc[split_index:]
-
-    FEATURE_COLS = [
-        'lag_1','lag_2','lag_3','lag_4',
-        'lag_8','lag_12','lag_24','lag_96',
-        'rolling_mean_4','rolling_mean_8','rolling_mean_96',
-        'hour','day_of_week'
-    ]
-
-    X_train = train_data[FEATURE_COLS]
-    y_train = train_data["target"]
+STATIONS = {
+    "xgb_station_471": "data/GMPatel_40_sales.csv",
+    "xgb_station_523": "data/swaminarayan_65_sales.csv",
+}
 
-    X_test = test_data[FEATURE_COLS]
-    y_test = test_data["target"]
 
+def train_station(data_path, model_name):
 
-    # =====================================
-    # 6. TRAIN XGBOOST
-    # =====================================
-
-    params = {
-        "objective": "reg:tweedie",
-        "tweedie_variance_power": 1.2,
-        "eval_metric": "rmse",
-        "max_depth": 4,
-        "learning_rate": 0.03,
-        "subsample": 0.9,
-        "colsample_bytree": 0.7,
-        "min_child_weight": 3,
-        "gamma": 0.1,
-        "seed": 42
-    }
-
-    dtrain = xgb.DMatrix(X_train, label=y_train)
-    dtest  = xgb.DMatrix(X_test, label=y_test)
-
-    model = xgb.train(
-        params,
-        dtrain,
-        num_boost_round=1200,
-        evals=[(dtrain, "train"), (dtest, "valid")],
-        early_stopping_rounds=50,
-        verbose_eval=100
-    )
-
-
-    # =====================================
-    # 7. EVALUATION
-    # =====================================
-
-    y_pred = model.predict(dtest)
-
-    rmse = np.sqrt(np.mean((y_test - y_pred)**2))
-    mae = mean_absolute_error(y_test, y_pred)
-    wape = np.sum(np.abs(y_test - y_pred)) / np.sum(np.abs(y_test)) * 100
-
-    print("\n==== FINAL METRICS ====")
-    print("RMSE:", rmse)
-    print("MAE:", mae)
-    print("WAPE:", wape)
-
-    # Log metrics
-    mlflow.log_metric("rmse", rmse)
-    mlflow.log_metric("mae", mae)
-    mlflow.log_metric("wape", wape)
-
-    # Log parameters
-    mlflow.log_params(params)
+    profiler = StageProfiler()
 
-    # Log feature list as artifact
-    with open("feature_cols.txt", "w") as f:
-        for col in FEATURE_COLS:
-            f.write(col + "\n")
+    with mlflow.start_run():
 
-    mlflow.log_artifact("feature_cols.txt")
+        run_logger = RunLogger(profiler=profiler)
 
-    # Log model
-    mlflow.xgboost.log_model(
-        model,
-        artifact_path="model",
-        registered_model_name="xgb_station_471"
-    )
+        # =====================================
+        # 0. PREPARED-SPLIT CACHE
+        # =====================================
 
-    print("Model saved and logged to MLflow.")
+        # Load -> bucket -> features -> split on a miss, each step profiled
+        arrays, data_stats, cache_hit = cached_station_split(data_path, stage=profiler.stage)
 
-mlflow.set_experiment("dot_prediction")
-
-with mlflow.start_run():
-
-    # =====================================
-    # 1. LOAD RAW EVENT DATA
-    # =====================================
-
-    df = pd.read_csv("data/swaminarayan_65_sales.csv")
-
-    df["timestamp"] = pd.to_datetime(df["Time"])
-    df = df.sort_values("timestamp").reset_index(drop=True)
-
-    print("Raw rows:", len(df))
-    mlflow.log_metric("raw_rows", len(df))
-
-
-    # =====================================
-    # 2. CONVERT CUMULATIVE → EVENT SALES
-    # =====================================
+        print("Prepared split cache", "hit" if cache_hit else "miss")
+        print("Raw rows:", data_stats["raw_rows"])
+        print("15-min buckets:", data_stats["total_buckets"])
+        print("Zero buckets %:", data_stats["zero_bucket_pct"])
+        print("Final usable rows:", data_stats["usable_rows"])
 
-    df["event_sale"] = df["Value"].diff()
-    df["event_sale"] = df["event_sale"].fillna(0)
+        run_logger.set_tag("split_cache", "hit" if cache_hit else "miss")
+        run_logger.log_metrics(data_stats)
 
-    # Handle refill reset
-    df.loc[df["event_sale"] < 0, "event_sale"] = 0
+        y_test = arrays["y_valid"]
 
 
-    # =====================================
-    # 3. CREATE 15-MIN BUCKETS
-    # =====================================
+        # =====================================
+        # 6. TRAIN XGBOOST
+        # =====================================
 
-    df["bucket_start"] = df["timestamp"].dt.floor("15min")
+        params = dict(XGB_PARAMS)
 
-    bucket_df = (
-        df.groupby("bucket_start")["event_sale"]
-        .sum()
-        .reset_index()
-        .rename(columns={"event_sale": "sales_15min"})
-    )
+        with profiler.stage("dmatrix"):
+            dtrain, dtest = to_dmatrices(arrays)
 
-    # Cap extreme outliers
-    upper_cap = bucket_df["sales_15min"].quantile(0.995)
-    bucket_df["sales_15min"] = np.minimum(bucket_df["sales_15min"], upper_cap)
+        with profiler.stage("boosting"):
+            model = xgb.train(
+                params,
+                dtrain,
+                num_boost_round=1200,
+                evals=[(dtrain, "train"), (dtest, "valid")],
+                early_stopping_rounds=50,
+                verbose_eval=100
+            )
 
-    # Fill missing buckets
-    full_range = pd.date_range(
-        start=bucket_df["bucket_start"].min(),
-        end=bucket_df["bucket_start"].max(),
-        freq="15min"
-    )
 
-    bucket_df = bucket_df.set_index("bucket_start").reindex(full_range).fillna(0)
-    bucket_df.index.name = "bucket_start"
-    bucket_df = bucket_df.reset_index()
+        # =====================================
+        # 7. EVALUATION
+        # =====================================
 
-    print("15-min buckets:", len(bucket_df))
-    print("Zero buckets:", (bucket_df["sales_15min"] == 0).sum())
+        with profiler.stage("evaluation"):
+            y_pred = model.predict(dtest)
 
-    mlflow.log_metric("total_buckets", len(bucket_df))
-    mlflow.log_metric("zero_bucket_pct",
-                      (bucket_df["sales_15min"] == 0).mean() * 100)
+            metrics = regression_metrics(y_test, y_pred)
 
+        print("\n==== FINAL METRICS ====")
+        print("RMSE:", metrics["rmse"])
+        print("MAE:", metrics["mae"])
+        print("WAPE:", metrics["wape"])
 
-    # =====================================
-    # 4. FEATURE ENGINEERING
-    # =====================================
+        # Log metrics
+        run_logger.log_metrics(metrics)
 
-    bucket_df = bucket_df.sort_values("bucket_start").reset_index(drop=True)
+        # Log parameters
+        run_logger.log_params(params)
 
-    bucket_df["hour"] = bucket_df["bucket_start"].dt.hour
-    bucket_df["day_of_week"] = bucket_df["bucket_start"].dt.dayofweek
+        # Uploads run in the background; this stage only measures the hand-off,
+        # the upload itself shows up as artifact_upload_wait at close()
+        with profiler.stage("artifact_upload"):
 
-    lag_list = [1,2,3,4,8,12,24,96]
+            # Log feature list as artifact
+            run_logger.log_text("\n".join(FEATURE_COLS) + "\n", "feature_cols.txt")
 
-    for lag in lag_list:
-        bucket_df[f"lag_{lag}"] = bucket_df["sales_15min"].shift(lag)
+            # Log model
+            run_logger.log_model(
+                model,
+                artifact_path="model",
+                registered_model_name=model_name
+            )
 
-    bucket_df["rolling_mean_4"] = bucket_df["sales_15min"].shift(1).rolling(4).mean()
-    bucket_df["rolling_mean_8"] = bucket_df["sales_15min"].shift(1).rolling(8).mean()
-    bucket_df["rolling_mean_96"] = bucket_df["sales_15min"].shift(1).rolling(96).mean()
+        # close() adds the artifact_upload_wait stage and logs the profile
+        profiler.print_summary()
 
-    bucket_df["target"] = bucket_df["sales_15min"].shift(-1)
+        run_logger.flush()
 
-    train_df = bucket_df.dropna().reset_index(drop=True)
+    return run_logger
 
-    print("Final usable rows:", len(train_df))
-    mlflow.log_metric("usable_rows", len(train_df))
 
+if __name__ == "__main__":
 
     # =====================================
-    # 5. TRAIN / TEST SPLIT
+    # SET MLFLOW EXPERIMENT
     # =====================================
 
-    split_index = int(len(train_df) * 0.8)
-
-    train_data = train_df.iloc[:split_index]
-    test_data  = train_df.iloc[split_index:]
+    mlflow.set_experiment("dot_prediction")
 
-    FEATURE_COLS = [
-        'lag_1','lag_2','lag_3','lag_4',
-        'lag_8','lag_12','lag_24','lag_96',
-        'rolling_mean_4','rolling_mean_8','rolling_mean_96',
-        'hour','day_of_week'
+    run_loggers = [
+        train_station(data_path, model_name)
+        for model_name, data_path in STATIONS.items()
     ]
 
-    X_train = train_data[FEATURE_COLS]
-    y_train = train_data["target"]
-
-    X_test = test_data[FEATURE_COLS]
-    y_test = test_data["target"]
-
-
-    # =====================================
-    # 6. TRAIN XGBOOST
-    # =====================================
-
-    params = {
-        "objective": "reg:tweedie",
-        "tweedie_variance_power": 1.2,
-        "eval_metric": "rmse",
-        "max_depth": 4,
-        "learning_rate": 0.03,
-        "subsample": 0.9,
-        "colsample_bytree": 0.7,
-        "min_child_weight": 3,
-        "gamma": 0.1,
-        "seed": 42
-    }
-
-    dtrain = xgb.DMatrix(X_train, label=y_train)
-    dtest  = xgb.DMatrix(X_test, label=y_test)
-
-    model = xgb.train(
-        params,
-        dtrain,
-        num_boost_round=1200,
-        evals=[(dtrain, "train"), (dtest, "valid")],
-        early_stopping_rounds=50,
-        verbose_eval=100
-    )
-
-
-    # =====================================
-    # 7. EVALUATION
-    # =====================================
-
-    y_pred = model.predict(dtest)
-
-    rmse = np.sqrt(np.mean((y_test - y_pred)**2))
-    mae = mean_absolute_error(y_test, y_pred)
-    wape = np.sum(np.abs(y_test - y_pred)) / np.sum(np.abs(y_test)) * 100
-
-    print("\n==== FINAL METRICS ====")
-    print("RMSE:", rmse)
-    print("MAE:", mae)
-    print("WAPE:", wape)
-
-    # Log metrics
-    mlflow.log_metric("rmse", rmse)
-    mlflow.log_metric("mae", mae)
-    mlflow.log_metric("wape", wape)
-
-    # Log parameters
-    mlflow.log_params(params)
-
-    # Log feature list as artifact
-    with open("feature_cols.txt", "w") as f:
-        for col in FEATURE_COLS:
-            f.write(col + "\n")
-
-    mlflow.log_artifact("feature_cols.txt")
-
-    # Log model
-    mlflow.xgboost.log_model(
-        model,
-        artifact_path="model",
-        registered_model_name="xgb_station_523"
-    )
+    # Uploads overlap with the next station's training; only wait at exit
+    for run_logger in run_loggers:
+        run_logger.close()
 
-    print("Model saved and logged to MLflow.")
\ No newline at end of file
+    print("Models saved and logged to MLflow.")
@@ -27,10 +27,11 @@ def generate_construction_windows(
 def is_under_construction(ts, construction_windows):
     return any(start <= ts <= end for start, end in construction_windows)
 
+TRIPS_PER_DAY = [0, 1, 2, 3, 4, 5, 6]
+TRIPS_PER_DAY_PROBS = [0.003, 0.05, 0.15, 0.30, 0.25, 0.20, 0.047]
+
 def sample_trips_per_day():
-    trips = [0, 1, 2, 3, 4, 5, 6]
-    probs = [0.003, 0.05, 0.15, 0.30, 0.25, 0.20, 0.047]
-    return np.random.choice(trips, p=probs)
+    return np.random.choice(TRIPS_PER_DAY, p=TRIPS_PER_DAY_PROBS)
 
 # -----------------------
 # Main generator
@@ -112,6 +113,133 @@ def generate_transit_data(
 
     return pd.DataFrame(rows)
 
+# -----------------------
+# Vectorized multi-route generator
+# -----------------------
+
+def route_matrix(mother_station_ids, dbs_ids, base_transit_min):
+
+    # One route per (mother station, DBS) pair; base_transit_min is a
+    # scalar or an (n_mother, n_dbs) matrix
+    base = np.broadcast_to(
+        np.asarray(base_transit_min, dtype=float),
+        (len(mother_station_ids), len(dbs_ids))
+    )
+
+    return {
+        f"{ms}_{dbs}": float(base[i, j])
+        for i, ms in enumerate(mother_station_ids)
+        for j, dbs in enumerate(dbs_ids)
+    }
+
+
+def construction_interval_index(n_routes, days, rng, num_events=3, min_duration=7, max_duration=21):
+
+    # Same windows as generate_construction_windows, per route, in hours
+    # from start_date. Overlapping windows are merged so each route's
+    # intervals are disjoint; keyed by route * span + hour they form one
+    # sorted array for the whole fleet
+    start_day = rng.integers(0, days - max_duration + 1, size=(n_routes, num_events))
+    duration = rng.integers(min_duration, max_duration + 1, size=(n_routes, num_events))
+
+    order = np.argsort(start_day, axis=1)
+    starts = np.take_along_axis(start_day, order, axis=1) * 24
+    ends = np.take_along_axis(start_day + duration, order, axis=1) * 24
+
+    span = (days + max_duration + 1) * 24
+    merged_starts, merged_ends = [], []
+
+    for r in range(n_routes):
+        cur_start, cur_end = starts[r, 0], ends[r, 0]
+        for s, e in zip(starts[r, 1:], ends[r, 1:]):
+            if s <= cur_end:
+                cur_end = max(cur_end, e)
+            else:
+                merged_starts.append(r * span + cur_start)
+                merged_ends.append(r * span + cur_end)
+                cur_start, cur_end = s, e
+        merged_starts.append(r * span + cur_start)
+        merged_ends.append(r * span + cur_end)
+
+    return np.array(merged_starts), np.array(merged_ends), span
+
+
+def in_intervals(keys, interval_starts, interval_ends):
+
+    # Closed-interval membership for every key with one binary search
+    i = np.searchsorted(interval_starts, keys, side="right") - 1
+    return (i >= 0) & (keys <= interval_ends[np.maximum(i, 0)])
+
+
+def holiday_bitmap(start_date, days, holidays):
+
+    day_dates = pd.date_range(start_date, periods=days, freq="D").date
+    return np.array([d in holidays for d in day_dates]) if holidays else np.zeros(days, dtype=bool)
+
+
+def generate_route_transit_data(
+    routes,
+    start_date="2025-01-01",
+    days=365,
+    holidays=None,
+    rng=None
+):
+    # Every route's trips in one pass; routes maps route_id -> base minutes
+    rng = rng if rng is not None else np.random.default_rng(42)
+
+    start_date = pd.Timestamp(start_date)
+    route_ids = list(routes)
+    base = np.array([routes[r] for r in route_ids], dtype=float)
+    n_routes = len(route_ids)
+
+    # Trips per (route, day), then one row per trip
+    counts = rng.choice(TRIPS_PER_DAY, p=TRIPS_PER_DAY_PROBS, size=(n_routes, days))
+    route_idx = np.repeat(np.repeat(np.arange(n_routes), days), counts.ravel())
+    day_idx = np.repeat(np.tile(np.arange(days), n_routes), counts.ravel())
+    n = len(route_idx)
+
+    hour = rng.integers(5, 24, size=n)
+    hours_from_start = day_idx * 24 + hour
+
+    dow = (start_date.weekday() + day_idx) % 7
+    weekend = (dow >= 5).astype(int)
+    peak = (((7 <= hour) & (hour <= 10)) | ((17 <= hour) & (hour <= 21))).astype(int)
+    holiday = holiday_bitmap(start_date, days, holidays)[day_idx].astype(int)
+
+    starts, ends, span = construction_interval_index(n_routes, days, rng)
+    construction = in_intervals(route_idx * span + hours_from_start, starts, ends).astype(int)
+
+    transit = base[route_idx] * np.where(weekend, 0.9, 1.0)
+
+    # Peak hour congestion, holiday, construction
+    transit += peak * rng.uniform(8, 18, size=n)
+    transit += holiday * rng.uniform(5, 15, size=n)
+    transit += construction * rng.uniform(15, 30, size=n)
+
+    # Random noise + rare extreme events
+    transit += rng.normal(0, 3, size=n)
+    transit += (rng.random(n) < 0.01) * rng.uniform(20, 45, size=n)
+
+    transit = np.maximum(20, np.round(transit, 1))
+
+    # Trip ids restart at T1 per route, as with one generate_transit_data call per route
+    route_starts = np.r_[0, np.cumsum(counts.sum(axis=1))[:-1]]
+    trip_number = np.arange(n) - route_starts[route_idx] + 1
+
+    return pd.DataFrame({
+        "trip_id": np.char.add("T", trip_number.astype(str)),
+        "route_id": np.array(route_ids, dtype=object)[route_idx],
+        "start_time": start_date + pd.to_timedelta(hours_from_start, unit="h"),
+        "day_of_week": dow,
+        "hour_of_day": hour,
+        "is_weekend": weekend,
+        "is_peak_hour": peak,
+        "is_holiday": holiday,
+        "construction_active": construction,
+        "base_time_min": base[route_idx],
+        "transit_time_min": transit
+    })
+
 import pandas as pd
 
 holidays = {
@@ -143,10 +271,12 @@ holidays = {
     pd.Timestamp("2025-12-25").date(),  # Christmas Day
 }
 
-df_transit = generate_transit_data(
-    route_id="MS01_DBS01",
-    start_date="2025-01-01",
-    days=365,
-    base_transit_min=42,
-    holidays=holidays
-)
\ No newline at end of file
+if __name__ == "__main__":
+
+    df_transit = generate_transit_data(
+        route_id="MS01_DBS01",
+        start_date="2025-01-01",
+        days=365,
+        base_transit_min=42,
+        holidays=holidays
+    )
\ No newline at end of file
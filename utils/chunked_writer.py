@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+
+# ============================================================
+# CHUNKED (CONSTANT-MEMORY) WRITER
+# ============================================================
+
+# Generators yield one day / week of rows at a time; each chunk is appended
+# as a Parquet row group or a CSV block and then dropped, so peak memory is
+# one chunk whatever the horizon
+
+
+class ChunkedWriter:
+
+    def __init__(self, path, fmt=None):
+
+        self.path = path
+        self.fmt = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+        self.rows = 0
+        self.chunks = 0
+        self._parquet = None
+
+        if self.fmt not in ("parquet", "csv"):
+            raise ValueError(f"unsupported format: {self.fmt}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, df: pd.DataFrame):
+
+        if self.fmt == "parquet":
+            self._write_parquet(df)
+        else:
+            # Header only on the first block; later blocks append
+            df.to_csv(self.path, mode="w" if self.chunks == 0 else "a",
+                      header=self.chunks == 0, index=False)
+
+        self.rows += len(df)
+        self.chunks += 1
+
+    def _write_parquet(self, df):
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.path, table.schema)
+
+        self._parquet.write_table(table)
+
+    def close(self):
+
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_chunks(chunks, path, fmt=None):
+
+    with ChunkedWriter(path, fmt) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    return writer.rows
@@ -0,0 +1,351 @@
+import argparse
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+# ============================================================
+# REFILL DISPATCH PLANNER
+# ============================================================
+
+# All times are minutes on the simulator clock (minutes since 1970-01-01)
+
+PAYLOAD_KG = 4000
+SERVICE_MIN = 30
+LOAD_MIN = 30
+SAFETY_MIN = 60
+HORIZON_MIN = 24 * 60
+
+# Stations without measurable consumption never run dry
+MIN_RATE = 1e-6
+
+
+class DispatchPlanner:
+
+    # Stations sit in a min-heap keyed on latest-feasible departure
+    # (predicted stock-out - best transit - safety margin); each mother
+    # station keeps a min-heap of trucks keyed on when they are free.
+    # plan() repeatedly takes the most urgent station, sends whichever
+    # mother station's next truck reaches it first, and pushes the station
+    # back with its post-delivery stock-out, until the horizon is covered.
+    #
+    # update_station() is O(log n): a new forecast pushes a fresh heap
+    # entry and the old one goes stale. Trips passed to commit() are fixed;
+    # everything else is re-planned from the current forecasts.
+
+    def __init__(self, trucks, transit, payload_kg=PAYLOAD_KG, service_min=SERVICE_MIN,
+                 load_min=LOAD_MIN, safety_min=SAFETY_MIN, horizon_min=HORIZON_MIN):
+
+        # trucks: truck_id -> mother station id
+        # transit(mother_station, station_id, departure_minute) -> minutes
+        self.trucks = dict(trucks)
+        self.mother_stations = sorted(set(self.trucks.values()))
+        self.transit = transit
+
+        self.payload_kg = payload_kg
+        self.service_min = service_min
+        self.load_min = load_min
+        self.safety_min = safety_min
+        self.horizon_min = horizon_min
+
+        self.truck_free_at = {truck: 0.0 for truck in self.trucks}
+
+        # station_id -> (stock, rate_kg_per_min, capacity, observed_at, version)
+        self.stations = {}
+        self.inbound = {}
+        self._heap = []
+        self._seq = itertools.count()
+
+    # ---------------------------------
+    # Forecast updates
+    # ---------------------------------
+
+    def update_station(self, station_id, stock, rate, capacity, now):
+
+        version = self.stations[station_id][4] + 1 if station_id in self.stations else 0
+        self.stations[station_id] = (float(stock), max(float(rate), MIN_RATE),
+                                     float(capacity), float(now), version)
+
+        stock, at = self._after_inbound(station_id)
+        heapq.heappush(self._heap, (self._latest_departure(station_id, stock, at),
+                                    next(self._seq), station_id, version))
+
+        # Drop stale entries once they outnumber live ones
+        if len(self._heap) > 2 * len(self.stations) + 64:
+            self._compact()
+
+    def _compact(self):
+
+        live = {}
+        for entry in self._heap:
+            station_id, version = entry[2], entry[3]
+            if version == self.stations[station_id][4]:
+                live[station_id] = entry
+
+        self._heap = list(live.values())
+        heapq.heapify(self._heap)
+
+    def _after_inbound(self, station_id):
+
+        # Projected stock once committed in-flight deliveries have landed
+        stock, rate, capacity, at, _ = self.stations[station_id]
+
+        for arrive, amount in sorted(self.inbound.get(station_id, [])):
+            if arrive > at:
+                stock = max(stock - rate * (arrive - at), 0.0)
+                at = arrive
+            stock = min(stock + amount, capacity)
+
+        return stock, at
+
+    def _best_transit(self, station_id, departure):
+        return min(self.transit(ms, station_id, departure) for ms in self.mother_stations)
+
+    def _latest_departure(self, station_id, stock, at):
+
+        rate = self.stations[station_id][1]
+        stockout = at + stock / rate
+
+        return stockout - self._best_transit(station_id, stockout) - self.safety_min
+
+    # ---------------------------------
+    # Planning
+    # ---------------------------------
+
+    def plan(self, now):
+
+        # Returns trips ordered by planning urgency:
+        # (truck, mother_station, station, depart, arrive, amount_kg, late)
+        heap = list(self._heap)
+        horizon = now + self.horizon_min
+
+        truck_heaps = {ms: [] for ms in self.mother_stations}
+        for truck, ms in self.trucks.items():
+            truck_heaps[ms].append((max(self.truck_free_at[truck], now), truck))
+        for th in truck_heaps.values():
+            heapq.heapify(th)
+
+        # Post-delivery state for stations planned more than once
+        projected = {}
+        trips = []
+
+        while heap:
+            lfd, _, station_id, version = heapq.heappop(heap)
+
+            if version != self.stations[station_id][4]:
+                continue
+            if lfd > horizon:
+                break
+
+            _, rate, capacity, _, _ = self.stations[station_id]
+            stock, at = projected.get(station_id) or self._after_inbound(station_id)
+
+            # Aim to arrive once a full payload fits, but never after stock-out
+            room_at = at + max(stock - (capacity - self.payload_kg), 0.0) / rate
+
+            best = None
+            for ms, th in truck_heaps.items():
+                if not th:
+                    continue
+                free_at = th[0][0]
+                leg = self.transit(ms, station_id, free_at)
+                depart = max(free_at, min(room_at - leg, lfd))
+                arrive = depart + self.transit(ms, station_id, depart)
+                if best is None or arrive < best[0]:
+                    best = (arrive, depart, ms)
+
+            if best is None:
+                break
+
+            arrive, depart, ms = best
+            _, truck = heapq.heappop(truck_heaps[ms])
+
+            stock_at_arrival = max(stock - rate * (arrive - at), 0.0)
+            amount = min(self.payload_kg, capacity - stock_at_arrival)
+
+            back = arrive + self.service_min + self.transit(ms, station_id, arrive) + self.load_min
+            heapq.heappush(truck_heaps[ms], (back, truck))
+
+            trips.append((truck, ms, station_id, depart, arrive, amount, depart > lfd))
+
+            # Next refill for the same station, if it still falls in the horizon
+            stock_after = stock_at_arrival + amount
+            projected[station_id] = (stock_after, arrive)
+            next_lfd = self._latest_departure(station_id, stock_after, arrive)
+            if next_lfd <= horizon:
+                heapq.heappush(heap, (next_lfd, next(self._seq), station_id, version))
+
+        return trips
+
+    # ---------------------------------
+    # Execution
+    # ---------------------------------
+
+    def commit(self, trip):
+
+        truck, ms, station_id, depart, arrive, amount, _ = trip
+
+        self.truck_free_at[truck] = (arrive + self.service_min
+                                     + self.transit(ms, station_id, arrive) + self.load_min)
+        self.inbound.setdefault(station_id, []).append((arrive, amount))
+
+    def delivered(self, station_id, arrive, amount):
+
+        self.inbound[station_id].remove((arrive, amount))
+
+
+# ============================================================
+# CLOSED-LOOP VALIDATION AGAINST THE SIMULATOR
+# ============================================================
+
+def constant_transit(matrix, mother_stations, station_ids):
+
+    # transit callable over an (n_mother, n_stations) minutes matrix
+    ms_index = {ms: i for i, ms in enumerate(mother_stations)}
+    st_index = {s: j for j, s in enumerate(station_ids)}
+
+    def transit(ms, station_id, departure):
+        return matrix[ms_index[ms], st_index[station_id]]
+
+    return transit
+
+
+def table_transit(table, route_format="{ms}_{station}"):
+
+    # transit callable over a training.transit_table.TransitTable
+    def transit(ms, station_id, departure):
+        return table.lookup(route_format.format(ms=ms, station=station_id),
+                            np.datetime64(int(departure), "m"))
+
+    return transit
+
+
+def benchmark_replan(n_stations=500, n_trucks=50, n_mother=2, repeats=20, seed=42):
+
+    # Worst case: every station runs dry inside the horizon, and each
+    # repeat refreshes every forecast before re-planning from scratch
+    rng = np.random.default_rng(seed)
+    mother_stations = [f"MS{i:02d}" for i in range(1, n_mother + 1)]
+    station_ids = [f"station_{i:04d}" for i in range(n_stations)]
+    trucks = {f"TRUCK{k:03d}": mother_stations[k % n_mother] for k in range(n_trucks)}
+
+    matrix = rng.uniform(30, 90, size=(n_mother, n_stations))
+    planner = DispatchPlanner(trucks, constant_transit(matrix, mother_stations, station_ids))
+
+    timings = []
+    for repeat in range(repeats):
+        now = repeat * 15.0
+        stock = rng.uniform(200, 6000, n_stations)
+        rate = rng.uniform(0.5, 2.0, n_stations)
+
+        start = time.perf_counter()
+        for sid, s, r in zip(station_ids, stock, rate):
+            planner.update_station(sid, s, r, 6000, now)
+        trips = planner.plan(now)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {"trips": len(trips), "replan_ms_mean": float(np.mean(timings)),
+            "replan_ms_max": float(np.max(timings))}
+
+
+def station_capacity(simulator, station_id):
+
+    # SCADAFleet exposes per-station views, SCADAMultiStation the objects
+    if hasattr(simulator, "station"):
+        return simulator.station(station_id).tank_capacity
+    return simulator.stations[station_id].tank_capacity
+
+
+def run_closed_loop(simulator, planner, sim_minutes, replan_every=15, ewma_minutes=240,
+                    dispatch=True):
+
+    # Steps the simulator through its SCADAMultiStation API, re-forecasts
+    # every station from an EWMA of observed flow, re-plans, commits trips
+    # departing before the next re-plan and lands them with refill_station
+    alpha = 1.0 / ewma_minutes
+    capacity = {}
+    rate = {}
+    in_flight = []
+
+    stockout_minutes = 0
+    deliveries = 0
+    delivered_kg = 0.0
+    plan_ms = []
+
+    for minute in range(sim_minutes):
+
+        events = simulator.next_all()
+        now = np.datetime64(events[0]["timestamp"], "m").astype(np.int64)
+
+        for event in events:
+            sid = event["station_id"]
+            rate[sid] = rate.get(sid, event["flow_rate"]) * (1 - alpha) + event["flow_rate"] * alpha
+            stockout_minutes += event["current_stock"] <= 0
+
+        # Land deliveries that have arrived
+        while in_flight and in_flight[0][0] <= now:
+            arrive, _, station_id, amount = heapq.heappop(in_flight)
+            simulator.refill_station(station_id, amount)
+            planner.delivered(station_id, arrive, amount)
+            deliveries += 1
+            delivered_kg += float(amount)
+
+        if not dispatch or minute % replan_every:
+            continue
+
+        for event in events:
+            sid = event["station_id"]
+            if sid not in capacity:
+                capacity[sid] = station_capacity(simulator, sid)
+            planner.update_station(sid, event["current_stock"], rate[sid], capacity[sid], now)
+
+        start = time.perf_counter()
+        trips = planner.plan(now)
+        plan_ms.append((time.perf_counter() - start) * 1000)
+
+        for trip in trips:
+            if trip[3] < now + replan_every:
+                planner.commit(trip)
+                heapq.heappush(in_flight, (trip[4], trip[0], trip[2], trip[5]))
+
+    return {
+        "stockout_station_minutes": int(stockout_minutes),
+        "deliveries": deliveries,
+        "delivered_kg": delivered_kg,
+        "plan_ms_mean": float(np.mean(plan_ms)) if plan_ms else 0.0,
+        "plan_ms_max": float(np.max(plan_ms)) if plan_ms else 0.0,
+    }
+
+
+if __name__ == "__main__":
+
+    from utils.scada_streamer import demo_fleet
+
+    parser = argparse.ArgumentParser(description="Closed-loop refill dispatch validation")
+    parser.add_argument("--stations", type=int, default=500)
+    parser.add_argument("--trucks", type=int, default=50)
+    parser.add_argument("--mother", type=int, default=2)
+    parser.add_argument("--days", type=float, default=8.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    mother_stations = [f"MS{i:02d}" for i in range(1, args.mother + 1)]
+    trucks = {f"TRUCK{k:03d}": mother_stations[k % args.mother] for k in range(args.trucks)}
+    sim_minutes = int(args.days * 24 * 60)
+
+    print("benchmark", benchmark_replan(args.stations, args.trucks, args.mother, seed=args.seed))
+
+    results = {}
+    for dispatch in (False, True):
+        fleet = demo_fleet(args.stations, args.seed)
+        matrix = rng.uniform(30, 90, size=(args.mother, len(fleet.station_ids)))
+        planner = DispatchPlanner(trucks, constant_transit(matrix, mother_stations, fleet.station_ids))
+
+        results["dispatch" if dispatch else "no_dispatch"] = run_closed_loop(
+            fleet, planner, sim_minutes, dispatch=dispatch
+        )
+
+    for name, result in results.items():
+        print(name, result)
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.chunked_writer import ChunkedWriter
+from utils.minute_sales import iter_minute_sales
+
+# ============================================================
+# CONFIG-DRIVEN FLEET GENERATOR
+# ============================================================
+
+CONFIG_PATH = "utils/station_profiles.json"
+OUTPUT_DIR = "data/synthetic"
+ROOT_SEED = 42
+
+# Days generated and written per chunk; memory per worker stays at one chunk
+CHUNK_DAYS = 7
+
+# Synthetic copies beyond the configured stations get their daily volume
+# scaled by a lognormal factor, so a large fleet is not N clones
+VOLUME_JITTER = 0.35
+
+ENGINE_KEYS = [
+    "start_date",
+    "days",
+    "initial_stock",
+    "demand_std_factor",
+    "demand_floor_factor",
+    "wave_amplitude",
+    "noise_factor",
+    "spike_prob",
+    "spike_range",
+]
+
+
+# ============================================================
+# PROFILES
+# ============================================================
+
+def load_profiles(config_path=CONFIG_PATH):
+
+    with open(config_path) as f:
+        config = json.load(f)
+
+    defaults = config.get("defaults", {})
+
+    return {
+        station: {**defaults, **profile}
+        for station, profile in config["stations"].items()
+    }
+
+
+def hourly_weights_from_bands(bands):
+
+    # [[first_hour, last_hour, weight], ...] covering 0-23
+    weights = np.zeros(24)
+    for first, last, weight in bands:
+        weights[first:last + 1] = weight
+
+    if not (weights > 0).all():
+        raise ValueError("hourly_bands must cover every hour 0-23")
+
+    return weights / weights.sum()
+
+
+def learn_daily_patterns(sales_path, weekend_multiplier_fallback=0.9):
+
+    real_df = pd.read_csv(sales_path, header=1, thousands=",")
+
+    real_df.columns = [c.strip().upper() for c in real_df.columns]
+
+    real_df["ZDATE"] = pd.to_datetime(real_df["ZDATE"])
+    real_df["IS_WEEKEND"] = (real_df["ZDATE"].dt.weekday >= 5).astype(int)
+
+    real_df["ZTOTAL"] = pd.to_numeric(real_df["ZTOTAL"], errors="coerce")
+    real_df = real_df.dropna(subset=["ZTOTAL"])
+
+    weekday_mean = real_df[real_df["IS_WEEKEND"] == 0]["ZTOTAL"].mean()
+    weekend_mean = real_df[real_df["IS_WEEKEND"] == 1]["ZTOTAL"].mean()
+
+    if weekday_mean > 0 and not np.isnan(weekend_mean):
+        weekend_multiplier = weekend_mean / weekday_mean
+    else:
+        weekend_multiplier = weekend_multiplier_fallback
+
+    return {
+        "mean_daily": float(real_df["ZTOTAL"].mean()),
+        "std_daily": float(real_df["ZTOTAL"].std()),
+        "weekend_multiplier": float(weekend_multiplier),
+    }
+
+
+def resolve_profiles(profiles):
+
+    # Daily patterns are learned once here, not in every worker; a profile
+    # may also pin mean_daily / std_daily / weekend_multiplier directly
+    resolved = {}
+
+    for station, profile in profiles.items():
+        if "mean_daily" not in profile:
+            profile = {
+                **learn_daily_patterns(profile["sales_path"],
+                                       profile.get("weekend_multiplier_fallback", 0.9)),
+                **profile,
+            }
+        resolved[station] = profile
+
+    return resolved
+
+
+# ============================================================
+# FLEET PLAN
+# ============================================================
+
+def plan_fleet(profiles, n_stations, root_seed=ROOT_SEED):
+
+    # Station i always gets child seed i of the root sequence, so every
+    # station's data is the same whatever the worker count or order
+    templates = list(profiles)
+    seeds = np.random.SeedSequence(root_seed).spawn(n_stations)
+
+    tasks = []
+    for i in range(n_stations):
+        template = templates[i % len(templates)]
+        name = template if i < len(templates) else f"{template}_{i:05d}"
+        tasks.append((name, template, i >= len(templates), seeds[i]))
+
+    return tasks
+
+
+def _generate_station(task, profile, output_dir, chunk_days=CHUNK_DAYS, fmt="csv"):
+
+    name, template, jitter, seed = task
+    rng = np.random.default_rng(seed)
+
+    mean_daily = profile["mean_daily"]
+    std_daily = profile["std_daily"]
+
+    if jitter:
+        scale = rng.lognormal(0.0, VOLUME_JITTER)
+        mean_daily *= scale
+        std_daily *= scale
+
+    engine_kwargs = {k: profile[k] for k in ENGINE_KEYS if k in profile}
+
+    chunks = iter_minute_sales(
+        mean_daily,
+        std_daily,
+        profile["weekend_multiplier"],
+        hourly_weights_from_bands(profile["hourly_bands"]),
+        rng=rng,
+        chunk_days=chunk_days,
+        **engine_kwargs
+    )
+
+    # Workers stream their own file; only the summary crosses back
+    path = os.path.join(output_dir, f"flow_rate_{name}.{fmt}")
+
+    with ChunkedWriter(path, fmt) as writer:
+        for chunk in chunks:
+            chunk.insert(0, "station_id", name)
+            writer.write(chunk)
+
+    return {"station_id": name, "template": template, "rows": writer.rows,
+            "mean_daily": mean_daily, "path": path}
+
+
+def _generate_task(args):
+    return _generate_station(*args)
+
+
+def generate_fleet(n_stations, config_path=CONFIG_PATH, output_dir=OUTPUT_DIR,
+                   root_seed=ROOT_SEED, max_workers=None, chunk_days=CHUNK_DAYS,
+                   fmt="csv", days=None):
+
+    profiles = resolve_profiles(load_profiles(config_path))
+
+    # Multi-year horizons only change the chunk count, not the memory
+    if days is not None:
+        profiles = {station: {**profile, "days": days} for station, profile in profiles.items()}
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    work = [
+        (task, profiles[task[1]], output_dir, chunk_days, fmt)
+        for task in plan_fleet(profiles, n_stations, root_seed)
+    ]
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        summary = list(pool.map(_generate_task, work, chunksize=max(1, len(work) // 64)))
+
+    return pd.DataFrame(summary)
+
+
+# ============================================================
+# RUN
+# ============================================================
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic per-minute station fleet")
+    parser.add_argument("--stations", type=int, default=3)
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--seed", type=int, default=ROOT_SEED)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--days", type=int, default=None)
+    parser.add_argument("--chunk-days", type=int, default=CHUNK_DAYS)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    args = parser.parse_args()
+
+    summary = generate_fleet(args.stations, args.config, args.out, args.seed, args.workers,
+                             args.chunk_days, args.format, args.days)
+
+    print(summary.to_string(index=False))
+    print("Generated rows:", summary["rows"].sum())
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+# ============================================================
+# VECTORIZED PER-MINUTE SALES ENGINE
+# ============================================================
+
+MINUTES_PER_DAY = 24 * 60
+
+# Default profile knobs (the station scripts override what differs)
+DEMAND_STD_FACTOR = 0.4
+DEMAND_FLOOR_FACTOR = 0.6
+WAVE_AMPLITUDE = 0.08
+NOISE_FACTOR = 0.12
+SPIKE_PROB = 0.002
+SPIKE_RANGE = (1.5, 3.5)
+
+
+def normalized_hourly_weights(hourly_weight):
+
+    weights = np.array([hourly_weight(h) for h in range(24)])
+    return weights / weights.sum()
+
+
+def _draw_days(rng, days):
+
+    # Day by day, in order: the demand shock, then the day's per-minute
+    # noise, spike flags and spike sizes. A run is the same random stream
+    # whatever chunk_days it is streamed with
+    draws = [
+        (rng.standard_normal(), rng.standard_normal(MINUTES_PER_DAY),
+         rng.random(MINUTES_PER_DAY), rng.random(MINUTES_PER_DAY))
+        for _ in range(days)
+    ]
+    demand_z, noise_z, spike_u, spike_size_u = zip(*draws)
+
+    return np.array(demand_z), np.concatenate(noise_z), np.concatenate(spike_u), \
+        np.concatenate(spike_size_u)
+
+
+def iter_minute_sales(
+    mean_daily,
+    std_daily,
+    weekend_multiplier,
+    hourly_weights,
+    start_date="2025-01-01",
+    days=365,
+    initial_stock=6000,
+    demand_std_factor=DEMAND_STD_FACTOR,
+    demand_floor_factor=DEMAND_FLOOR_FACTOR,
+    wave_amplitude=WAVE_AMPLITUDE,
+    noise_factor=NOISE_FACTOR,
+    spike_prob=SPIKE_PROB,
+    spike_range=SPIKE_RANGE,
+    rng=None,
+    chunk_days=None,
+):
+
+    # Yields chunk_days of minutes at a time (default: everything in one
+    # chunk). The same rng and the running stock carry across chunks, so
+    # memory stays at one chunk however long the horizon, and the draws are
+    # made per day so the chunk size does not change the data
+    rng = rng if rng is not None else np.random.default_rng()
+    chunk_days = chunk_days or days
+
+    start = pd.Timestamp(start_date)
+    stock = float(initial_stock)
+
+    for first_day in range(0, days, chunk_days):
+
+        chunk, stock = _minute_sales_chunk(
+            start + pd.Timedelta(days=first_day),
+            min(chunk_days, days - first_day),
+            stock,
+            mean_daily,
+            std_daily,
+            weekend_multiplier,
+            hourly_weights,
+            demand_std_factor,
+            demand_floor_factor,
+            wave_amplitude,
+            noise_factor,
+            spike_prob,
+            spike_range,
+            rng,
+        )
+
+        yield chunk
+
+
+def generate_minute_sales(*args, **kwargs):
+
+    return pd.concat(iter_minute_sales(*args, **kwargs), ignore_index=True)
+
+
+def _minute_sales_chunk(
+    start,
+    days,
+    stock,
+    mean_daily,
+    std_daily,
+    weekend_multiplier,
+    hourly_weights,
+    demand_std_factor,
+    demand_floor_factor,
+    wave_amplitude,
+    noise_factor,
+    spike_prob,
+    spike_range,
+    rng,
+):
+
+    # Same model as the original minute-by-minute loops, drawn as whole arrays:
+    # one demand per day, then noise / spikes / calendar for every minute
+    timestamps = pd.date_range(start, periods=days * MINUTES_PER_DAY, freq="min")
+
+    day_starts = timestamps[::MINUTES_PER_DAY]
+    day_dow = np.asarray(day_starts.weekday, dtype=np.int64)
+    dow = np.repeat(day_dow, MINUTES_PER_DAY)
+    weekend = day_dow >= 5
+
+    demand_z, noise_z, spike_u, spike_size_u = _draw_days(rng, days)
+
+    # -------------------------
+    # Daily demand
+    # -------------------------
+    daily_demand = mean_daily + std_daily * demand_std_factor * demand_z
+    daily_demand = np.where(weekend, daily_demand * weekend_multiplier, daily_demand)
+    daily_demand = np.maximum(daily_demand, mean_daily * demand_floor_factor)
+
+    # (days, 24) hourly demand -> per-minute base rate
+    base_per_min = np.repeat((daily_demand[:, None] * hourly_weights[None, :]).ravel() / 60, 60)
+
+    # -------------------------
+    # Per-minute flow
+    # -------------------------
+    minute = np.tile(np.arange(60), days * 24)
+    hour = np.tile(np.repeat(np.arange(24), 60), days)
+
+    minute_wave = wave_amplitude * base_per_min * np.sin(2 * np.pi * minute / 60)
+    noise = noise_z * (base_per_min * noise_factor)
+
+    # rare spike
+    spikes = spike_u < spike_prob
+    noise[spikes] += spike_range[0] + (spike_range[1] - spike_range[0]) * spike_size_u[spikes]
+
+    flow = np.maximum(base_per_min + minute_wave + noise, 0.0)
+
+    # Flow is never negative, so the running max(stock - flow, 0) is just the
+    # cumulative draw-down clamped once at zero
+    current_stock = np.maximum(stock - np.cumsum(flow), 0.0)
+
+    chunk = pd.DataFrame({
+        "timestamp": timestamps,
+        "flow_kg": np.round(flow, 4),
+        "current_stock": np.round(current_stock, 2),
+        "hour": hour,
+        "minute": minute,
+        "day_of_week": dow,
+        "is_weekend": (dow >= 5).astype(int),
+        "sin_hour": np.sin(2 * np.pi * hour / 24),
+        "cos_hour": np.cos(2 * np.pi * hour / 24),
+    })
+
+    # Carry the unrounded stock into the next chunk
+    return chunk, float(current_stock[-1])
@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
-from datetime import timedelta
-from math import sin, cos, pi
 
-np.random.seed(42)
+from utils.chunked_writer import write_chunks
+from utils.minute_sales import iter_minute_sales, normalized_hourly_weights
+
+rng = np.random.default_rng(42)
 
 # ============================================================
 # LOAD REAL ONE-MONTH DAILY DATA
@@ -54,8 +55,7 @@ def hourly_weight(hour):
     else:
         return 0.035
 
-hourly_weights = np.array([hourly_weight(h) for h in range(24)])
-hourly_weights = hourly_weights / hourly_weights.sum()
+hourly_weights = normalized_hourly_weights(hourly_weight)
 
 # ============================================================
 # GENERATE 1 YEAR MINUTE DATA WITH STOCK
@@ -63,76 +63,29 @@ hourly_weights = hourly_weights / hourly_weights.sum()
 
 def generate_one_year_minute_data(
     start_date="2025-01-01",
-    initial_stock=6000
+    initial_stock=6000,
+    chunk_days=7
 ):
 
-    start = pd.Timestamp(start_date)
-    end = start + pd.Timedelta(days=365)
-
-    rows = []
-    current_day = start
-    current_stock = initial_stock
-
-    while current_day < end:
-
-        dow = current_day.weekday()
-        weekend = dow >= 5
-
-        # Sample daily demand
-        daily_demand = np.random.normal(mean_daily, std_daily * 0.4)
-
-        if weekend:
-            daily_demand *= weekend_multiplier
-
-        daily_demand = max(daily_demand, mean_daily * 0.6)
-
-        hourly_demand = daily_demand * hourly_weights
-
-        for hour in range(24):
-
-            base_per_min = hourly_demand[hour] / 60
-
-            for minute in range(60):
-
-                timestamp = current_day + timedelta(hours=hour, minutes=minute)
-
-                minute_wave = 0.08 * base_per_min * np.sin(2 * np.pi * minute / 60)
-                noise = np.random.normal(0, base_per_min * 0.12)
-
-                # rare spike
-                if np.random.rand() < 0.002:
-                    noise += np.random.uniform(1.5, 3.5)
-
-                flow = max(0, base_per_min + minute_wave + noise)
-
-                # Deduct from stock
-                current_stock -= flow
-                current_stock = max(current_stock, 0)
-
-                rows.append({
-                    "timestamp": timestamp,
-                    "flow_kg": round(flow, 4),
-                    "current_stock": round(current_stock, 2),
-                    "hour": hour,
-                    "minute": minute,
-                    "day_of_week": dow,
-                    "is_weekend": int(weekend),
-                    "sin_hour": sin(2 * pi * hour / 24),
-                    "cos_hour": cos(2 * pi * hour / 24)
-                })
-
-        current_day += timedelta(days=1)
-
-    df = pd.DataFrame(rows)
-
-    df.to_csv("C:/dot_prediction_system/data/flow_rate_1000000471.csv", index=False)
-
-    return df
+    # Streamed to disk chunk_days at a time, so memory stays at one chunk
+    chunks = iter_minute_sales(
+        mean_daily,
+        std_daily,
+        weekend_multiplier,
+        hourly_weights,
+        start_date=start_date,
+        days=365,
+        initial_stock=initial_stock,
+        rng=rng,
+        chunk_days=chunk_days
+    )
+
+    return write_chunks(chunks, "C:/dot_prediction_system/data/flow_rate_1000000471.csv")
 
 # ============================================================
 # RUN
 # ============================================================
 
-df_year = generate_one_year_minute_data()
+rows = generate_one_year_minute_data()
 
-print("Generated rows:", len(df_year))
+print("Generated rows:", rows)
@@ -1,9 +1,10 @@
 import pandas as pd
 import numpy as np
-from datetime import timedelta
-from math import sin, cos, pi
 
-np.random.seed(123)
+from utils.chunked_writer import ChunkedWriter
+from utils.minute_sales import iter_minute_sales, normalized_hourly_weights
+
+rng = np.random.default_rng(123)
 
 REAL_DATA_PATH = "C:/dot_prediction_system/data/salesdata_1000000523.csv"
 
@@ -57,8 +58,7 @@ def hourly_weight(hour):
     else:
         return 0.04
 
-hourly_weights = np.array([hourly_weight(h) for h in range(24)])
-hourly_weights = hourly_weights / hourly_weights.sum()
+hourly_weights = normalized_hourly_weights(hourly_weight)
 
 # ============================================================
 # GENERATE 1 YEAR MINUTE DATA
@@ -66,79 +66,41 @@ hourly_weights = hourly_weights / hourly_weights.sum()
 
 def generate_one_year_minute_data_station_523(
     start_date="2025-01-01",
-    initial_stock=7000
+    initial_stock=7000,
+    chunk_days=7
 ):
 
-    start = pd.Timestamp(start_date)
-    end = start + pd.Timedelta(days=365)
-
-    rows = []
-    current_day = start
-    current_stock = initial_stock
-
-    while current_day < end:
-
-        dow = current_day.weekday()
-        weekend = dow >= 5
-
-        # Sample daily demand from learned distribution
-        daily_demand = np.random.normal(mean_daily, std_daily * 0.35)
-
-        if weekend:
-            daily_demand *= weekend_multiplier
-
-        daily_demand = max(daily_demand, mean_daily * 0.65)
-
-        hourly_demand = daily_demand * hourly_weights
-
-        for hour in range(24):
-
-            base_per_min = hourly_demand[hour] / 60
-
-            for minute in range(60):
-
-                timestamp = current_day + timedelta(hours=hour, minutes=minute)
-
-                # intra-hour wave
-                minute_wave = 0.1 * base_per_min * np.sin(2 * np.pi * minute / 60)
-
-                noise = np.random.normal(0, base_per_min * 0.15)
-
-                # rare spike
-                if np.random.rand() < 0.003:
-                    noise += np.random.uniform(1.0, 4.0)
-
-                flow = max(0, base_per_min + minute_wave + noise)
-
-                current_stock -= flow
-                current_stock = max(current_stock, 0)
-
-                rows.append({
-                    "station_id": "1000000523",
-                    "timestamp": timestamp,
-                    "flow_kg": round(flow, 4),
-                    "current_stock": round(current_stock, 2),
-                    "hour": hour,
-                    "minute": minute,
-                    "day_of_week": dow,
-                    "is_weekend": int(weekend),
-                    "sin_hour": sin(2 * pi * hour / 24),
-                    "cos_hour": cos(2 * pi * hour / 24)
-                })
-
-        current_day += timedelta(days=1)
-
-    df = pd.DataFrame(rows)
-
-    df.to_csv("C:/dot_prediction_system/data/flow_rate_1000000523.csv", index=False)
-
-    return df
+    # Streamed to disk chunk_days at a time, so memory stays at one chunk
+    chunks = iter_minute_sales(
+        mean_daily,
+        std_daily,
+        weekend_multiplier,
+        hourly_weights,
+        start_date=start_date,
+        days=365,
+        initial_stock=initial_stock,
+        demand_std_factor=0.35,
+        demand_floor_factor=0.65,
+        wave_amplitude=0.1,
+        noise_factor=0.15,
+        spike_prob=0.003,
+        spike_range=(1.0, 4.0),
+        rng=rng,
+        chunk_days=chunk_days
+    )
+
+    with ChunkedWriter("C:/dot_prediction_system/data/flow_rate_1000000523.csv") as writer:
+        for chunk in chunks:
+            chunk.insert(0, "station_id", "1000000523")
+            writer.write(chunk)
+
+    return writer.rows
 
 
 # ============================================================
 # RUN
 # ============================================================
 
-df_year_523 = generate_one_year_minute_data_station_523()
+rows_523 = generate_one_year_minute_data_station_523()
 
-print("Generated rows:", len(df_year_523))
\ No newline at end of file
+print("Generated rows:", rows_523)
\ No newline at end of file
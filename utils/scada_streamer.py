@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+
+from utils.scada_simulator import SCADAFleet, StationA, Station_A, Station_C
+
+# ============================================================
+# ACCELERATED REAL-TIME SCADA STREAMER
+# ============================================================
+
+# 1 simulated day per real minute
+DEFAULT_SPEEDUP = 1440
+
+# Readings land up to this many seconds after their simulated minute, so
+# per-station order is kept while arrivals are not perfectly aligned
+JITTER_S = 45
+
+REPORT_EVERY_S = 5.0
+
+
+# ============================================================
+# SINKS
+# ============================================================
+
+class Sink:
+
+    # Each sink drains its own bounded queue in a task. When the queue is
+    # full the sink is behind: "block" makes the streamer wait (simulation
+    # falls behind schedule), "drop" discards the oldest pending batch
+
+    def __init__(self, maxsize=64, policy="block"):
+
+        if policy not in ("block", "drop"):
+            raise ValueError(f"unknown backpressure policy: {policy}")
+
+        self.queue = asyncio.Queue(maxsize)
+        self.policy = policy
+
+        self.sent = 0
+        self.dropped = 0
+        self.stalls = 0
+        self.high_water = 0
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    async def put(self, batch):
+
+        if self.queue.full():
+            if self.policy == "drop":
+                self.queue.get_nowait()
+                self.dropped += 1
+            else:
+                self.stalls += 1
+                await self.queue.put(batch)
+                return
+
+        self.queue.put_nowait(batch)
+        self.high_water = max(self.high_water, self.queue.qsize())
+
+    async def run(self):
+
+        while True:
+            batch = await self.queue.get()
+            if batch is None:
+                break
+            await self.write(batch)
+            self.sent += len(batch)
+
+        await self.close()
+
+    async def write(self, batch):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {
+            "sink": self.name,
+            "depth": self.queue.qsize(),
+            "high_water": self.high_water,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "stalls": self.stalls,
+        }
+
+
+class QueueSink(Sink):
+
+    # In-process consumers read batches straight from sink.queue
+    # (None marks the end of the stream)
+
+    async def run(self):
+        pass
+
+    async def get(self):
+
+        batch = await self.queue.get()
+        if batch is not None:
+            self.sent += len(batch)
+
+        return batch
+
+
+class NDJSONSink(Sink):
+
+    # One JSON reading per line, to stdout or a file
+
+    def __init__(self, path=None, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._file = open(path, "a") if path else sys.stdout
+
+    async def write(self, batch):
+
+        lines = "".join(json.dumps(reading) + "\n" for reading in batch)
+        await asyncio.to_thread(self._write_lines, lines)
+
+    def _write_lines(self, lines):
+        self._file.write(lines)
+        self._file.flush()
+
+    async def close(self):
+        if self.path:
+            self._file.close()
+
+
+class HTTPSink(Sink):
+
+    # POSTs totalizer readings to the serving ingest endpoint
+    # (POST /stations/{station_id}/readings), one request per station
+
+    def __init__(self, base_url="http://localhost:8000", timeout=10.0, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.errors = 0
+
+    async def write(self, batch):
+
+        by_station = defaultdict(list)
+        for reading in batch:
+            by_station[reading["station_id"]].append(
+                {"timestamp": reading["timestamp"], "value": reading["totalizer"]}
+            )
+
+        await asyncio.to_thread(self._post_all, by_station)
+
+    def _post_all(self, by_station):
+
+        for station_id, readings in by_station.items():
+            request = urllib.request.Request(
+                f"{self.base_url}/stations/{station_id}/readings",
+                data=json.dumps(readings).encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout):
+                    pass
+            except OSError as exc:
+                self.errors += 1
+                print(f"HTTPSink: {station_id}: {exc}")
+
+    def stats(self):
+        return {**super().stats(), "errors": self.errors}
+
+
+# ============================================================
+# STREAMER
+# ============================================================
+
+class SCADAStreamer:
+
+    # Paces a SCADAFleet (or any SCADAMultiStation) against the wall clock:
+    # one simulated minute every 60 / speedup real seconds. When the loop
+    # wakes late, every tick that is due is stepped in one vectorized call,
+    # so the simulated clock keeps up as long as the sinks do.
+
+    def __init__(self, simulator, sinks, speedup=DEFAULT_SPEEDUP, jitter_s=JITTER_S,
+                 rng=None, report_every_s=REPORT_EVERY_S):
+
+        self.simulator = simulator
+        self.sinks = list(sinks)
+        self.tick_s = 60.0 / speedup
+        self.jitter_s = jitter_s
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.report_every_s = report_every_s
+
+        # Cumulative totalizer per station, as a real SCADA meter reports it
+        self.totalizer = defaultdict(float)
+
+        self.ticks = 0
+        self.max_lag_s = 0.0
+
+    # ---------------------------------
+    # Simulation
+    # ---------------------------------
+    def _advance(self, n_ticks):
+
+        if isinstance(self.simulator, SCADAFleet):
+            tick = self.simulator.step(n_ticks)
+            ids = self.simulator.station_ids
+            return tick["timestamp"], tick["flow_rate"], ids
+
+        events = [self.simulator.next_all() for _ in range(n_ticks)]
+        ids = [e["station_id"] for e in events[0]]
+        timestamps = np.array([[np.datetime64(e["timestamp"], "m") for e in row] for row in events])
+        flow = np.array([[e["flow_rate"] for e in row] for row in events])
+
+        return timestamps, flow, ids
+
+    def _readings(self, timestamps, flow, ids):
+
+        offsets = self.rng.uniform(0, self.jitter_s, size=flow.shape)
+        stamps = timestamps.astype("datetime64[ms]") + (offsets * 1000).astype("timedelta64[ms]")
+        stamps = np.datetime_as_string(stamps)
+
+        total = np.array([self.totalizer[s] for s in ids]) + np.cumsum(flow, axis=0)
+        for j, station_id in enumerate(ids):
+            self.totalizer[station_id] = float(total[-1, j])
+
+        return [
+            {
+                "station_id": station_id,
+                "timestamp": str(stamps[t, j]),
+                "flow_rate": round(float(flow[t, j]), 3),
+                "totalizer": round(float(total[t, j]), 3),
+            }
+            for t in range(flow.shape[0])
+            for j, station_id in enumerate(ids)
+        ]
+
+    # ---------------------------------
+    # Pacing loop
+    # ---------------------------------
+    async def run(self, sim_minutes):
+
+        loop = asyncio.get_running_loop()
+        tasks = [asyncio.create_task(sink.run()) for sink in self.sinks]
+
+        start = loop.time()
+        next_report = start + self.report_every_s
+
+        while self.ticks < sim_minutes:
+
+            due = min(int((loop.time() - start) / self.tick_s) + 1, sim_minutes)
+            n_ticks = due - self.ticks
+
+            if n_ticks > 0:
+                batch = self._readings(*self._advance(n_ticks))
+                self.ticks = due
+
+                for sink in self.sinks:
+                    await sink.put(batch)
+
+            # How far the simulated clock trails the schedule
+            lag = loop.time() - (start + self.ticks * self.tick_s)
+            self.max_lag_s = max(self.max_lag_s, lag)
+
+            if loop.time() >= next_report:
+                self.report(lag)
+                next_report += self.report_every_s
+
+            await asyncio.sleep(max(0.0, start + self.ticks * self.tick_s - loop.time()))
+
+        for sink in self.sinks:
+            await sink.queue.put(None)
+        await asyncio.gather(*tasks)
+
+        return self.stats()
+
+    def report(self, lag):
+
+        # A sink whose queue is over half full is falling behind
+        for sink in self.sinks:
+            stats = sink.stats()
+            if stats["depth"] > sink.queue.maxsize // 2 or stats["dropped"] or stats["stalls"]:
+                print(f"backpressure: {stats}", file=sys.stderr)
+
+        if lag > self.tick_s * 10:
+            print(f"streamer {lag:.2f}s behind schedule at tick {self.ticks}", file=sys.stderr)
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "max_lag_s": self.max_lag_s,
+            "sinks": [sink.stats() for sink in self.sinks],
+        }
+
+
+def demo_fleet(n_stations, seed=42):
+
+    # The three station patterns, cycled
+    fleet = SCADAFleet(rng=np.random.default_rng(seed))
+
+    for i in range(n_stations):
+        kind = i % 3
+        if kind == 0:
+            station = StationA(f"station_{i:04d}", mean_daily=1500, std_daily=300, weekend_multiplier=0.9)
+        elif kind == 1:
+            station = Station_A(f"station_{i:04d}")
+        else:
+            station = Station_C(f"station_{i:04d}")
+        fleet.add_station(station)
+
+    return fleet
+
+
+# ============================================================
+# RUN
+# ============================================================
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Stream simulated SCADA readings in accelerated real time")
+    parser.add_argument("--stations", type=int, default=3)
+    parser.add_argument("--speedup", type=float, default=DEFAULT_SPEEDUP)
+    parser.add_argument("--sim-days", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=JITTER_S)
+    parser.add_argument("--sink", choices=["ndjson", "http"], default="ndjson")
+    parser.add_argument("--out", default=None, help="NDJSON file (default stdout)")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--policy", choices=["block", "drop"], default="block")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    async def main():
+
+        if args.sink == "http":
+            sink = HTTPSink(args.url, policy=args.policy)
+        else:
+            sink = NDJSONSink(args.out, policy=args.policy)
+
+        streamer = SCADAStreamer(demo_fleet(args.stations, args.seed), [sink],
+                                 speedup=args.speedup, jitter_s=args.jitter,
+                                 rng=np.random.default_rng(args.seed))
+
+        started = time.perf_counter()
+        stats = await streamer.run(int(args.sim_days * 24 * 60))
+        print(json.dumps({**stats, "wall_s": time.perf_counter() - started}), file=sys.stderr)
+
+    asyncio.run(main())